@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Sequence
+
+
+# Bind size of a non-string value: NUMBER is at most 22 bytes, DATE 7, TIMESTAMP 11
+_SCALAR_BYTES = 22
+
+
+def estimate_row_bytes(row: Sequence[Any]) -> int:
+    """
+    Approximate bind bytes of one row: a string's UTF-8 length (ASCII, the common case for sheet
+    data, is counted without encoding) or the fixed size of a number/date.
+    """
+    n = 0
+    for v in row:
+        if v is None:
+            n += 1
+        elif v.__class__ is str:
+            n += len(v) if v.isascii() else len(v.encode("utf-8"))
+        else:
+            n += _SCALAR_BYTES
+    return n
+
+
+class AdaptiveBatcher:
+    """
+    executemany batch sizing for one sheet load:
+      - a batch closes at `target_rows` or at `max_bytes` of estimated bind data, whichever comes
+        first, so narrow sheets get few large round trips and wide text sheets stay under the ceiling
+      - every timed executemany feeds back: the row target moves (at most 2x per step) toward the rows
+        the database takes in `target_seconds`, between `min_rows` and `max_rows`
+      - rows, bytes and elapsed time are totalled for the per-sheet throughput log
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        target_seconds: float = 0.5,
+        initial_rows: int = 5000,
+        min_rows: int = 100,
+        max_rows: int = 100_000,
+    ) -> None:
+        self.max_bytes = max(64 * 1024, max_bytes)
+        self.target_seconds = max(0.05, target_seconds)
+        self.min_rows = max(1, min_rows)
+        self.max_rows = max(self.min_rows, max_rows)
+        self.target_rows = min(self.max_rows, max(self.min_rows, initial_rows))
+
+        self.rows = 0
+        self.bytes = 0
+        self.batches = 0
+        self.db_seconds = 0.0
+        self.started = time.monotonic()
+        self._pending_bytes = 0
+
+    def rebatch(self, batches: Iterable[List[tuple]]) -> Iterator[List[tuple]]:
+        """
+        Re-cuts reader batches into executemany batches of the current target size.
+        """
+        out: List[tuple] = []
+        size = 0
+        for batch in batches:
+            for row in batch:
+                row_bytes = estimate_row_bytes(row)
+                if out and (len(out) >= self.target_rows or size + row_bytes > self.max_bytes):
+                    self._pending_bytes = size
+                    yield out
+                    out, size = [], 0
+                out.append(row)
+                size += row_bytes
+        if out:
+            self._pending_bytes = size
+            yield out
+
+    @contextmanager
+    def timed(self, rows: int) -> Iterator[None]:
+        """
+        Wraps the executemany of the batch rebatch() just produced.
+        """
+        t0 = time.monotonic()
+        yield
+        self.record(rows, self._pending_bytes, time.monotonic() - t0)
+
+    def record(self, rows: int, nbytes: int, seconds: float) -> None:
+        self.rows += rows
+        self.bytes += nbytes
+        self.batches += 1
+        self.db_seconds += seconds
+        if rows < self.target_rows // 2:
+            return   # tail batch or a byte-capped one: says little about the right row count
+        ideal = rows / max(seconds, 1e-3) * self.target_seconds
+        smoothed = (self.target_rows + ideal) / 2
+        bounded = min(self.target_rows * 2, max(self.target_rows / 2, smoothed))
+        self.target_rows = int(min(self.max_rows, max(self.min_rows, bounded)))
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (
+            f"{self.rows / elapsed:.0f} rows/s, {self.bytes / elapsed / 1e6:.1f} MB/s, "
+            f"{self.batches} batches, final batch {self.target_rows} rows, db {self.db_seconds:.1f}s"
+        )
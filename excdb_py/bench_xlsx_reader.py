@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmarks sheet row readers on one workbook:
+  - default: excel_introspect.build_workbook_plan + iter_sheet_rows (the current path)
+  - stream:  xlsx_stream.iter_sheet_rows_stream (XLSX_READER=stream)
+  - process: parse_pool.ParsePool with --processes N (XLSX_READER=process)
+
+Usage:
+  python bench_xlsx_reader.py path/to/book.xlsx [--sheet NAME] [--batch-size 5000] [--repeat 3]
+  python bench_xlsx_reader.py --generate 200000x20 /tmp/bench.xlsx     (synthetic workbook, then benchmark it)
+
+Reports rows, best wall time, rows/s and peak Python heap (tracemalloc, measured on a separate pass).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+from excel_introspect import build_workbook_plan, iter_sheet_rows
+from parse_pool import ParsePool
+from xlsx_stream import iter_sheet_rows_stream
+
+
+def _col_letter(i: int) -> str:
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def generate_workbook(path: Path, rows: int, cols: int, distinct_strings: int = 5000) -> None:
+    """
+    Writes a plain one-sheet .xlsx: header row, then text (shared strings), numbers and dates by column.
+    """
+    strings = [f"value {i} {'x' * (i % 40)}" for i in range(distinct_strings)]
+    rnd = random.Random(42)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            '</Types>'
+        ))
+        z.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ))
+        z.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        z.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            '<Relationship Id="rId2" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+            'Target="sharedStrings.xml"/>'
+            '<Relationship Id="rId3" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/></Relationships>'
+        ))
+        z.writestr("xl/styles.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<cellXfs count="2"><xf numFmtId="0"/><xf numFmtId="14" applyNumberFormat="1"/></cellXfs>'
+            '</styleSheet>'
+        ))
+        headers = [f"COL_{c}" for c in range(cols)]
+        all_strings = strings + headers
+        z.writestr("xl/sharedStrings.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{len(all_strings)}">'
+            + "".join(f"<si><t>{escape(s)}</t></si>" for s in all_strings)
+            + "</sst>"
+        ))
+        with z.open("xl/worksheets/sheet1.xml", "w") as f:
+            f.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                + f'<dimension ref="A1:{_col_letter(cols - 1)}{rows + 1}"/><sheetData>'.encode()
+            )
+            head = "".join(
+                f'<c r="{_col_letter(c)}1" t="s"><v>{distinct_strings + c}</v></c>' for c in range(cols)
+            )
+            f.write(f'<row r="1">{head}</row>'.encode())
+            for r in range(2, rows + 2):
+                cells = []
+                for c in range(cols):
+                    ref = f"{_col_letter(c)}{r}"
+                    kind = c % 3
+                    if kind == 0:
+                        cells.append(f'<c r="{ref}" t="s"><v>{rnd.randrange(distinct_strings)}</v></c>')
+                    elif kind == 1:
+                        cells.append(f'<c r="{ref}"><v>{rnd.random() * 1e6:.4f}</v></c>')
+                    else:
+                        cells.append(f'<c r="{ref}" s="1"><v>{40000 + rnd.randrange(5000)}</v></c>')
+                f.write(f'<row r="{r}">{"".join(cells)}</row>'.encode())
+            f.write(b"</sheetData></worksheet>")
+
+
+def _count(batches: Iterator[List[tuple]]) -> int:
+    n = 0
+    for batch in batches:
+        n += len(batch)
+    return n
+
+
+def _measure(fn: Callable[[], int], repeat: int) -> Tuple[int, float, int]:
+    best = float("inf")
+    rows = 0
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        rows = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, best, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("xlsx", type=Path)
+    ap.add_argument("--sheet", default="")
+    ap.add_argument("--batch-size", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--processes", type=int, default=0, help="also time the process pool with N workers")
+    ap.add_argument("--split-rows", type=int, default=250_000)
+    ap.add_argument("--generate", default="", help="ROWSxCOLS: write a synthetic workbook to XLSX first")
+    args = ap.parse_args()
+
+    if args.generate:
+        rows, cols = (int(x) for x in args.generate.lower().split("x"))
+        t0 = time.perf_counter()
+        generate_workbook(args.xlsx, rows, cols)
+        print(f"Generated {args.xlsx} ({rows}x{cols}, {args.xlsx.stat().st_size / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    plan = build_workbook_plan(xlsx_path=args.xlsx, truncate_overflow="truncate")
+    print(f"build_workbook_plan: {time.perf_counter() - t0:.2f}s, {len(plan.sheets)} sheet(s)")
+
+    sheets = [s for s in plan.sheets if not args.sheet or s.sheet_name == args.sheet]
+    readers = {
+        "default": lambda s: _count(iter_sheet_rows(s, batch_size=args.batch_size)),
+        "stream": lambda s: _count(iter_sheet_rows_stream(args.xlsx, s, batch_size=args.batch_size)),
+    }
+    pool = None
+    if args.processes:
+        pool = ParsePool(processes=args.processes, split_rows=args.split_rows)
+        pool.start()
+        readers["process"] = lambda s: _count(pool.iter_sheet_rows(args.xlsx, s, batch_size=args.batch_size))
+    print(f"{'sheet':<24} {'reader':<8} {'rows':>10} {'seconds':>9} {'rows/s':>11} {'peak MB':>9}")
+    for s in sheets:
+        for name, read in readers.items():
+            rows, secs, peak = _measure(lambda: read(s), args.repeat)
+            print(f"{s.sheet_name[:24]:<24} {name:<8} {rows:>10} {secs:>9.2f} {rows / max(secs, 1e-9):>11.0f} "
+                  f"{peak / 1e6:>9.1f}")
+    if pool is not None:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
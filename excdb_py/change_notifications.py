@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from graph_watcher import GRAPH_ROOT
+
+
+# driveItem subscriptions may live at most 42300 minutes (~29 days)
+_MAX_EXPIRATION_MINUTES = 42300
+
+
+def _parse_graph_time(value: str) -> datetime:
+    # Graph uses 7 fractional digits and a Z suffix; fromisoformat wants at most 6 and an offset
+    v = re.sub(r"(\.\d{6})\d+", r"\1", str(value)).replace("Z", "+00:00")
+    return datetime.fromisoformat(v)
+
+
+class NotificationListener:
+    """
+    Small embedded HTTP endpoint for Graph change notifications.
+      - POST ?validationToken=... -> echoes the token (subscription validation handshake)
+      - POST {"value": [...]}     -> 202; wakes the watcher if any notification carries our clientState
+    Notifications carry no item details for drives; they only say "something changed", so the
+    watcher answers every wake-up with a normal delta pull. Several watchers (one per folder,
+    each on its own thread) can share one listener: every waiting thread is woken.
+    """
+
+    def __init__(self, host: str, port: int, path: str = "/notifications", client_state: str = "") -> None:
+        self.path = path
+        self.client_state = client_state
+        self.log = logging.getLogger("NotificationListener")
+        self._wake = threading.Condition()
+        self._generation = 0                     # bumped per accepted notification batch
+        self._seen: Dict[int, int] = {}          # thread ident -> generation it last woke for
+        self.received = 0
+
+        listener = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt: str, *args: Any) -> None:
+                listener.log.debug(fmt, *args)
+
+            def do_POST(self) -> None:
+                parts = urlsplit(self.path)
+                if parts.path != listener.path:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                token = parse_qs(parts.query).get("validationToken")
+                if token:
+                    body = token[0].encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                self.send_response(202)
+                self.end_headers()
+                listener._on_payload(payload)
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, name="notify-listener", daemon=True)
+        self._thread.start()
+        self.log.info("Listening for change notifications on port %s%s", self.port, self.path)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _on_payload(self, payload: Dict[str, Any]) -> None:
+        accepted = 0
+        for n in payload.get("value") or []:
+            if self.client_state and n.get("clientState") != self.client_state:
+                self.log.warning("Ignoring notification with unexpected clientState")
+                continue
+            accepted += 1
+        if accepted:
+            with self._wake:
+                self.received += accepted
+                self._generation += 1
+                self._wake.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Sleeps up to `timeout` seconds; returns True early when a notification arrives.
+        A notification that arrived since this thread's previous wait returns immediately.
+        """
+        me = threading.get_ident()
+        with self._wake:
+            seen = self._seen.setdefault(me, self._generation)
+            woke = self._wake.wait_for(lambda: self._generation != seen, timeout)
+            self._seen[me] = self._generation
+            return woke
+
+
+class SubscriptionManager:
+    """
+    Keeps one Graph subscription alive for a drive:
+      - creates it on first use (id persisted under state_dir)
+      - renews when less than a quarter of its lifetime is left
+      - recreates it if Graph no longer knows it
+    Drive subscriptions are only supported on the drive root, so they fire for the whole library;
+    the delta pull scoped to the watched folder filters what actually matters.
+    """
+
+    def __init__(
+        self,
+        client,
+        drive_id: str,
+        notification_url: str,
+        client_state: str,
+        state_path: Path,
+        lifetime_minutes: int = 4320,
+    ) -> None:
+        self.client = client
+        self.resource = f"/drives/{drive_id}/root"
+        self.notification_url = notification_url
+        self.client_state = client_state
+        self.state_path = state_path
+        self.lifetime = timedelta(minutes=min(lifetime_minutes, _MAX_EXPIRATION_MINUTES))
+        self.log = logging.getLogger("SubscriptionManager")
+        # Watchers of several folders on one drive share a manager
+        self._lock = threading.Lock()
+
+        self.subscription_id = ""
+        self.expires_at: Optional[datetime] = None
+        if self.state_path.exists():
+            try:
+                data = json.loads(self.state_path.read_text(encoding="utf-8"))
+                self.subscription_id = data.get("id") or ""
+                self.expires_at = _parse_graph_time(data["expirationDateTime"])
+            except Exception:
+                self.log.exception("Ignoring unreadable subscription state: %s", self.state_path)
+
+    def _persist(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        assert self.expires_at is not None
+        self.state_path.write_text(
+            json.dumps({"id": self.subscription_id, "expirationDateTime": self.expires_at.isoformat()}),
+            encoding="utf-8",
+        )
+
+    def _new_expiry(self) -> str:
+        return (datetime.now(timezone.utc) + self.lifetime).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def ensure(self) -> None:
+        with self._lock:
+            self._ensure()
+
+    def _ensure(self) -> None:
+        now = datetime.now(timezone.utc)
+        if self.subscription_id and self.expires_at and self.expires_at - now > self.lifetime / 4:
+            return
+
+        if self.subscription_id and self.expires_at and self.expires_at > now:
+            try:
+                data = self.client.patch_json(
+                    f"{GRAPH_ROOT}/subscriptions/{self.subscription_id}",
+                    {"expirationDateTime": self._new_expiry()},
+                )
+                self._remember(data)
+                self.log.info("Renewed subscription %s until %s", self.subscription_id, self.expires_at)
+                return
+            except Exception:
+                self.log.exception("Subscription renewal failed; creating a new one")
+
+        data = self.client.post_json(
+            f"{GRAPH_ROOT}/subscriptions",
+            {
+                "changeType": "updated",
+                "notificationUrl": self.notification_url,
+                "resource": self.resource,
+                "expirationDateTime": self._new_expiry(),
+                "clientState": self.client_state,
+            },
+        )
+        self._remember(data)
+        self.log.info("Created subscription %s until %s", self.subscription_id, self.expires_at)
+
+    def _remember(self, data: Dict[str, Any]) -> None:
+        self.subscription_id = data.get("id") or self.subscription_id
+        self.expires_at = _parse_graph_time(data["expirationDateTime"])
+        self._persist()
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from excel_introspect import SheetPlan
+from xlsx_stream import sheet_rows
+
+
+log = logging.getLogger("column_types")
+
+VARCHAR2 = "VARCHAR2"
+NUMBER = "NUMBER"
+DATE = "DATE"
+TIMESTAMP = "TIMESTAMP"
+
+# Right-sized VARCHAR2 widths; the configured varchar2_len is always the ceiling.
+_VARCHAR2_BUCKETS = (16, 32, 64, 128, 255, 512, 1000, 2000, 4000)
+
+# Plain decimal numbers only. Leading zeros ("00123") stay text: they are usually codes, not quantities.
+_NUMBER_RE = re.compile(r"^[+-]?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$|^[+-]?\.\d+$")
+_MAX_NUMBER_DIGITS = 38
+# Oracle NUMBER holds magnitudes from 1E-130 up to (not including) 1E126: larger raises ORA-01426,
+# smaller silently becomes 0
+_MIN_NUMBER_EXPONENT = -130
+_MAX_NUMBER_EXPONENT = 125
+
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+_TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S.%f")
+
+
+@dataclass(frozen=True)
+class ColumnType:
+    kind: str = VARCHAR2      # VARCHAR2|NUMBER|DATE|TIMESTAMP
+    length: int = 0           # VARCHAR2 byte length
+
+    def ddl(self) -> str:
+        if self.kind == VARCHAR2:
+            return f"VARCHAR2({self.length})"
+        if self.kind == TIMESTAMP:
+            return "TIMESTAMP(6)"
+        return self.kind
+
+
+class TypeMismatch(ValueError):
+    """
+    Raised while binding when a value does not fit its column's inferred type.
+    The loader then finds every other column that does not fit either (mismatched_columns),
+    demotes them all to VARCHAR2 and rebuilds the sheet once.
+    """
+
+    def __init__(self, column_index: int, value: Any, column_type: ColumnType) -> None:
+        super().__init__(f"Column {column_index} value {value!r} does not fit {column_type.ddl()}")
+        self.column_index = column_index
+        self.value = value
+        self.column_type = column_type
+
+
+def _is_blank(v: Any) -> bool:
+    return v is None or (isinstance(v, str) and v.strip() == "")
+
+
+def _to_number(v: Any) -> Optional[Decimal]:
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, Decimal)):
+        d = Decimal(v)
+    elif isinstance(v, float):
+        if v != v or v in (float("inf"), float("-inf")):
+            return None
+        d = Decimal(repr(v))
+    elif isinstance(v, str):
+        s = v.strip()
+        if not _NUMBER_RE.match(s):
+            return None
+        try:
+            d = Decimal(s)
+        except InvalidOperation:
+            return None
+    else:
+        return None
+    if len(d.as_tuple().digits) > _MAX_NUMBER_DIGITS:
+        return None
+    if d and not _MIN_NUMBER_EXPONENT <= d.adjusted() <= _MAX_NUMBER_EXPONENT:
+        return None
+    return d
+
+
+def _to_datetime(v: Any) -> Optional[datetime]:
+    if isinstance(v, datetime):
+        return v
+    if isinstance(v, date):
+        return datetime(v.year, v.month, v.day)
+    if not isinstance(v, str):
+        return None
+    s = v.strip()
+    for fmt in _DATE_FORMATS + _TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _to_text(v: Any) -> str:
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    if isinstance(v, datetime):
+        return v.isoformat(sep=" ")
+    return str(v)
+
+
+def _varchar2_width(max_bytes: int, ceiling: int, headroom: bool) -> int:
+    wanted = max(1, max_bytes * 2 if headroom else max_bytes)
+    for b in _VARCHAR2_BUCKETS:
+        if b >= wanted:
+            return min(b, ceiling)
+    return ceiling
+
+
+class _ColumnStats:
+    def __init__(self) -> None:
+        self.non_blank = 0
+        self.max_bytes = 0
+        self.number = True
+        self.datetime = True
+        self.fractional = False
+
+    def observe(self, v: Any) -> None:
+        if _is_blank(v):
+            return
+        self.non_blank += 1
+        self.max_bytes = max(self.max_bytes, len(_to_text(v).encode("utf-8")))
+        if self.number and _to_number(v) is None:
+            self.number = False
+        if self.datetime:
+            dt = _to_datetime(v)
+            if dt is None:
+                self.datetime = False
+            elif dt.microsecond:
+                self.fractional = True
+
+    def column_type(self, varchar2_len: int, headroom: bool) -> ColumnType:
+        if self.non_blank and self.number:
+            return ColumnType(NUMBER)
+        if self.non_blank and self.datetime:
+            return ColumnType(TIMESTAMP if self.fractional else DATE)
+        return ColumnType(VARCHAR2, _varchar2_width(self.max_bytes, varchar2_len, headroom))
+
+
+def infer_sheet_types(
+    sheet_plan: SheetPlan,
+    sample_rows: Optional[int] = None,
+    xlsx_path: Optional[Path] = None,
+) -> List[ColumnType]:
+    """
+    Picks NUMBER, DATE/TIMESTAMP or a right-sized VARCHAR2 per column.
+      - sample_rows=None: full pass, widths are exact
+      - sample_rows=N: first N rows, VARCHAR2 widths get 2x headroom
+    Values that later turn out not to fit are handled by the loader (TypeMismatch -> VARCHAR2).
+    """
+    stats = [_ColumnStats() for _ in sheet_plan.columns]
+    seen = 0
+    for batch in sheet_rows(sheet_plan, batch_size=5000, xlsx_path=xlsx_path):
+        for row in batch:
+            for i, v in enumerate(row[: len(stats)]):
+                stats[i].observe(v)
+            seen += 1
+            if sample_rows is not None and seen >= sample_rows:
+                break
+        if sample_rows is not None and seen >= sample_rows:
+            break
+
+    headroom = sample_rows is not None
+    return [s.column_type(sheet_plan.varchar2_len, headroom) for s in stats]
+
+
+def infer_column_types(
+    sheets: Sequence[SheetPlan],
+    mode: str = "off",
+    sample_rows: int = 10000,
+    xlsx_path: Optional[Path] = None,
+) -> Dict[str, List[ColumnType]]:
+    """
+    mode:
+      - off: no inference (loader keeps VARCHAR2(varchar2_len) everywhere)
+      - sample: first `sample_rows` rows per sheet
+      - full: every row
+    xlsx_path: read rows with the streaming reader (see xlsx_stream.sheet_rows).
+    Returns logical_name -> column types.
+    """
+    mode = (mode or "off").lower()
+    if mode == "off":
+        return {}
+    if mode not in ("sample", "full"):
+        raise ValueError(f"Unknown type inference mode: {mode}")
+
+    out: Dict[str, List[ColumnType]] = {}
+    for sheet in sheets:
+        types = infer_sheet_types(sheet, sample_rows=sample_rows if mode == "sample" else None, xlsx_path=xlsx_path)
+        log.info(
+            "Inferred types for '%s': %s",
+            sheet.logical_name,
+            ", ".join(f"{c}={t.ddl()}" for c, t in zip(sheet.columns, types)),
+        )
+        out[sheet.logical_name] = types
+    return out
+
+
+def demote_to_varchar2(types: Sequence[ColumnType], column_index: int, varchar2_len: int) -> List[ColumnType]:
+    out = list(types)
+    out[column_index] = ColumnType(VARCHAR2, varchar2_len)
+    return out
+
+
+def _converter(col_type: ColumnType) -> Callable[[Any], Any]:
+    if col_type.kind == NUMBER:
+        return _to_number
+    if col_type.kind in (DATE, TIMESTAMP):
+        def _dt(v: Any) -> Optional[datetime]:
+            dt = _to_datetime(v)
+            if dt is not None and dt.microsecond and col_type.kind == DATE:
+                return None
+            return dt
+        return _dt
+
+    def _text(v: Any) -> Optional[str]:
+        s = _to_text(v)
+        if len(s.encode("utf-8")) > col_type.length:
+            return None
+        return s
+    return _text
+
+
+def _conversions(types: Sequence[ColumnType], varchar2_len: int) -> Tuple[List[Callable[[Any], Any]], List[bool]]:
+    return [_converter(t) for t in types], [t.kind == VARCHAR2 and t.length >= varchar2_len for t in types]
+
+
+def mismatched_columns(
+    sheet_plan: SheetPlan,
+    types: Sequence[ColumnType],
+    xlsx_path: Optional[Path] = None,
+) -> Dict[int, Any]:
+    """
+    Reads the whole sheet once and returns column index -> first value that does not fit its type,
+    for every such column: what typed_batches would otherwise report one rebuild at a time.
+    No database work; a column stops being checked once it has failed.
+    """
+    convs, passthrough = _conversions(types, sheet_plan.varchar2_len)
+    pending = [i for i in range(len(types)) if not passthrough[i]]
+    bad: Dict[int, Any] = {}
+    for batch in sheet_rows(sheet_plan, batch_size=5000, xlsx_path=xlsx_path):
+        for row in batch:
+            found = len(bad)
+            for i in pending:
+                v = row[i] if i < len(row) else None
+                if not _is_blank(v) and convs[i](v) is None:
+                    bad[i] = v
+            if len(bad) != found:
+                pending = [i for i in pending if i not in bad]
+                if not pending:
+                    return bad
+    return bad
+
+
+def typed_batches(
+    batches: Iterator[List[Sequence[Any]]],
+    types: Sequence[ColumnType],
+    varchar2_len: int,
+) -> Iterator[List[tuple]]:
+    """
+    Converts raw sheet rows into bind-ready tuples for `types`.
+    Blank cells bind as NULL. Raises TypeMismatch on the first value that does not fit;
+    VARCHAR2 columns already at the configured ceiling pass through unchanged so
+    truncate/overflow handling stays where it was.
+    """
+    convs, passthrough = _conversions(types, varchar2_len)
+    width = len(types)
+    for batch in batches:
+        out = []
+        for row in batch:
+            vals = []
+            for i in range(width):
+                v = row[i] if i < len(row) else None
+                if _is_blank(v):
+                    vals.append(None)
+                elif passthrough[i]:
+                    vals.append(v)
+                else:
+                    c = convs[i](v)
+                    if c is None:
+                        raise TypeMismatch(i, v, types[i])
+                    vals.append(c)
+            out.append(tuple(vals))
+        yield out
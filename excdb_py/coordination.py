@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import oracledb
+
+from graph_watcher import ChangedItem
+from oracle_loader import OracleConfig
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class _Claim:
+    token: str      # written to the lease row; renew/release only touch the row carrying it
+    units: int = 0  # units submitted under this claim still in the local pipeline
+
+
+class LeaseCoordinator:
+    """
+    Lets several ingest hosts watch the same folders without loading a workbook twice:
+      - before an item enters the local pipeline its key (pipeline_key, i.e. the logical name
+        the workbook loads into) is claimed in a shared Oracle lease table; only the owner loads it
+      - leases expire after `lease_seconds` unless the heartbeat (every `heartbeat_seconds`) renews them,
+        so the keys of a worker that died are reclaimed by the others
+      - an item whose key another worker holds is deferred and re-offered on each heartbeat;
+        if the shared state store shows that version (or a newer one) already done, it is dropped
+      - every claim gets its own token, carried by the units submitted under it: a unit left over
+        from a lost lease finishing later can never release a lease this worker has claimed since
+    Every host sees every change, so together with a shared state store (STATE_BACKEND=oracle)
+    the work splits across workers by key without duplicates.
+    """
+
+    def __init__(
+        self,
+        cfg: OracleConfig,
+        state,
+        worker_id: str = "",
+        lease_seconds: int = 120,
+        heartbeat_seconds: int = 30,
+        table: str = "INGEST_LEASES",
+    ) -> None:
+        self.cfg = cfg
+        self.state = state
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = max(10, lease_seconds)
+        self.heartbeat_seconds = max(1, min(heartbeat_seconds, self.lease_seconds // 3))
+        self.table = table
+        self.log = logging.getLogger("LeaseCoordinator")
+
+        self.conn: Optional[oracledb.Connection] = None
+        self._lock = threading.Lock()
+        self._held: Dict[str, _Claim] = {}           # key -> live claim
+        self._deferred: Dict[str, ChangedItem] = {}  # key -> latest item waiting for a foreign lease
+        self._submit: Optional[Callable[[str, Any, Any], None]] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self, submit: Callable[[str, Any, Any], None]) -> None:
+        # Own connection: heartbeats must never wait behind a long sheet load
+        self.conn = oracledb.connect(user=self.cfg.user, password=self.cfg.password, dsn=self.cfg.dsn)
+        self.conn.autocommit = True
+        self._create_table()
+        self._submit = submit
+        # Separate threads: re-offering a deferred item can block on a full pipeline, renewals must not
+        for name, target in (("lease-heartbeat", self._renew), ("lease-retry", self._retry_deferred)):
+            t = threading.Thread(target=self._every_heartbeat, args=(target,), name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        self.log.info("Lease coordination on as worker %s (lease=%ss)", self.worker_id, self.lease_seconds)
+
+    def close(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            # The retry thread may be parked in submit() on a pipeline that has already shut down
+            t.join(timeout=5)
+        self._threads = []
+        if self.conn is not None:
+            with self._lock:
+                self._exec(f"DELETE FROM {self.table} WHERE owner = :o", {"o": self.worker_id})
+                self.conn.close()
+                self.conn = None
+
+    def _exec(self, sql: str, params: Dict[str, Any]) -> int:
+        assert self.conn is not None
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def _create_table(self) -> None:
+        try:
+            self._exec(
+                f"CREATE TABLE {self.table} ("
+                " lease_key VARCHAR2(512) PRIMARY KEY,"
+                " owner VARCHAR2(256) NOT NULL,"
+                " expires_at TIMESTAMP NOT NULL,"
+                " acquired_at TIMESTAMP DEFAULT SYSTIMESTAMP,"
+                " token VARCHAR2(32)"
+                ")",
+                {},
+            )
+        except oracledb.DatabaseError as e:
+            if "ORA-00955" not in str(e):  # name is already used by an existing object
+                raise
+            try:
+                # Table created by an older version
+                self._exec(f"ALTER TABLE {self.table} ADD (token VARCHAR2(32))", {})
+            except oracledb.DatabaseError as e2:
+                if "ORA-01430" not in str(e2):  # column being added already exists
+                    raise
+
+    def _claim(self, key: str, token: str) -> bool:
+        """
+        Takes the lease under `token` if it is free, expired or already ours. Caller holds self._lock.
+        """
+        try:
+            return self._exec(
+                f"MERGE INTO {self.table} l USING (SELECT :k lease_key FROM dual) s "
+                "ON (l.lease_key = s.lease_key) "
+                "WHEN MATCHED THEN UPDATE SET owner = :o, token = :t, "
+                " expires_at = SYSTIMESTAMP + NUMTODSINTERVAL(:ttl, 'SECOND') "
+                " WHERE l.owner = :o OR l.expires_at < SYSTIMESTAMP "
+                "WHEN NOT MATCHED THEN INSERT (lease_key, owner, token, expires_at) "
+                " VALUES (:k, :o, :t, SYSTIMESTAMP + NUMTODSINTERVAL(:ttl, 'SECOND'))",
+                {"k": key, "o": self.worker_id, "t": token, "ttl": self.lease_seconds},
+            ) == 1
+        except oracledb.IntegrityError:
+            # Another worker inserted the same key first
+            return False
+
+    def offer(self, key: str, item: ChangedItem) -> None:
+        """
+        Submits the item if its key can be claimed, otherwise defers it.
+        """
+        with self._lock:
+            claim = self._held.get(key)
+            if claim is None:
+                token = uuid.uuid4().hex
+                if self._claim(key, token):
+                    claim = self._held[key] = _Claim(token)
+            newly_deferred = claim is None and key not in self._deferred
+            if claim is not None:
+                claim.units += 1
+                self._deferred.pop(key, None)
+            else:
+                self._deferred[key] = item
+        if claim is not None:
+            assert self._submit is not None
+            self._submit(key, item, claim.token)
+        elif newly_deferred:
+            self.log.info("Deferred (leased by another worker): %s", item.name)
+
+    def release(self, key: str, token: str) -> None:
+        """
+        Called when one unit for `key` leaves the pipeline, with the token it was submitted under;
+        the lease goes once none of that claim's units are left.
+        """
+        with self._lock:
+            claim = self._held.get(key)
+            if claim is None or claim.token != token:
+                return   # unit of a lease lost since: the lease row is no longer ours to delete
+            claim.units -= 1
+            if claim.units > 0:
+                return
+            del self._held[key]
+            if self.conn is not None:
+                self._exec(
+                    f"DELETE FROM {self.table} WHERE lease_key = :k AND owner = :o AND token = :t",
+                    {"k": key, "o": self.worker_id, "t": token},
+                )
+
+    def holds(self, key: str) -> bool:
+        with self._lock:
+            return key in self._held
+
+    def _every_heartbeat(self, fn: Callable[[], None]) -> None:
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                fn()
+            except Exception:
+                self.log.exception("Lease %s failed", fn.__name__.strip("_"))
+
+    def _renew(self) -> None:
+        with self._lock:
+            for key, claim in list(self._held.items()):
+                renewed = self._exec(
+                    f"UPDATE {self.table} SET expires_at = SYSTIMESTAMP + NUMTODSINTERVAL(:ttl, 'SECOND') "
+                    "WHERE lease_key = :k AND owner = :o AND token = :t",
+                    {"k": key, "o": self.worker_id, "t": claim.token, "ttl": self.lease_seconds},
+                )
+                if not renewed and not self._claim(key, claim.token):
+                    # Expired and taken over (e.g. after a long stall): stop treating it as ours
+                    self.log.warning("Lease lost to another worker: %s", key)
+                    self._held.pop(key, None)
+
+    def _retry_deferred(self) -> None:
+        with self._lock:
+            waiting = list(self._deferred.items())
+        for key, item in waiting:
+            done = self.state.get(item.item_id)
+            superseded = done is not None and (
+                done.matches(item.etag, item.last_modified) or done.last_modified > item.last_modified
+            )
+            if superseded:
+                with self._lock:
+                    if self._deferred.get(key) is item:
+                        del self._deferred[key]
+                continue
+            with self._lock:
+                if self._deferred.get(key) is not item or self._stop.is_set():
+                    continue
+            self.offer(key, item)
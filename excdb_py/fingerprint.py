@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+
+# Unit separator: cannot appear in normalized numbers/dates and is vanishingly rare in cell text.
+_SEP = "\x1f"
+
+
+def normalize_value(v: Any) -> str:
+    """
+    Canonical text for a cell/bind value, so "1", 1, 1.0 and Decimal("1.00") all agree.
+    Blank and NULL are the same thing in Oracle, so they are the same thing here.
+    """
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, float):
+        if v != v or v in (float("inf"), float("-inf")):
+            return repr(v)
+        v = Decimal(repr(v))
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, Decimal):
+        return format(v.normalize(), "f")
+    if isinstance(v, datetime):
+        return v.isoformat(sep=" ")
+    if isinstance(v, date):
+        return v.isoformat()
+    return str(v)
+
+
+def row_fingerprint(values: Sequence[Any]) -> str:
+    """
+    40-char hex SHA-1 over the normalized values of one row.
+    """
+    h = hashlib.sha1()
+    h.update(_SEP.join(normalize_value(v) for v in values).encode("utf-8"))
+    return h.hexdigest()
+
+
+def sheet_fingerprint(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> str:
+    """
+    SHA-256 over the column names and every row (in order) of one sheet.
+    Formatting-only edits and edits to other sheets leave it unchanged.
+    """
+    h = hashlib.sha256()
+    h.update(_SEP.join(columns).encode("utf-8"))
+    for batch in batches:
+        for row in batch:
+            h.update(b"\n")
+            h.update(_SEP.join(normalize_value(v) for v in row).encode("utf-8"))
+    return h.hexdigest()
+
+
+def file_fingerprint(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of the file bytes.
+    """
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
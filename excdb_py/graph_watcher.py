@@ -2,17 +2,41 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Iterator, Optional, Callable
+from typing import Dict, Any, Generator, Iterable, Iterator, List, Optional, Callable, Tuple
 
 import msal
-import requests
+
+from http_backend import create_backend
+from json_stream import ListingPage
+from range_download import RangedDownloader
+from rate_limit import RETRY_STATUSES, GraphRateLimiter, ThrottledBackend
+from reconcile import FolderReconciler
 
 
 GRAPH_ROOT = "https://graph.microsoft.com/v1.0"
 
+# Only the driveItem fields ChangedItem is built from (plus `deleted` for delta tombstones)
+ITEM_SELECT = "id,name,eTag,file,fileSystemInfo,size,deleted,parentReference"
+
+# JSON batching accepts at most 20 requests per POST /$batch
+BATCH_LIMIT = 20
+
+
+def _relative(url: str) -> str:
+    # $batch sub-request URLs are relative to the version root
+    return url[len(GRAPH_ROOT):] if url.startswith(GRAPH_ROOT) else url
+
+
+@dataclass(frozen=True)
+class BatchResponse:
+    status: int                 # 0 when Graph returned no answer for the request
+    body: Dict[str, Any]
+
 
 @dataclass(frozen=True)
 class ChangedItem:
@@ -21,14 +45,35 @@ class ChangedItem:
     etag: str
     last_modified: str
     download_to: Callable[[Path], None]
+    size: int = 0
+    quick_xor_hash: str = ""
 
 
 class GraphAuth:
-    def __init__(self, tenant_id: str, client_id: str, cache_path: Path) -> None:
+    """
+    Device-flow auth with two cache layers:
+      - in-process: the current access token is reused until `refresh_margin_seconds` before expiry;
+        one thread refreshes under a lock while the others wait for its result
+      - MSAL cache file: rewritten only when MSAL reports the cache actually changed
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        cache_path: Path,
+        refresh_margin_seconds: int = 300,
+    ) -> None:
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.cache_path = cache_path
         self.scopes = ["Files.Read.All", "Sites.Read.All", "offline_access"]
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.log = logging.getLogger("GraphAuth")
+
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
 
         self.cache = msal.SerializableTokenCache()
         if self.cache_path.exists():
@@ -41,10 +86,40 @@ class GraphAuth:
         )
 
     def _persist_cache(self) -> None:
+        if not self.cache.has_state_changed:
+            return
         self.cache_path.parent.mkdir(parents=True, exist_ok=True)
-        self.cache_path.write_text(self.cache.serialize(), encoding="utf-8")
+        tmp = self.cache_path.with_suffix(self.cache_path.suffix + ".part")
+        tmp.write_text(self.cache.serialize(), encoding="utf-8")
+        tmp.replace(self.cache_path)
+
+    def _token_fresh(self) -> bool:
+        return self._token is not None and time.time() < self._token_expires_at - self.refresh_margin_seconds
+
+    def invalidate(self) -> None:
+        """
+        Drop the in-process token (e.g. after a 401) so the next call goes back to MSAL.
+        """
+        with self._lock:
+            self._token = None
+            self._token_expires_at = 0.0
 
     def get_access_token(self) -> str:
+        if self._token_fresh():
+            return self._token
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if self._token_fresh():
+                return self._token
+            result = self._acquire_token()
+            self._token = result["access_token"]
+            self._token_expires_at = time.time() + int(result.get("expires_in") or 0)
+            self._persist_cache()
+            self.log.info("Access token refreshed (expires in %ss)", result.get("expires_in"))
+            return self._token
+
+    def _acquire_token(self) -> Dict[str, Any]:
         accounts = self.app.get_accounts()
         result = None
         if accounts:
@@ -59,43 +134,241 @@ class GraphAuth:
 
         if "access_token" not in result:
             raise RuntimeError(f"Token error: {result}")
-
-        self._persist_cache()
-        return result["access_token"]
+        return result
 
 
 class GraphClient:
-    def __init__(self, auth: GraphAuth) -> None:
+    """
+    All Graph HTTP goes through one shared backend (keep-alive pool, compression negotiated).
+    backend: "requests" (HTTP/1.1 pool) or "httpx" (HTTP/2, optional dependency).
+    Every request, listing stream and download range passes the shared rate limiter, which
+    also retries 429/503 responses (see rate_limit.GraphRateLimiter).
+    """
+
+    def __init__(
+        self,
+        auth: GraphAuth,
+        pool_size: int = 16,
+        backend: str = "requests",
+        download_workers: int = 4,
+        download_part_size: int = 8 * 1024 * 1024,
+        rate_limiter: Optional[GraphRateLimiter] = None,
+    ) -> None:
         self.auth = auth
+        self.rate_limiter = rate_limiter or GraphRateLimiter()
+        self.http = ThrottledBackend(create_backend(backend, pool_size=pool_size), self.rate_limiter)
+        self.downloader = RangedDownloader(
+            self.http,
+            headers=self._headers,
+            part_size=download_part_size,
+            workers=download_workers,
+        )
         self.log = logging.getLogger("GraphClient")
 
     def _headers(self) -> Dict[str, str]:
         return {"Authorization": f"Bearer {self.auth.get_access_token()}"}
 
-    def get_json(self, url: str) -> Dict[str, Any]:
-        r = requests.get(url, headers=self._headers(), timeout=60)
+    def close(self) -> None:
+        self.http.close()
+
+    def _request_json(self, method: str, url: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        r = self.http.request(method, url, headers=self._headers(), timeout=60, json=body)
+        if r.status_code == 401:
+            # Token revoked/expired early: drop the cached one and retry once
+            self.auth.invalidate()
+            r = self.http.request(method, url, headers=self._headers(), timeout=60, json=body)
         r.raise_for_status()
-        return r.json()
+        return r.json() if r.content else {}
+
+    def get_json(self, url: str) -> Dict[str, Any]:
+        return self._request_json("GET", url)
+
+    def post_json(self, url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request_json("POST", url, body)
+
+    def patch_json(self, url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request_json("PATCH", url, body)
+
+    def batch_get_json(self, urls: List[str]) -> List[BatchResponse]:
+        """
+        GETs many independent URLs through JSON batching, BATCH_LIMIT per round trip.
+        Returns one BatchResponse per URL, in input order; throttled sub-requests are
+        retried (honouring their Retry-After) before a result is reported.
+        """
+        results: List[Optional[BatchResponse]] = [None] * len(urls)
+        for start in range(0, len(urls), BATCH_LIMIT):
+            pending = list(range(start, min(start + BATCH_LIMIT, len(urls))))
+            attempt = 0
+            while pending:
+                body = {"requests": [{"id": str(i), "method": "GET", "url": _relative(urls[i])} for i in pending]}
+                data = self.post_json(f"{GRAPH_ROOT}/$batch", body)
+                retry: List[int] = []
+                delay = 0.0
+                for resp in data.get("responses") or []:
+                    i = int(resp.get("id"))
+                    status = int(resp.get("status") or 0)
+                    if status in RETRY_STATUSES and attempt < self.rate_limiter.max_retries:
+                        retry_after = (resp.get("headers") or {}).get("Retry-After")
+                        delay = max(delay, self.rate_limiter.on_throttled(attempt, status, retry_after, urls[i]))
+                        retry.append(i)
+                        continue
+                    results[i] = BatchResponse(status=status, body=resp.get("body") or {})
+                pending = retry
+                attempt += 1
+                if pending:
+                    time.sleep(delay)
+        return [r if r is not None else BatchResponse(status=0, body={}) for r in results]
+
+    def stream_listing(self, url: str) -> ListingPage:
+        """
+        GET a collection page and parse it while it downloads (see json_stream.ListingPage).
+        Iterate the result for items; next_link/delta_link are set once iteration finishes.
+        """
+        return ListingPage(self._iter_body(url))
+
+    def _iter_body(self, url: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        for attempt in range(2):
+            with self.http.stream(url, headers=self._headers(), timeout=60) as r:
+                if r.status_code == 401 and attempt == 0:
+                    self.auth.invalidate()
+                    continue
+                r.raise_for_status()
+                yield from r.iter_bytes(chunk_size=chunk_size)
+                return
+
+    def stream_download(
+        self,
+        url: str,
+        out_path: Path,
+        expected_size: int = 0,
+        expected_quick_xor: str = "",
+    ) -> None:
+        """
+        Parallel ranged download with resume and size/quickXorHash verification (see RangedDownloader).
+        """
+        self.downloader.download(
+            url,
+            out_path,
+            expected_size=expected_size,
+            expected_quick_xor=expected_quick_xor,
+        )
+
+
+@dataclass
+class _Held:
+    item: ChangedItem
+    first_seen: float
+    last_change: float
+
+
+class ChangeCoalescer:
+    """
+    Collapses repeated change events per item_id:
+      - only the latest version (etag) of an item is kept
+      - an item is released once it has been quiet for `quiet_seconds` (no new etag seen),
+        or after `max_wait_seconds` if it keeps changing
+    """
+
+    def __init__(self, quiet_seconds: float, max_wait_seconds: float = 600) -> None:
+        self.quiet_seconds = quiet_seconds
+        self.max_wait_seconds = max(quiet_seconds, max_wait_seconds)
+        self._held: Dict[str, _Held] = {}
 
-    def stream_download(self, url: str, out_path: Path) -> None:
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        tmp = out_path.with_suffix(out_path.suffix + ".part")
+    def __len__(self) -> int:
+        return len(self._held)
 
-        with requests.get(url, headers=self._headers(), stream=True, timeout=300) as r:
-            r.raise_for_status()
-            with tmp.open("wb") as f:
-                for chunk in r.iter_content(chunk_size=1024 * 1024):
-                    if chunk:
-                        f.write(chunk)
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._held
 
-        tmp.replace(out_path)
+    def add(self, item: ChangedItem, now: float) -> None:
+        held = self._held.get(item.item_id)
+        if held is None:
+            self._held[item.item_id] = _Held(item=item, first_seen=now, last_change=now)
+            return
+        if (held.item.etag, held.item.last_modified) != (item.etag, item.last_modified):
+            held.last_change = now
+        held.item = item
+
+    def _due_at(self, held: _Held) -> float:
+        return min(held.last_change + self.quiet_seconds, held.first_seen + self.max_wait_seconds)
+
+    def pop_due(self, now: float) -> List[ChangedItem]:
+        return [self._held.pop(it.item_id).item for it in self.due(now)]
+
+    def due(self, now: float) -> List[ChangedItem]:
+        """
+        Items ready for release, left in place (see pop).
+        """
+        return [h.item for h in self._held.values() if self._due_at(h) <= now]
+
+    def pop(self, item_id: str) -> ChangedItem:
+        return self._held.pop(item_id).item
+
+    def seconds_until_due(self, now: float) -> Optional[float]:
+        if not self._held:
+            return None
+        return max(0.0, min(self._due_at(h) for h in self._held.values()) - now)
+
+
+class AdaptivePoller:
+    """
+    Delta poll interval driven by the observed change rate:
+      - a poll that saw changes drops the interval back to `min_seconds`
+      - each empty poll multiplies it by `backoff`, up to `max_seconds`
+    With max_seconds == min_seconds this is the plain fixed interval.
+    """
+
+    def __init__(self, min_seconds: float, max_seconds: float, backoff: float = 2.0, window: int = 100) -> None:
+        self.min_seconds = max(1.0, float(min_seconds))
+        self.max_seconds = max(self.min_seconds, float(max_seconds))
+        self.backoff = max(1.0, backoff)
+        self.interval = self.min_seconds
+        self.polls = 0
+        self.empty_polls = 0
+        self._recent = deque(maxlen=max(1, window))   # True = empty poll
+        self.log = logging.getLogger("AdaptivePoller")
+
+    def record(self, changes: int) -> float:
+        """
+        Feeds one poll result; returns the interval to wait before the next poll.
+        """
+        empty = changes == 0
+        self.polls += 1
+        self.empty_polls += int(empty)
+        self._recent.append(empty)
+
+        previous = self.interval
+        if empty:
+            self.interval = min(self.max_seconds, self.interval * self.backoff)
+        else:
+            self.interval = self.min_seconds
+        if self.interval != previous:
+            m = self.metrics()
+            self.log.info(
+                "Poll interval %.0fs -> %.0fs (empty-poll ratio %.2f over last %s polls)",
+                previous, self.interval, m["empty_poll_ratio"], len(self._recent),
+            )
+        return self.interval
+
+    def metrics(self) -> Dict[str, float]:
+        recent = len(self._recent)
+        return {
+            "poll_interval_seconds": self.interval,
+            "polls_total": self.polls,
+            "empty_polls_total": self.empty_polls,
+            "empty_poll_ratio": (sum(self._recent) / recent) if recent else 0.0,
+        }
 
 
 class GraphWatcher:
     """
-    Monitors a SharePoint folder via:
+    Monitors one SharePoint folder via:
       - optional "startup scan" (current children)
       - then delta loop (efficient)
+      - optionally woken early by change notifications (see change_notifications.py);
+        polling then drops to a long-interval safety net
+    Several folders: build one GraphClient, pass it to one watcher per folder (each with its
+    own delta_link_name) and merge their iter_changed_items streams (see stream_merge.py).
     """
 
     def __init__(
@@ -107,26 +380,70 @@ class GraphWatcher:
         state_dir: Path,
         poll_seconds: int = 30,
         initial_mode: str = "process_existing",
+        http_pool_size: int = 16,
+        http_backend: str = "requests",
+        download_workers: int = 4,
+        download_part_size: int = 8 * 1024 * 1024,
+        coalesce_seconds: float = 0,
+        coalesce_max_wait_seconds: float = 600,
+        rate_limiter: Optional[GraphRateLimiter] = None,
+        notifications=None,
+        subscription=None,
+        safety_poll_seconds: int = 900,
+        poll_max_seconds: Optional[int] = None,
+        poll_backoff: float = 2.0,
+        client: Optional[GraphClient] = None,
+        delta_link_name: str = "delta_link.txt",
     ) -> None:
         self.drive_id = drive_id
         self.folder_item_id = folder_item_id
         self.poll_seconds = poll_seconds
         self.initial_mode = initial_mode
+        self.coalesce_seconds = coalesce_seconds
+        self.coalesce_max_wait_seconds = coalesce_max_wait_seconds
+        self.notifications = notifications     # NotificationListener or None
+        self.subscription = subscription       # SubscriptionManager or None
+        if self.notifications is not None:
+            self.poll_seconds = max(poll_seconds, safety_poll_seconds)
+        self.poller = AdaptivePoller(
+            min_seconds=self.poll_seconds,
+            max_seconds=max(self.poll_seconds, poll_max_seconds or self.poll_seconds),
+            backoff=poll_backoff,
+        )
 
-        token_cache = state_dir / "msal_cache.json"
-        self.auth = GraphAuth(tenant_id=tenant_id, client_id=client_id, cache_path=token_cache)
-        self.client = GraphClient(self.auth)
+        if client is not None:
+            # Shared with the watchers of other folders: one token holder, one HTTP pool
+            self.client = client
+            self.auth = client.auth
+        else:
+            token_cache = state_dir / "msal_cache.json"
+            self.auth = GraphAuth(tenant_id=tenant_id, client_id=client_id, cache_path=token_cache)
+            self.client = GraphClient(
+                self.auth,
+                pool_size=http_pool_size,
+                backend=http_backend,
+                download_workers=download_workers,
+                download_part_size=download_part_size,
+                rate_limiter=rate_limiter,
+            )
 
-        self.delta_link_path = state_dir / "delta_link.txt"
+        self.delta_link_path = state_dir / delta_link_name
         self.log = logging.getLogger("GraphWatcher")
 
-    def _folder_children_url(self) -> str:
-        return f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{self.folder_item_id}/children?$top=999"
+    def folder_children_url(self) -> str:
+        return (
+            f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{self.folder_item_id}/children"
+            f"?$top=999&$select={ITEM_SELECT}"
+        )
+
+    def _initial_delta_url(self) -> str:
+        # Graph carries $select into every nextLink/deltaLink it hands back
+        return f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{self.folder_item_id}/delta?$select={ITEM_SELECT}"
 
     def _delta_url(self) -> str:
         if self.delta_link_path.exists():
             return self.delta_link_path.read_text(encoding="utf-8").strip()
-        return f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{self.folder_item_id}/delta"
+        return self._initial_delta_url()
 
     def _persist_delta_link(self, delta_link: str) -> None:
         self.delta_link_path.parent.mkdir(parents=True, exist_ok=True)
@@ -137,8 +454,8 @@ class GraphWatcher:
         n = name.lower()
         return n.endswith(".xlsx") or n.endswith(".xlsm")
 
-    def _yield_items_from_listing(self, listing_json: Dict[str, Any]) -> Iterator[ChangedItem]:
-        for it in listing_json.get("value", []):
+    def _yield_items_from_listing(self, listing: Iterable[Dict[str, Any]]) -> Iterator[ChangedItem]:
+        for it in listing:
             if "file" not in it:
                 continue
             name = it.get("name") or ""
@@ -148,11 +465,13 @@ class GraphWatcher:
             item_id = it.get("id") or ""
             etag = it.get("eTag") or ""
             last_modified = (it.get("fileSystemInfo") or {}).get("lastModifiedDateTime") or ""
+            size = int(it.get("size") or 0)
+            quick_xor = ((it.get("file") or {}).get("hashes") or {}).get("quickXorHash") or ""
 
             download_url = f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{item_id}/content"
 
-            def _dl(dst: Path, _url=download_url) -> None:
-                self.client.stream_download(_url, dst)
+            def _dl(dst: Path, _url=download_url, _size=size, _qx=quick_xor) -> None:
+                self.client.stream_download(_url, dst, expected_size=_size, expected_quick_xor=_qx)
 
             yield ChangedItem(
                 name=name,
@@ -160,39 +479,181 @@ class GraphWatcher:
                 etag=etag,
                 last_modified=last_modified,
                 download_to=_dl,
+                size=size,
+                quick_xor_hash=quick_xor,
             )
 
-    def startup_scan(self) -> Iterator[ChangedItem]:
+    def _item_url(self, item_id: str) -> str:
+        return f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{item_id}?$select={ITEM_SELECT}"
+
+    def current_versions(self, items: List[ChangedItem]) -> Dict[str, Optional[ChangedItem]]:
+        """
+        Looks up the current metadata of many items with $batch round trips.
+        item_id -> current ChangedItem, or None when the item is gone (404);
+        items whose lookup failed are left out.
+        """
+        out: Dict[str, Optional[ChangedItem]] = {}
+        responses = self.client.batch_get_json([self._item_url(it.item_id) for it in items])
+        for it, resp in zip(items, responses):
+            if resp.status == 404:
+                out[it.item_id] = None
+            elif 200 <= resp.status < 300:
+                for current in self._yield_items_from_listing([resp.body]):
+                    out[it.item_id] = current
+            else:
+                self.log.warning("Metadata lookup failed for %s (status=%s)", it.name, resp.status)
+        return out
+
+    def _release_stable(self, coalescer: ChangeCoalescer, now: float) -> List[ChangedItem]:
+        """
+        Re-checks due items against Graph before releasing them: an item that changed since
+        the last delta pull goes back on hold (unless it is past max wait), a deleted one is dropped.
+        """
+        due = coalescer.due(now)
+        if not due:
+            return []
+        current = self.current_versions(due)
+        for held in due:
+            cur = current.get(held.item_id, held)
+            if cur is None:
+                self.log.info("Dropping held item (deleted): %s", held.name)
+                coalescer.pop(held.item_id)
+            elif (cur.etag, cur.last_modified) != (held.etag, held.last_modified):
+                coalescer.add(cur, now)
+        still_due = {it.item_id for it in coalescer.due(now)}
+        return [coalescer.pop(held.item_id) for held in due if held.item_id in still_due]
+
+    def listing_pages(self, url: str) -> Iterator[List[ChangedItem]]:
+        """
+        Excel items of a collection, one list per page, following @odata.nextLink.
+        Each page is parsed as it downloads and its response closed before the list is yielded,
+        so a slow consumer never holds a Graph connection open.
+        """
+        next_url: Optional[str] = url
+        while next_url:
+            page = self.client.stream_listing(next_url)
+            yield list(self._yield_items_from_listing(page))
+            next_url = page.next_link
+
+    def listing_items(self, url: str) -> Iterator[ChangedItem]:
+        """
+        Same items as listing_pages, flattened: a page's items follow as soon as that page is read.
+        """
+        for items in self.listing_pages(url):
+            yield from items
+
+    def startup_scan(self, state=None) -> Iterator[ChangedItem]:
+        """
+        One-time scan of current folder items (all pages).
+        With a state store, only items not yet processed are emitted, newest-modified first
+        (see reconcile.FolderReconciler).
+        """
+        if state is not None:
+            yield from FolderReconciler(self, state).work_list(self.folder_children_url())
+            return
+        yield from self.listing_items(self.folder_children_url())
+
+    def _delta_pass(self, url: str) -> Tuple[List[ChangedItem], Optional[str]]:
+        """
+        One full delta traversal (all @odata.nextLink pages).
+        Repeats of an item across pages collapse to the last one seen.
+        """
+        latest: Dict[str, ChangedItem] = {}
+        latest_delta = None
+        next_url = url
+        while next_url:
+            page = self.client.stream_listing(next_url)
+            for item in self._yield_items_from_listing(page):
+                latest.pop(item.item_id, None)
+                latest[item.item_id] = item
+
+            next_url = page.next_link
+            latest_delta = page.delta_link or latest_delta
+        return list(latest.values()), latest_delta
+
+    def _delta_stream(self, url: str) -> Generator[ChangedItem, None, Tuple[int, Optional[str]]]:
         """
-        One-time scan of current folder items.
-        Use when you want to reconcile SharePoint state vs local processed state.
+        One full delta traversal, each page's items yielded once that page has been read and its
+        response closed (no coalescing, so repeats across pages are not collapsed); the pipeline can
+        apply backpressure between items without stalling a socket Graph would time out.
+        Returns (items yielded, deltaLink).
         """
-        data = self.client.get_json(self._folder_children_url())
-        yield from self._yield_items_from_listing(data)
+        count = 0
+        latest_delta = None
+        next_url: Optional[str] = url
+        while next_url:
+            page = self.client.stream_listing(next_url)
+            items = list(self._yield_items_from_listing(page))
+            count += len(items)
+            yield from items
+            next_url = page.next_link
+            latest_delta = page.delta_link or latest_delta
+        return count, latest_delta
+
+    def _sleep(self, seconds: float) -> None:
+        if self.notifications is None:
+            time.sleep(seconds)
+            return
+        if self.notifications.wait(seconds):
+            self.log.info("Change notification received; pulling delta now")
+
+    def _keep_subscription(self) -> None:
+        if self.subscription is None:
+            return
+        try:
+            self.subscription.ensure()
+        except Exception:
+            # Safety poll still runs; try again next cycle
+            self.log.exception("Could not create/renew change notification subscription")
 
     def delta_changes(self) -> Iterator[ChangedItem]:
         """
         Delta loop:
-          - follows @odata.nextLink pages
-          - saves @odata.deltaLink for resume
+          - follows @odata.nextLink pages; without coalescing each page's items are emitted as soon
+            as that page has been read, so the pipeline starts on them while later pages are fetched
+          - saves @odata.deltaLink for resume (once the whole pass has been emitted)
+          - with coalesce_seconds > 0, holds each changed item until it has stopped changing
+            and emits only its latest version; a pass's deltaLink is persisted once every item
+            that pass (and the ones before it) reported has been released or dropped, so a
+            restart replays held items instead of losing them, and a busy folder that always
+            has something held still advances its checkpoint
+          - due items are confirmed with one $batch metadata lookup per 20 before release
         """
         url = self._delta_url()
+        coalescer = ChangeCoalescer(self.coalesce_seconds, self.coalesce_max_wait_seconds)
+        unreleased: deque = deque()   # (deltaLink, item ids that pass reported), oldest first
         while True:
-            latest_delta = None
-            next_url = url
+            self._keep_subscription()
+            if self.coalesce_seconds <= 0:
+                changes, latest_delta = yield from self._delta_stream(url)
+                if latest_delta:
+                    url = latest_delta
+                    self._persist_delta_link(latest_delta)
+                self._sleep(self.poller.record(changes))
+                continue
 
-            while next_url:
-                data = self.client.get_json(next_url)
-                yield from self._yield_items_from_listing(data)
+            items, latest_delta = self._delta_pass(url)
+            if latest_delta:
+                url = latest_delta
 
-                next_url = data.get("@odata.nextLink")
-                latest_delta = data.get("@odata.deltaLink") or latest_delta
+            interval = self.poller.record(len(items))
 
+            now = time.monotonic()
+            for item in items:
+                coalescer.add(item, now)
             if latest_delta:
-                self._persist_delta_link(latest_delta)
-                url = latest_delta
+                unreleased.append((latest_delta, {item.item_id for item in items}))
+            for item in self._release_stable(coalescer, now):
+                yield item
+            safe_delta = None
+            while unreleased and not any(item_id in coalescer for item_id in unreleased[0][1]):
+                safe_delta = unreleased.popleft()[0]
+            if safe_delta:
+                self._persist_delta_link(safe_delta)
 
-            time.sleep(self.poll_seconds)
+            # Re-poll when the next held item is due so its quiet period is confirmed first
+            wait = coalescer.seconds_until_due(time.monotonic())
+            self._sleep(interval if wait is None else min(interval, max(1.0, wait)))
 
     def iter_changed_items(self, state) -> Iterator[ChangedItem]:
         """
@@ -202,7 +663,7 @@ class GraphWatcher:
         """
         if self.initial_mode == "process_existing":
             self.log.info("Startup scan: enabled (process_existing)")
-            for item in self.startup_scan():
+            for item in self.startup_scan(state):
                 yield item
         else:
             self.log.info("Startup scan: disabled (ignore_existing)")
@@ -215,12 +676,13 @@ class GraphWatcher:
         """
         Runs one delta traversal to capture deltaLink, without yielding items.
         """
-        url = f"{GRAPH_ROOT}/drives/{self.drive_id}/items/{self.folder_item_id}/delta"
         latest_delta = None
-        next_url = url
+        next_url = self._initial_delta_url()
         while next_url:
-            data = self.client.get_json(next_url)
-            next_url = data.get("@odata.nextLink")
-            latest_delta = data.get("@odata.deltaLink") or latest_delta
+            page = self.client.stream_listing(next_url)
+            for _ in page:
+                pass
+            next_url = page.next_link
+            latest_delta = page.delta_link or latest_delta
         if latest_delta:
             self._persist_delta_link(latest_delta)
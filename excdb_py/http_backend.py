@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:  # optional: HTTP/2 backend (pip install "httpx[http2]")
+    import httpx
+except ImportError:
+    httpx = None
+
+
+log = logging.getLogger("http_backend")
+
+
+def _accept_encoding() -> str:
+    try:
+        import brotli  # noqa: F401  (requests/urllib3 decode br when it is installed)
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+class StreamedResponse:
+    """
+    Backend-neutral view of a streaming response.
+    """
+
+    def __init__(self, resp: Any, chunk_iter) -> None:
+        self._resp = resp
+        self._chunk_iter = chunk_iter
+        self.status_code: int = resp.status_code
+        self.headers = resp.headers
+        self.url = str(resp.url)
+
+    def raise_for_status(self) -> None:
+        self._resp.raise_for_status()
+
+    def iter_bytes(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        return self._chunk_iter(chunk_size)
+
+
+class RequestsBackend:
+    """
+    requests.Session with a keep-alive connection pool (HTTP/1.1).
+    pool_block=True: callers wait for a free connection instead of opening throwaway ones.
+    """
+
+    def __init__(self, pool_size: int = 16) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = _accept_encoding()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        timeout: float,
+        json: Optional[Any] = None,
+    ) -> Any:
+        return self.session.request(method, url, headers=headers, timeout=timeout, json=json)
+
+    @contextmanager
+    def stream(self, url: str, headers: Dict[str, str], timeout: float) -> Iterator[StreamedResponse]:
+        with self.session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+            yield StreamedResponse(r, lambda n: r.iter_content(chunk_size=n))
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class HttpxBackend:
+    """
+    httpx.Client with HTTP/2: one multiplexed connection per host serves many concurrent requests.
+    """
+
+    def __init__(self, pool_size: int = 16, http2: bool = True) -> None:
+        if httpx is None:
+            raise RuntimeError("GRAPH_HTTP_BACKEND=httpx requires: pip install \"httpx[http2]\"")
+        self.client = httpx.Client(
+            http2=http2,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={"Accept-Encoding": _accept_encoding()},
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        timeout: float,
+        json: Optional[Any] = None,
+    ) -> Any:
+        return self.client.request(method, url, headers=headers, timeout=timeout, json=json)
+
+    @contextmanager
+    def stream(self, url: str, headers: Dict[str, str], timeout: float) -> Iterator[StreamedResponse]:
+        with self.client.stream("GET", url, headers=headers, timeout=timeout) as r:
+            yield StreamedResponse(r, lambda n: r.iter_bytes(chunk_size=n))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_backend(kind: str = "requests", pool_size: int = 16):
+    """
+    kind:
+      - requests: HTTP/1.1 keep-alive pool (default)
+      - httpx: HTTP/2 via httpx (optional dependency)
+    """
+    kind = (kind or "requests").lower()
+    if kind == "requests":
+        return RequestsBackend(pool_size=pool_size)
+    if kind == "httpx":
+        return HttpxBackend(pool_size=pool_size)
+    raise ValueError(f"Unknown HTTP backend: {kind}")
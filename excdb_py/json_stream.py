@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any, Dict, Iterator, Optional
+
+
+_WS = " \t\r\n"
+_COMPACT_AT = 64 * 1024
+
+
+class ListingPage:
+    """
+    Incremental parser for one Graph collection page ({"value": [...], "@odata.nextLink": ...}).
+
+    Iterating yields the objects of "value" as soon as each one has fully arrived, so memory stays
+    at roughly one item plus one network chunk regardless of page size. Top-level properties
+    (next_link, delta_link, anything else in `extra`) are available once iteration has finished.
+    Built on json.JSONDecoder.raw_decode; no third-party parser needed.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.extra: Dict[str, Any] = {}
+
+    @property
+    def next_link(self) -> Optional[str]:
+        return self.extra.get("@odata.nextLink")
+
+    @property
+    def delta_link(self) -> Optional[str]:
+        return self.extra.get("@odata.deltaLink")
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                if self._pos >= _COMPACT_AT:
+                    self._buf = self._buf[self._pos:]
+                    self._pos = 0
+                self._buf += self._decoder.decode(chunk)
+                return True
+        self._buf += self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        """
+        Next non-whitespace char (not consumed); "" at end of input.
+        """
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, ch: str) -> None:
+        got = self._peek()
+        if got != ch:
+            raise ValueError(f"Malformed listing JSON: expected {ch!r}, got {got!r} at {self._pos}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A bare number/literal ending exactly at the buffer edge may continue in the next chunk
+            if end == len(self._buf) and not self._eof and not isinstance(value, (dict, list, str)):
+                if self._fill():
+                    continue
+            self._pos = end
+            return value
+
+    def close(self) -> None:
+        """
+        Releases the underlying response (closing the chunk generator exits its `with` block).
+        """
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        try:
+            yield from self._items()
+        finally:
+            # The closing "}" can arrive before the body's end: don't leave the connection open
+            self.close()
+
+    def _items(self) -> Iterator[Dict[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "value" and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        sep = self._peek()
+                        self._pos += 1
+                        if sep == "]":
+                            break
+                        if sep != ",":
+                            raise ValueError(f"Malformed listing JSON: unexpected {sep!r} in value array")
+            else:
+                self.extra[key] = self._value()
+
+            sep = self._peek()
+            self._pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"Malformed listing JSON: unexpected {sep!r} after {key!r}")
@@ -9,39 +9,103 @@ Orchestrates:
 
 Environment variables (minimum):
   TENANT_ID, CLIENT_ID
-  SP_DRIVE_ID, SP_FOLDER_ITEM_ID
+  SP_DRIVE_ID, SP_FOLDER_ITEM_ID                  (or WATCH_FOLDERS)
   ORACLE_DSN, ORACLE_USER, ORACLE_PASSWORD
 
 Optional:
+  WATCH_FOLDERS=DRIVE:FOLDER,...                 (optional; several folders in one process, replaces SP_*)
   STATE_DIR=.state
+  STATE_BACKEND=sqlite|json|oracle               (default sqlite; json = legacy file, oracle = shared by hosts)
+  COORDINATION=off|oracle                        (default off; oracle = lease table, several hosts split the work)
+  WORKER_ID=<name>                               (default host:pid; lease owner name)
+  LEASE_SECONDS=120                              (default 120; a dead worker's items are reclaimed after this)
+  LEASE_HEARTBEAT_SECONDS=30                     (default 30; lease renewal / deferred item retry interval)
   LANDING_DIR=landing
   PROCESSED_DIR=processed
   LOG_DIR=logs
-  POLL_SECONDS=30
+  POLL_SECONDS=30                                (shortest poll interval)
+  POLL_MAX_SECONDS=30                            (default POLL_SECONDS; higher = back off on empty polls)
+  POLL_BACKOFF=2.0                               (default 2.0; interval multiplier per empty poll)
+  NOTIFY_LISTEN=0.0.0.0:8085                     (optional; enables the change notification listener)
+  NOTIFY_PATH=/notifications                     (default /notifications)
+  NOTIFY_PUBLIC_URL=https://host/notifications   (optional; creates/renews the Graph subscription)
+  NOTIFY_CLIENT_STATE=<secret>                   (optional; notifications without it are ignored)
+  NOTIFY_SAFETY_POLL_SECONDS=900                 (default 900; polling interval while notifications are on)
+  COALESCE_SECONDS=0                             (default 0 = off; emit an item only after it is quiet this long)
+  COALESCE_MAX_WAIT_SECONDS=600                  (default 600; emit anyway if an item keeps changing)
+  GRAPH_HTTP_POOL_SIZE=16                        (default 16; keep-alive connections to Graph)
+  GRAPH_HTTP_BACKEND=requests|httpx              (default requests; httpx = HTTP/2, needs httpx[http2])
+  GRAPH_RATE_PER_SEC=10                          (default 10; steady Graph request rate, 0 = unlimited)
+  GRAPH_BURST=20                                 (default 20; requests allowed back-to-back above the rate)
+  GRAPH_MAX_RETRIES=5                            (default 5; retries of a throttled 429/503 response)
+  DOWNLOAD_WORKERS=4                             (default 4; concurrent Range requests per file)
+  DOWNLOAD_PART_MB=8                             (default 8; Range part size, resume granularity)
   INITIAL_MODE=process_existing|ignore_existing   (default process_existing)
   ORACLE_SWAP_MODE=view|synonym                  (default view)
   ORACLE_IDENT_MAX=30                            (default 30)
   ORACLE_VARCHAR2_LEN=4000                       (default 4000)
   ORACLE_GRANT_TO=ROLE1,ROLE2                    (optional)
+  ORACLE_LOAD_PARALLELISM=1                      (default 1; >1 loads sheets concurrently on a pool)
+  ORACLE_LOAD_MODE=full|delta                    (default full; delta patches a clone of the current version)
+  ORACLE_DELTA_KEYS=LOGICAL:COLUMN,...           (optional; per-table key column for delta updates)
+  ORACLE_DELTA_MAX_CHANGE_RATIO=0.5              (default 0.5; above this a delta falls back to full rebuild)
+  ORACLE_BATCH_MAX_MB=16                         (default 16; bind data ceiling per executemany batch)
+  ORACLE_BATCH_TARGET_SECONDS=0.5                (default 0.5; batch rows adapt toward this round trip time)
+  ORACLE_ARRAYSIZE=1000                          (default 1000; rows per fetch round trip)
+  ORACLE_PREFETCH_ROWS=1000                      (default 1000; rows returned with each query execute)
+  ORACLE_STMT_CACHE=50                           (default 50; parsed statements cached per connection)
+  ORACLE_ERROR_MODE=strict|tolerant              (default strict; tolerant = refused rows go to a reject file)
+  ORACLE_REJECT_MAX_RATIO=0.01                   (default 0.01; tolerant: more rejected rows keep the old version)
+  ORACLE_REJECT_MAX_ROWS=0                       (default 0 = no limit; tolerant: same, as a row count)
+  ORACLE_REJECT_TABLE=INGEST_REJECTS             (optional; tolerant: also record rejected rows in this table)
+  REJECT_DIR=rejects                             (default rejects; tolerant: per-load <physical>.csv files)
+  ORACLE_BULK_MODE=off|auto|always               (default off; direct-path APPEND_VALUES loads of new tables)
+  ORACLE_BULK_MIN_ROWS=250000                    (default 250000; auto: sheets with at least this many rows)
+  ORACLE_BULK_NOLOGGING=1                        (default 0; bulk tables load NOLOGGING - needs a backup after)
+  ORACLE_BULK_COMPRESS=1                         (default 0; bulk tables use basic table compression)
   RETAIN_VERSIONS=3                              (default 3)
   KEEP_PROCESSED_HISTORY=1                       (default 0)
   TRUNCATE_OVERFLOW=truncate|error               (default truncate)
+  TYPE_INFERENCE=off|sample|full                 (default off; NUMBER/DATE/TIMESTAMP/sized VARCHAR2)
+  TYPE_INFERENCE_SAMPLE_ROWS=10000               (default 10000; rows per sheet in sample mode)
+  XLSX_READER=default|stream|process             (default default; stream = zip + incremental XML parser, low memory;
+                                                  process = stream reader on a pool of worker processes)
+  PARSE_PROCESSES=0                              (default 0 = CPU count; worker processes for XLSX_READER=process)
+  PARSE_MAX_IN_FLIGHT=4                          (default 4; row batches a worker may run ahead of the loader)
+  PARSE_SPLIT_ROWS=250000                        (default 250000; larger sheets are parsed in row ranges)
+  PIPELINE_DOWNLOAD_WORKERS=2                    (default 2)
+  PIPELINE_PARSE_WORKERS=2                       (default 2)
+  PIPELINE_LOAD_WORKERS=1                        (default 1; raise with ORACLE_LOAD_PARALLELISM)
+  PIPELINE_QUEUE_SIZE=2                          (default 2; bounded hand-off queue between stages)
+  PIPELINE_MAX_IN_FLIGHT=8                       (default 8; watcher blocks when this many items are queued)
 """
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
-
-from graph_watcher import GraphWatcher, ChangedItem
-from state_store import StateStore
-from excel_introspect import WorkbookPlan, build_workbook_plan
+from typing import Dict, Any, List, Optional, Tuple
+
+from graph_watcher import GraphAuth, GraphClient, GraphWatcher, ChangedItem
+from rate_limit import GraphRateLimiter
+from change_notifications import NotificationListener, SubscriptionManager
+from state_store import ProcessedRecord, StateStore, SqliteStateStore, OracleStateStore, open_state_store
+from coordination import LeaseCoordinator
+from excel_introspect import SheetPlan, WorkbookPlan, build_workbook_plan
+from xlsx_stream import set_parse_pool, sheet_rows
+from parse_pool import ParsePool
+from column_types import ColumnType, infer_column_types
+from fingerprint import file_fingerprint, sheet_fingerprint
 from oracle_loader import OracleLoader, OracleConfig
+from pipeline import Stage, StagedPipeline
+from stream_merge import RoundRobinMerge
 
 
 def _env(name: str, default: str | None = None) -> str:
@@ -51,6 +115,43 @@ def _env(name: str, default: str | None = None) -> str:
     return v
 
 
+def _parse_mapping(raw: str) -> Dict[str, str]:
+    """
+    "A:X, B:Y" -> {"A": "X", "B": "Y"}
+    """
+    out: Dict[str, str] = {}
+    for part in raw.split(","):
+        if ":" not in part:
+            continue
+        k, v = part.split(":", 1)
+        if k.strip() and v.strip():
+            out[k.strip()] = v.strip()
+    return out
+
+
+def _parse_folders(raw: str) -> List[Tuple[str, str]]:
+    """
+    "DRIVE1:FOLDER1, DRIVE1:FOLDER2" -> [("DRIVE1", "FOLDER1"), ("DRIVE1", "FOLDER2")]
+    """
+    out: List[Tuple[str, str]] = []
+    for part in raw.split(","):
+        drive, _, folder = part.strip().partition(":")
+        if drive.strip() and folder.strip() and (drive.strip(), folder.strip()) not in out:
+            out.append((drive.strip(), folder.strip()))
+    return out
+
+
+def _state_file_name(name: str, key: str, shared: bool) -> str:
+    """
+    "delta_link.txt" -> "delta_link_<hash of key>.txt" when several folders/drives share STATE_DIR;
+    a single watched folder keeps the original name.
+    """
+    if not shared:
+        return name
+    stem, _, ext = name.rpartition(".")
+    return f"{stem}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.{ext}"
+
+
 def setup_logging(log_dir: Path) -> None:
     log_dir.mkdir(parents=True, exist_ok=True)
     log_file = log_dir / "ingest.log"
@@ -93,56 +194,185 @@ def safe_copy_processed(
         shutil.copy2(src_file, hist)
 
 
-def process_item(
-    loader: OracleLoader,
-    state: StateStore,
-    landing_dir: Path,
-    processed_dir: Path,
-    keep_processed_history: bool,
-    truncate_overflow: str,
-    item: ChangedItem,
-) -> None:
+@dataclass(frozen=True)
+class IngestContext:
+    loader: OracleLoader
+    state: StateStore | SqliteStateStore | OracleStateStore
+    landing_dir: Path
+    processed_dir: Path
+    keep_processed_history: bool
+    truncate_overflow: str
+    type_inference: str = "off"
+    type_sample_rows: int = 10000
+    leases: Optional[LeaseCoordinator] = None
+    xlsx_reader: str = "default"
+
+    def rows_path(self, local_path: Optional[Path]) -> Optional[Path]:
+        """
+        Workbook path for the streaming reader (in-process or on the parse pool),
+        or None to read through excel_introspect.
+        """
+        return local_path if self.xlsx_reader in ("stream", "process") else None
+
+
+@dataclass
+class WorkItem:
+    """
+    One changed workbook as it moves through download -> parse -> load.
+    """
+    item: ChangedItem
+    local_path: Optional[Path] = None
+    content_hash: str = ""
+    previous: Optional[ProcessedRecord] = None
+    plan: Optional[WorkbookPlan] = None
+    sheet_fps: Dict[str, str] = field(default_factory=dict)
+    changed: List[SheetPlan] = field(default_factory=list)
+    column_types: Dict[str, List[ColumnType]] = field(default_factory=dict)
+    row_counts: Dict[str, int] = field(default_factory=dict)
+
+
+def download_stage(ctx: IngestContext, item: ChangedItem) -> Optional[WorkItem]:
     log = logging.getLogger("process_item")
 
     # Decide if we should process based on stored etag/mtime
-    if state.is_processed(item_id=item.item_id, etag=item.etag, last_modified=item.last_modified):
+    if ctx.state.is_processed(item_id=item.item_id, etag=item.etag, last_modified=item.last_modified):
         log.info("Skip (already processed): %s", item.name)
-        return
+        return None
+    previous = ctx.state.get(item.item_id)
 
-    landing_dir.mkdir(parents=True, exist_ok=True)
-    local_path = landing_dir / item.name
+    ctx.landing_dir.mkdir(parents=True, exist_ok=True)
+    local_path = ctx.landing_dir / item.name
     log.info("Downloading: %s", item.name)
     item.download_to(local_path)
 
+    # New etag but identical bytes (metadata touch, re-upload): nothing to load
+    content_hash = file_fingerprint(local_path)
+    if previous and previous.content_hash == content_hash:
+        log.info("Skip (content unchanged, new etag): %s", item.name)
+        ctx.state.mark_processed(
+            item_id=item.item_id,
+            etag=item.etag,
+            last_modified=item.last_modified,
+            content_hash=content_hash,
+            sheets=previous.sheets,
+        )
+        ctx.state.save()
+        _remove_landing(local_path)
+        return None
+
+    return WorkItem(item=item, local_path=local_path, content_hash=content_hash, previous=previous)
+
+
+def parse_stage(ctx: IngestContext, work: WorkItem) -> Optional[WorkItem]:
+    log = logging.getLogger("process_item")
+    item = work.item
+    assert work.local_path is not None
+
     # Build workbook plan (per visible, non-blank sheet)
     plan: WorkbookPlan = build_workbook_plan(
-        xlsx_path=local_path,
-        truncate_overflow=truncate_overflow,
+        xlsx_path=work.local_path,
+        truncate_overflow=ctx.truncate_overflow,
     )
+    work.plan = plan
     if not plan.sheets:
         log.warning("No visible non-blank sheets found: %s", item.name)
-        state.mark_processed(item_id=item.item_id, etag=item.etag, last_modified=item.last_modified)
-        safe_copy_processed(local_path, processed_dir, plan.dataset_key, keep_processed_history)
+        ctx.state.mark_processed(
+            item_id=item.item_id, etag=item.etag, last_modified=item.last_modified, content_hash=work.content_hash,
+        )
+        ctx.state.save()
+        safe_copy_processed(work.local_path, ctx.processed_dir, plan.dataset_key, ctx.keep_processed_history)
+        return None
+
+    # Reload only sheets whose content fingerprint changed since the last processed version;
+    # the same pass counts rows, which picks the load strategy (ORACLE_BULK_MODE=auto)
+    def _fingerprint(s: SheetPlan) -> Tuple[str, int]:
+        rows = 0
+
+        def _counted(batches):
+            nonlocal rows
+            for batch in batches:
+                rows += len(batch)
+                yield batch
+
+        batches = sheet_rows(s, batch_size=5000, xlsx_path=ctx.rows_path(work.local_path))
+        return sheet_fingerprint(s.columns, _counted(batches)), rows
+
+    if ctx.xlsx_reader == "process" and len(plan.sheets) > 1:
+        # Sheets parse on the pool's processes; one thread per sheet keeps them all busy
+        with ThreadPoolExecutor(max_workers=len(plan.sheets), thread_name_prefix="sheet-fp") as ex:
+            results = list(ex.map(_fingerprint, plan.sheets))
+    else:
+        results = [_fingerprint(s) for s in plan.sheets]
+    for s, (fp, rows) in zip(plan.sheets, results):
+        work.sheet_fps[s.logical_name] = fp
+        work.row_counts[s.logical_name] = rows
+    previous_fps = work.previous.sheets if work.previous else {}
+    for s in plan.sheets:
+        if previous_fps.get(s.logical_name) != work.sheet_fps[s.logical_name]:
+            work.changed.append(s)
+        else:
+            log.info("Skip sheet (content unchanged): '%s' -> logical '%s'", s.sheet_name, s.logical_name)
+
+    # Optional typed columns instead of VARCHAR2 everywhere
+    if work.changed:
+        work.column_types = infer_column_types(
+            work.changed,
+            mode=ctx.type_inference,
+            sample_rows=ctx.type_sample_rows,
+            xlsx_path=ctx.rows_path(work.local_path),
+        )
+    return work
+
+
+def load_stage(ctx: IngestContext, work: WorkItem) -> None:
+    item = work.item
+    assert work.local_path is not None and work.plan is not None
+
+    # Another worker took the key over (our lease expired mid-flight): it will load this itself
+    if ctx.leases is not None and not ctx.leases.holds(pipeline_key(item)):
+        logging.getLogger("process_item").warning("Skip (lease lost): %s", item.name)
+        _remove_landing(work.local_path)
         return
 
     # Load each sheet into its own logical table name (filename or filename_sheet)
-    for sheet in plan.sheets:
-        log.info("Loading sheet '%s' -> logical '%s'", sheet.sheet_name, sheet.logical_name)
-        loader.load_sheet_atomic(
-            sheet_plan=sheet,
+    if work.changed:
+        ctx.loader.load_sheets(
+            sheet_plans=work.changed,
             source_file=item.name,
             source_item_id=item.item_id,
+            column_types=work.column_types,
+            row_counts=work.row_counts,
+            xlsx_path=ctx.rows_path(work.local_path),
         )
 
     # Mark processed and keep a local processed copy for operator sanity / diffing
-    state.mark_processed(item_id=item.item_id, etag=item.etag, last_modified=item.last_modified)
-    safe_copy_processed(local_path, processed_dir, plan.dataset_key, keep_processed_history)
+    ctx.state.mark_processed(
+        item_id=item.item_id,
+        etag=item.etag,
+        last_modified=item.last_modified,
+        content_hash=work.content_hash,
+        sheets=work.sheet_fps,
+    )
+    ctx.state.save()
+    safe_copy_processed(work.local_path, ctx.processed_dir, work.plan.dataset_key, ctx.keep_processed_history)
 
     # Optional: remove landing file
+    _remove_landing(work.local_path)
+
+
+def _remove_landing(local_path: Path) -> None:
     try:
         local_path.unlink(missing_ok=True)
     except Exception:
-        log.exception("Failed to remove landing file: %s", local_path)
+        logging.getLogger("process_item").exception("Failed to remove landing file: %s", local_path)
+
+
+def pipeline_key(item: ChangedItem) -> str:
+    """
+    Logical table names derive from the file name, so one name == one ordering lane.
+    This also keeps two versions of a workbook from sharing the landing path at once.
+    """
+    return item.name.lower()
 
 
 def main() -> int:
@@ -156,13 +386,22 @@ def main() -> int:
 
     tenant_id = _env("TENANT_ID")
     client_id = _env("CLIENT_ID")
-    drive_id = _env("SP_DRIVE_ID")
-    folder_item_id = _env("SP_FOLDER_ITEM_ID")
+    folders = _parse_folders(os.getenv("WATCH_FOLDERS", ""))
+    if not folders:
+        folders = [(_env("SP_DRIVE_ID"), _env("SP_FOLDER_ITEM_ID"))]
 
     poll_seconds = int(os.getenv("POLL_SECONDS", "30"))
     initial_mode = os.getenv("INITIAL_MODE", "process_existing").strip().lower()
     keep_processed_history = os.getenv("KEEP_PROCESSED_HISTORY", "0") == "1"
     truncate_overflow = os.getenv("TRUNCATE_OVERFLOW", "truncate").strip().lower()
+    type_inference = os.getenv("TYPE_INFERENCE", "off").strip().lower()
+    type_sample_rows = int(os.getenv("TYPE_INFERENCE_SAMPLE_ROWS", "10000"))
+    xlsx_reader = os.getenv("XLSX_READER", "default").strip().lower()
+    download_workers = int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", "2"))
+    parse_workers = int(os.getenv("PIPELINE_PARSE_WORKERS", "2"))
+    load_workers = int(os.getenv("PIPELINE_LOAD_WORKERS", "1"))
+    queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+    max_in_flight = int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "8"))
 
     oracle_cfg = OracleConfig(
         dsn=_env("ORACLE_DSN"),
@@ -173,37 +412,172 @@ def main() -> int:
         varchar2_len=int(os.getenv("ORACLE_VARCHAR2_LEN", "4000")),
         grant_to=[x.strip() for x in os.getenv("ORACLE_GRANT_TO", "").split(",") if x.strip()],
         retain_versions=int(os.getenv("RETAIN_VERSIONS", "3")),
+        parallelism=int(os.getenv("ORACLE_LOAD_PARALLELISM", "1")),
+        load_mode=os.getenv("ORACLE_LOAD_MODE", "full").strip().lower(),
+        delta_keys=_parse_mapping(os.getenv("ORACLE_DELTA_KEYS", "")),
+        delta_max_change_ratio=float(os.getenv("ORACLE_DELTA_MAX_CHANGE_RATIO", "0.5")),
+        batch_max_bytes=int(float(os.getenv("ORACLE_BATCH_MAX_MB", "16")) * 1024 * 1024),
+        batch_target_seconds=float(os.getenv("ORACLE_BATCH_TARGET_SECONDS", "0.5")),
+        arraysize=int(os.getenv("ORACLE_ARRAYSIZE", "1000")),
+        prefetch_rows=int(os.getenv("ORACLE_PREFETCH_ROWS", "1000")),
+        stmt_cache_size=int(os.getenv("ORACLE_STMT_CACHE", "50")),
+        error_mode=os.getenv("ORACLE_ERROR_MODE", "strict").strip().lower(),
+        reject_max_rows=int(os.getenv("ORACLE_REJECT_MAX_ROWS", "0")),
+        reject_max_ratio=float(os.getenv("ORACLE_REJECT_MAX_RATIO", "0.01")),
+        reject_dir=os.getenv("REJECT_DIR", "rejects"),
+        reject_table=os.getenv("ORACLE_REJECT_TABLE", "").strip(),
+        bulk_mode=os.getenv("ORACLE_BULK_MODE", "off").strip().lower(),
+        bulk_min_rows=int(os.getenv("ORACLE_BULK_MIN_ROWS", "250000")),
+        bulk_nologging=os.getenv("ORACLE_BULK_NOLOGGING", "0") == "1",
+        bulk_compress=os.getenv("ORACLE_BULK_COMPRESS", "0") == "1",
     )
 
-    state = StateStore(state_dir=state_dir)
-    state.load()
-
-    watcher = GraphWatcher(
-        tenant_id=tenant_id,
-        client_id=client_id,
-        drive_id=drive_id,
-        folder_item_id=folder_item_id,
+    state = open_state_store(
         state_dir=state_dir,
-        poll_seconds=poll_seconds,
-        initial_mode=initial_mode,
+        backend=os.getenv("STATE_BACKEND", "sqlite").strip().lower(),
+        oracle_dsn=oracle_cfg.dsn,
+        oracle_user=oracle_cfg.user,
+        oracle_password=oracle_cfg.password,
+    )
+
+    leases = None
+    if os.getenv("COORDINATION", "off").strip().lower() == "oracle":
+        if not isinstance(state, OracleStateStore):
+            log.warning("COORDINATION=oracle without STATE_BACKEND=oracle: workers cannot see each other's progress")
+        leases = LeaseCoordinator(
+            cfg=oracle_cfg,
+            state=state,
+            worker_id=os.getenv("WORKER_ID", "").strip(),
+            lease_seconds=int(os.getenv("LEASE_SECONDS", "120")),
+            heartbeat_seconds=int(os.getenv("LEASE_HEARTBEAT_SECONDS", "30")),
+        )
+
+    notifications = None
+    notify_listen = os.getenv("NOTIFY_LISTEN", "").strip()
+    notify_client_state = os.getenv("NOTIFY_CLIENT_STATE", "").strip()
+    if notify_listen:
+        host, _, port = notify_listen.rpartition(":")
+        notifications = NotificationListener(
+            host=host or "0.0.0.0",
+            port=int(port),
+            path=os.getenv("NOTIFY_PATH", "/notifications"),
+            client_state=notify_client_state,
+        )
+        notifications.start()
+
+    # One token holder and one HTTP pool (and below, one Oracle pool) for every watched folder
+    client = GraphClient(
+        GraphAuth(tenant_id=tenant_id, client_id=client_id, cache_path=state_dir / "msal_cache.json"),
+        pool_size=int(os.getenv("GRAPH_HTTP_POOL_SIZE", "16")),
+        backend=os.getenv("GRAPH_HTTP_BACKEND", "requests").strip().lower(),
+        download_workers=int(os.getenv("DOWNLOAD_WORKERS", "4")),
+        download_part_size=int(os.getenv("DOWNLOAD_PART_MB", "8")) * 1024 * 1024,
+        rate_limiter=GraphRateLimiter(
+            rate_per_sec=float(os.getenv("GRAPH_RATE_PER_SEC", "10")),
+            burst=int(os.getenv("GRAPH_BURST", "20")),
+            max_retries=int(os.getenv("GRAPH_MAX_RETRIES", "5")),
+        ),
     )
 
-    with OracleLoader(cfg=oracle_cfg) as loader:
-        log.info("Watcher started (poll=%ss, initial_mode=%s)", poll_seconds, initial_mode)
-        for changed in watcher.iter_changed_items(state=state):
-            try:
-                process_item(
-                    loader=loader,
-                    state=state,
-                    landing_dir=landing_dir,
-                    processed_dir=processed_dir,
-                    keep_processed_history=keep_processed_history,
-                    truncate_overflow=truncate_overflow,
-                    item=changed,
-                )
-                state.save()
-            except Exception:
-                log.exception("Failed processing item: %s", changed.name)
+    # Drive subscriptions cover the whole drive, so folders on the same drive share one
+    subscriptions: Dict[str, SubscriptionManager] = {}
+    notify_public_url = os.getenv("NOTIFY_PUBLIC_URL", "").strip()
+    drives = sorted({d for d, _ in folders})
+    if notifications is not None and notify_public_url:
+        for d in drives:
+            subscriptions[d] = SubscriptionManager(
+                client=client,
+                drive_id=d,
+                notification_url=notify_public_url,
+                client_state=notify_client_state,
+                state_path=state_dir / _state_file_name("subscription.json", d, shared=len(drives) > 1),
+            )
+
+    watchers = [
+        GraphWatcher(
+            tenant_id=tenant_id,
+            client_id=client_id,
+            drive_id=drive_id,
+            folder_item_id=folder_item_id,
+            state_dir=state_dir,
+            poll_seconds=poll_seconds,
+            initial_mode=initial_mode,
+            coalesce_seconds=float(os.getenv("COALESCE_SECONDS", "0")),
+            coalesce_max_wait_seconds=float(os.getenv("COALESCE_MAX_WAIT_SECONDS", "600")),
+            notifications=notifications,
+            subscription=subscriptions.get(drive_id),
+            safety_poll_seconds=int(os.getenv("NOTIFY_SAFETY_POLL_SECONDS", "900")),
+            poll_max_seconds=int(os.getenv("POLL_MAX_SECONDS", str(poll_seconds))),
+            poll_backoff=float(os.getenv("POLL_BACKOFF", "2.0")),
+            client=client,
+            delta_link_name=_state_file_name(
+                "delta_link.txt", f"{drive_id}:{folder_item_id}", shared=len(folders) > 1,
+            ),
+        )
+        for drive_id, folder_item_id in folders
+    ]
+
+    parse_pool = None
+    if xlsx_reader == "process":
+        parse_pool = ParsePool(
+            processes=int(os.getenv("PARSE_PROCESSES", "0")),
+            max_in_flight=int(os.getenv("PARSE_MAX_IN_FLIGHT", "4")),
+            split_rows=int(os.getenv("PARSE_SPLIT_ROWS", "250000")),
+        )
+
+    try:
+        if parse_pool is not None:
+            parse_pool.start()
+            set_parse_pool(parse_pool)
+        with OracleLoader(cfg=oracle_cfg) as loader:
+            ctx = IngestContext(
+                loader=loader,
+                state=state,
+                landing_dir=landing_dir,
+                processed_dir=processed_dir,
+                keep_processed_history=keep_processed_history,
+                truncate_overflow=truncate_overflow,
+                type_inference=type_inference,
+                type_sample_rows=type_sample_rows,
+                leases=leases,
+                xlsx_reader=xlsx_reader,
+            )
+            stages = [
+                Stage("download", lambda it: download_stage(ctx, it), download_workers),
+                Stage("parse", lambda w: parse_stage(ctx, w), parse_workers),
+                Stage("load", lambda w: load_stage(ctx, w), load_workers),
+            ]
+            pipeline = StagedPipeline(
+                stages=stages,
+                queue_size=queue_size,
+                max_in_flight=max_in_flight,
+                on_finish=leases.release if leases is not None else None,
+            )
+            log.info(
+                "Watcher started (folders=%s, poll=%ss, initial_mode=%s, load_parallelism=%s, pipeline=%s)",
+                len(watchers), poll_seconds, initial_mode, loader.parallelism,
+                "/".join(f"{st.name}x{st.workers}" for st in stages),
+            )
+            streams = [(w.folder_item_id, w.iter_changed_items(state=state)) for w in watchers]
+            with pipeline:
+                if leases is not None:
+                    leases.start(submit=pipeline.submit)
+                for changed in RoundRobinMerge(streams):
+                    if leases is not None:
+                        leases.offer(pipeline_key(changed), changed)
+                    else:
+                        pipeline.submit(pipeline_key(changed), changed)
+    finally:
+        if leases is not None:
+            leases.close()
+        # Commit any batched state writes
+        state.close()
+        client.close()
+        if notifications is not None:
+            notifications.close()
+        if parse_pool is not None:
+            set_parse_pool(None)
+            parse_pool.close()
 
     return 0
 
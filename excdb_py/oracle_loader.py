@@ -1,18 +1,40 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Tuple, Optional
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 
 import oracledb
 
-from excel_introspect import SheetPlan, iter_sheet_rows, sanitize_identifier
+from batching import AdaptiveBatcher
+from column_types import (
+    DATE, NUMBER, TIMESTAMP, ColumnType, TypeMismatch, demote_to_varchar2, mismatched_columns, typed_batches,
+)
+from excel_introspect import SheetPlan, sanitize_identifier
+from fingerprint import normalize_value, row_fingerprint
+from rejects import RejectSink
+from xlsx_stream import sheet_rows
 
 
 log = logging.getLogger("oracle_loader")
 
+# Hidden per-row fingerprint column used by delta mode (never exposed through the logical view)
+FP_COLUMN = "ROW_FP__"
+
+# _physical_name's "_YYYYMMDD_HHMMSSmmm" suffix, as a LIKE pattern (ESCAPE '\') and as a regex
+_STAMP_LEN = 19
+_STAMP_LIKE = r"\_" + "_" * 8 + r"\_" + "_" * 9
+_STAMP_RE = r"_\d{8}_\d{9}"
+
 
 @dataclass(frozen=True)
 class OracleConfig:
@@ -24,17 +46,157 @@ class OracleConfig:
     varchar2_len: int = 4000
     grant_to: List[str] = None
     retain_versions: int = 3
+    parallelism: int = 1             # >1 => pooled mode, sheets load concurrently
+    load_mode: str = "full"          # full|delta
+    delta_keys: Dict[str, str] = None        # logical_name -> key column (delta mode, optional)
+    delta_max_change_ratio: float = 0.5      # above this, a full rebuild is cheaper than a delta
+    batch_max_bytes: int = 16 * 1024 * 1024  # ceiling on estimated bind data per executemany
+    batch_target_seconds: float = 0.5        # executemany round trip the batch size is tuned toward
+    arraysize: int = 1000                    # rows per fetch round trip (delta reads whole fingerprint columns)
+    prefetch_rows: int = 1000                # rows returned with the execute itself
+    stmt_cache_size: int = 50                # parsed statements kept per connection
+    error_mode: str = "strict"               # strict|tolerant (tolerant: refused rows are rejected, load goes on)
+    reject_max_rows: int = 0                 # tolerant: more rejects than this keeps the old version (0 = no limit)
+    reject_max_ratio: float = 0.01           # tolerant: same, as a share of the rows sent
+    reject_dir: str = "rejects"              # tolerant: per-load <physical>.csv reject files
+    reject_table: str = ""                   # tolerant: optional shared error table for rejected rows
+    bulk_mode: str = "off"                   # off|auto|always: direct-path (APPEND_VALUES) loads of new tables
+    bulk_min_rows: int = 250_000             # auto: sheets with at least this many rows load direct-path
+    bulk_nologging: bool = False             # bulk tables load NOLOGGING (minimal redo; back up afterwards)
+    bulk_compress: bool = False              # bulk tables use basic table compression
+
+
+class RejectThresholdExceeded(RuntimeError):
+    """
+    Raised in tolerant mode when a sheet rejects more rows than allowed; the new physical
+    table is dropped and the logical name keeps pointing at the previous version.
+    """
+
+    def __init__(self, sheet_name: str, rejected: int, sent: int) -> None:
+        super().__init__(f"Sheet '{sheet_name}': {rejected} of {sent} rows rejected, above the reject threshold")
+        self.rejected = rejected
+        self.sent = sent
+
+
+_BIND_TYPES = {NUMBER: oracledb.DB_TYPE_NUMBER, DATE: oracledb.DB_TYPE_DATE, TIMESTAMP: oracledb.DB_TYPE_TIMESTAMP}
+
+
+class StatementCursors:
+    """
+    Cursor reuse for one connection while it is checked out (one sheet load):
+      - one cursor for all DDL and queries, with fetch arraysize / prefetchrows applied
+      - one cursor per DML statement, prepared once; executemany() declares the bind types
+        (setinputsizes) before every batch, so the driver neither re-infers them nor resizes
+        buffers when value lengths vary between batches
+    Parsed statements also survive across checkouts in the connection's statement cache.
+    """
+
+    def __init__(self, conn: oracledb.Connection, arraysize: int = 1000, prefetch_rows: int = 1000) -> None:
+        self.conn = conn
+        self.arraysize = max(1, arraysize)
+        self.prefetch_rows = max(0, prefetch_rows)
+        self._shared: Optional[oracledb.Cursor] = None
+        self._dml: Dict[str, oracledb.Cursor] = {}
+
+    def cursor(self) -> oracledb.Cursor:
+        if self._shared is None:
+            cur = self.conn.cursor()
+            cur.arraysize = self.arraysize
+            cur.prefetchrows = self.prefetch_rows
+            self._shared = cur
+        return self._shared
+
+    def executemany(
+        self,
+        sql: str,
+        rows: List[tuple],
+        input_sizes: Optional[List[Any]] = None,
+        batcherrors: bool = False,
+    ) -> List[Any]:
+        """
+        Runs a prepared DML for `rows`; with batcherrors, refused rows don't fail the call and
+        their errors (.offset into rows, .message) are returned.
+        """
+        cur = self._dml.get(sql)
+        if cur is None:
+            cur = self.conn.cursor()
+            cur.prepare(sql)
+            self._dml[sql] = cur
+        if input_sizes:
+            cur.setinputsizes(*input_sizes)
+        cur.executemany(None, rows, batcherrors=batcherrors)
+        return cur.getbatcherrors() if batcherrors else []
+
+    def close(self) -> None:
+        cursors = list(self._dml.values()) + ([self._shared] if self._shared is not None else [])
+        self._dml.clear()
+        self._shared = None
+        for cur in cursors:
+            try:
+                cur.close()
+            except oracledb.Error:
+                pass
+
+
+def bind_sizes(sheet_plan: SheetPlan, column_types: Optional[List[ColumnType]]) -> List[Any]:
+    """
+    setinputsizes() arguments for a sheet's columns: the DB type of NUMBER/DATE/TIMESTAMP columns,
+    and for text the VARCHAR2 byte length the column was created with, so the driver allocates
+    bind buffers for the inferred width rather than varchar2_len. Untyped sheets have no narrower
+    bound than varchar2_len.
+    """
+    if not column_types:
+        return [sheet_plan.varchar2_len] * len(sheet_plan.columns)
+    return [_BIND_TYPES.get(t.kind, t.length or sheet_plan.varchar2_len) for t in column_types]
 
 
 class OracleLoader:
+    """
+    Connection modes:
+      - parallelism == 1: one dedicated connection, sheets load one at a time
+      - parallelism  > 1: oracledb pool, each sheet loads on its own pooled connection
+
+    Every sheet keeps its own create -> load -> swap transaction either way.
+    """
+
     def __init__(self, cfg: OracleConfig) -> None:
         self.cfg = cfg
         self.conn: Optional[oracledb.Connection] = None
+        self.pool: Optional[oracledb.ConnectionPool] = None
+        # Serializes use of the single connection if callers share the loader across threads
+        self._conn_lock = threading.Lock()
+        self._cursors: Dict[int, StatementCursors] = {}
+        self._reject_table_ready = False
+        # Unique physical names: stamps only ever increase within this process
+        self._stamp_lock = threading.Lock()
+        self._last_stamp: Optional[datetime] = None
+        # Physical tables created by a load attempt that has not swapped yet (safe to drop on failure)
+        self._created: set = set()
+
+    @property
+    def parallelism(self) -> int:
+        return max(1, int(self.cfg.parallelism or 1))
 
     def __enter__(self) -> "OracleLoader":
         # Thin mode by default
-        self.conn = oracledb.connect(user=self.cfg.user, password=self.cfg.password, dsn=self.cfg.dsn)
-        self.conn.autocommit = False
+        if self.parallelism > 1:
+            self.pool = oracledb.create_pool(
+                user=self.cfg.user,
+                password=self.cfg.password,
+                dsn=self.cfg.dsn,
+                min=1,
+                max=self.parallelism,
+                increment=1,
+                stmtcachesize=self.cfg.stmt_cache_size,
+            )
+        else:
+            self.conn = oracledb.connect(
+                user=self.cfg.user,
+                password=self.cfg.password,
+                dsn=self.cfg.dsn,
+                stmtcachesize=self.cfg.stmt_cache_size,
+            )
+            self.conn.autocommit = False
         return self
 
     def __exit__(self, exc_type, exc, tb) -> None:
@@ -47,86 +209,194 @@ class OracleLoader:
         finally:
             if self.conn:
                 self.conn.close()
+            if self.pool:
+                self.pool.close(force=True)
 
-    def _exec(self, sql: str, params=None) -> None:
-        assert self.conn is not None
-        cur = self.conn.cursor()
-        try:
-            cur.execute(sql, params or {})
-        finally:
-            cur.close()
-
-    def _query(self, sql: str, params=None) -> List[Tuple]:
-        assert self.conn is not None
-        cur = self.conn.cursor()
-        try:
-            cur.execute(sql, params or {})
-            return cur.fetchall()
-        finally:
-            cur.close()
+    @contextmanager
+    def _connection(self) -> Iterator[oracledb.Connection]:
+        """
+        Yields a connection for one unit of work (one sheet).
+        Pooled connections are returned to the pool afterwards.
+        """
+        if self.pool is not None:
+            conn = self.pool.acquire()
+            conn.autocommit = False
+            try:
+                yield conn
+            finally:
+                self._close_statements(conn)
+                self.pool.release(conn)
+        else:
+            assert self.conn is not None
+            with self._conn_lock:
+                try:
+                    yield self.conn
+                finally:
+                    self._close_statements(self.conn)
+
+    def _statements(self, conn: oracledb.Connection) -> StatementCursors:
+        stmts = self._cursors.get(id(conn))
+        if stmts is None or stmts.conn is not conn:
+            stmts = StatementCursors(conn, arraysize=self.cfg.arraysize, prefetch_rows=self.cfg.prefetch_rows)
+            self._cursors[id(conn)] = stmts
+        return stmts
+
+    def _close_statements(self, conn: oracledb.Connection) -> None:
+        stmts = self._cursors.pop(id(conn), None)
+        if stmts is not None:
+            stmts.close()
+
+    def _exec(self, conn: oracledb.Connection, sql: str, params=None) -> None:
+        self._statements(conn).cursor().execute(sql, params or {})
+
+    def _query(self, conn: oracledb.Connection, sql: str, params=None) -> List[Tuple]:
+        cur = self._statements(conn).cursor()
+        cur.execute(sql, params or {})
+        return cur.fetchall()
+
+    def _physical_base(self, logical_name: str) -> str:
+        """
+        PHYS_<logical>, sanitized separately so truncation to ident_max never eats the stamp.
+        A name that has to be cut keeps a short hash of the full logical name instead of its tail,
+        so two long names with a common prefix never share a base (nor each other's cleanup).
+        """
+        budget = self.cfg.ident_max - _STAMP_LEN
+        base = sanitize_identifier(f"PHYS_{logical_name}", max_len=budget + 1, prefix="T")
+        if len(base) <= budget:
+            return base
+        digest = hashlib.sha1(logical_name.encode("utf-8")).hexdigest()[:6].upper()
+        return f"{base[:budget - 7].rstrip('_')}_{digest}"
 
     def _physical_name(self, logical_name: str) -> str:
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        raw = f"PHYS_{logical_name}_{stamp}"
-        return sanitize_identifier(raw, max_len=self.cfg.ident_max, prefix="T")
+        """
+        PHYS_<logical>_YYYYMMDD_HHMMSSmmm: millisecond stamp, bumped when two loads ask in the
+        same millisecond, so a retry or a second version in the same second never reuses a name.
+        Names still sort by age (_cleanup_old_versions relies on that).
+        """
+        with self._stamp_lock:
+            now = datetime.now()
+            now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+            if self._last_stamp is not None and now <= self._last_stamp:
+                now = self._last_stamp + timedelta(milliseconds=1)
+            self._last_stamp = now
+        stamp = f"{now:%Y%m%d_%H%M%S}{now.microsecond // 1000:03d}"
+        return f"{self._physical_base(logical_name)}_{stamp}"
+
+    def _create_physical(self, conn: oracledb.Connection, physical: str, sql: str) -> None:
+        self._exec(conn, sql)
+        with self._stamp_lock:
+            self._created.add(physical)
+
+    def _discard_physical(self, conn: oracledb.Connection, physical: str) -> None:
+        """
+        Drops `physical` after a failed attempt, but only if that attempt created it and has not
+        swapped it in: a name clash (ORA-00955) must never drop someone else's table.
+        """
+        with self._stamp_lock:
+            if physical not in self._created:
+                return
+            self._created.discard(physical)
+        self._drop_table_if_exists(conn, physical)
 
     def _logical_name(self, logical_name: str) -> str:
         # Keep logical stable; optionally prefix to avoid collisions
         return sanitize_identifier(f"LOG_{logical_name}", max_len=self.cfg.ident_max, prefix="T")
 
-    def _create_table(self, table_name: str, columns: List[str], varchar2_len: int) -> None:
-        cols = ", ".join([f"{c} VARCHAR2({varchar2_len})" for c in columns])
+    def _create_table(
+        self,
+        conn: oracledb.Connection,
+        table_name: str,
+        columns: List[str],
+        varchar2_len: int,
+        column_types: Optional[List[ColumnType]] = None,
+        fingerprinted: bool = False,
+        direct_path: bool = False,
+    ) -> None:
+        if column_types:
+            cols = ", ".join([f"{c} {t.ddl()}" for c, t in zip(columns, column_types)])
+        else:
+            cols = ", ".join([f"{c} VARCHAR2({varchar2_len})" for c in columns])
+        if fingerprinted:
+            cols += f", {FP_COLUMN} VARCHAR2(40)"
         sql = f"CREATE TABLE {table_name} ({cols})"
-        self._exec(sql)
+        if direct_path and self.cfg.bulk_nologging:
+            sql += " NOLOGGING"
+        if direct_path and self.cfg.bulk_compress:
+            sql += " COMPRESS"   # basic compression only applies to direct-path loaded blocks
+        self._create_physical(conn, table_name, sql)
 
-    def _drop_table_if_exists(self, table_name: str) -> None:
+    def _drop_table_if_exists(self, conn: oracledb.Connection, table_name: str) -> None:
         # Best-effort drop
         try:
-            self._exec(f"DROP TABLE {table_name} PURGE")
+            self._exec(conn, f"DROP TABLE {table_name} PURGE")
         except oracledb.DatabaseError as e:
             msg = str(e)
             if "ORA-00942" in msg:  # table or view does not exist
                 return
             raise
 
-    def _swap_logical(self, logical: str, physical: str, columns: List[str]) -> None:
+    def _swap_logical(self, conn: oracledb.Connection, logical: str, physical: str, columns: List[str]) -> None:
         mode = (self.cfg.swap_mode or "view").lower()
         if mode == "synonym":
-            self._exec(f"CREATE OR REPLACE SYNONYM {logical} FOR {physical}")
+            self._exec(conn, f"CREATE OR REPLACE SYNONYM {logical} FOR {physical}")
         else:
             # View is usually the safest: privileges remain stable and Tableau can query it.
-            self._exec(f"CREATE OR REPLACE VIEW {logical} AS SELECT * FROM {physical}")
+            # Explicit column list keeps bookkeeping columns (ROW_FP__) out of the view.
+            col_list = ", ".join(columns)
+            self._exec(conn, f"CREATE OR REPLACE VIEW {logical} AS SELECT {col_list} FROM {physical}")
 
-    def _grant_select(self, object_name: str) -> None:
+    def _grant_select(self, conn: oracledb.Connection, object_name: str) -> None:
         grantees = self.cfg.grant_to or []
         for g in grantees:
-            self._exec(f"GRANT SELECT ON {object_name} TO {g}")
+            self._exec(conn, f"GRANT SELECT ON {object_name} TO {g}")
 
-    def _cleanup_old_versions(self, logical_name: str) -> None:
+    def _cleanup_old_versions(self, conn: oracledb.Connection, logical_name: str) -> None:
         """
         Keep newest N physical tables for this logical base.
+        Only tables named exactly <base>_YYYYMMDD_HHMMSSmmm (see _physical_name) are candidates,
+        and a table any view or synonym still reads from is never dropped.
         """
         keep = max(0, int(self.cfg.retain_versions or 0))
         if keep == 0:
             return
 
-        # Physical tables are prefixed PHYS_<logical>_YYYYMMDD_HHMMSS (sanitized).
-        # We select by LIKE 'PHYS_<logical>%'
-        prefix = sanitize_identifier(f"PHYS_{logical_name}_", max_len=self.cfg.ident_max, prefix="T")
-        like = prefix + "%"
-
+        base = self._physical_base(logical_name)
+        like = base.replace("_", "\\_") + _STAMP_LIKE   # sanitized names hold no other LIKE wildcard
+        exact = re.compile(re.escape(base) + _STAMP_RE + "$")
         rows = self._query(
-            "SELECT table_name FROM user_tables WHERE table_name LIKE :like ORDER BY table_name DESC",
+            conn,
+            "SELECT table_name FROM user_tables WHERE table_name LIKE :like ESCAPE '\\' ORDER BY table_name DESC",
             {"like": like},
         )
-        names = [r[0] for r in rows]
+        names = [r[0] for r in rows if exact.match(r[0])]
+        if len(names) <= keep:
+            return
+
+        referenced = {r[0] for r in self._query(
+            conn,
+            "SELECT referenced_name FROM user_dependencies "
+            "WHERE referenced_type = 'TABLE' AND referenced_name LIKE :like ESCAPE '\\' "
+            "UNION SELECT table_name FROM user_synonyms WHERE table_name LIKE :like ESCAPE '\\'",
+            {"like": like},
+        )}
         for old in names[keep:]:
+            if old in referenced:
+                log.info("Keeping old table still referenced by a view or synonym: %s", old)
+                continue
             try:
-                self._exec(f"DROP TABLE {old} PURGE")
+                self._exec(conn, f"DROP TABLE {old} PURGE")
             except Exception:
                 log.exception("Failed dropping old table: %s", old)
 
-    def load_sheet_atomic(self, sheet_plan: SheetPlan, source_file: str, source_item_id: str) -> None:
+    def load_sheet_atomic(
+        self,
+        sheet_plan: SheetPlan,
+        source_file: str,
+        source_item_id: str,
+        column_types: Optional[List[ColumnType]] = None,
+        xlsx_path: Optional[Path] = None,
+        row_count: Optional[int] = None,
+    ) -> None:
         """
         Atomic replacement:
           1) create physical table
@@ -134,60 +404,505 @@ class OracleLoader:
           3) swap logical (view/synonym)
           4) grant select (mode-dependent)
           5) cleanup old physical versions
+
+        With column_types, the table is created typed and values are converted before binding.
+        A value that does not fit demotes its column, and every other column with a value that
+        does not fit, to VARCHAR2; the sheet is then rebuilt once.
+        With xlsx_path, rows come from the streaming reader (xlsx_stream) instead of excel_introspect.
+        In tolerant mode (error_mode="tolerant") rows the database refuses are rejected instead of
+        failing the sheet; above the reject threshold RejectThresholdExceeded is raised before the swap.
+        row_count (rows in the sheet, when known) picks direct-path loading in bulk_mode="auto".
+        """
+        with self._connection() as conn:
+            while True:
+                try:
+                    self._load_sheet_atomic(
+                        conn, sheet_plan, source_file, source_item_id, column_types, xlsx_path, row_count,
+                    )
+                    return
+                except TypeMismatch as e:
+                    assert column_types is not None
+                    # One scan finds every column that doesn't fit, so N bad columns cost one reload, not N
+                    bad = mismatched_columns(sheet_plan, column_types, xlsx_path)
+                    bad.setdefault(e.column_index, e.value)
+                    for i, value in sorted(bad.items()):
+                        log.warning(
+                            "Sheet '%s' column %s: value %r does not fit %s; falling back to VARCHAR2.",
+                            sheet_plan.sheet_name, sheet_plan.columns[i], value, column_types[i].ddl(),
+                        )
+                        column_types = demote_to_varchar2(column_types, i, sheet_plan.varchar2_len)
+                    log.warning("Sheet '%s': reloading with %s column(s) demoted.", sheet_plan.sheet_name, len(bad))
+
+    def load_sheets(
+        self,
+        sheet_plans: List[SheetPlan],
+        source_file: str,
+        source_item_id: str,
+        column_types: Optional[Dict[str, List[ColumnType]]] = None,
+        xlsx_path: Optional[Path] = None,
+        row_counts: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Loads independent sheets, up to `parallelism` at a time.
+        Each sheet is still its own atomic create -> load -> swap; a failed sheet
+        leaves its logical name untouched and does not stop the other sheets, whether
+        they load one at a time or concurrently. Every failure is logged, and the first
+        one (in sheet order) is re-raised once every sheet has finished.
+        column_types: logical_name -> inferred types (see column_types.infer_column_types).
+        row_counts: logical_name -> data rows, for the bulk load strategy.
         """
-        assert self.conn is not None
-        cur = self.conn.cursor()
+        types_by_logical = column_types or {}
+        rows_by_logical = row_counts or {}
+
+        def _load(sheet: SheetPlan) -> None:
+            log.info("Loading sheet '%s' -> logical '%s'", sheet.sheet_name, sheet.logical_name)
+            self.load_sheet_atomic(
+                sheet_plan=sheet,
+                source_file=source_file,
+                source_item_id=source_item_id,
+                column_types=types_by_logical.get(sheet.logical_name),
+                xlsx_path=xlsx_path,
+                row_count=rows_by_logical.get(sheet.logical_name),
+            )
+
+        first_error: Optional[BaseException] = None
+
+        def _failed(sheet: SheetPlan, e: Exception) -> None:
+            nonlocal first_error
+            log.error("Sheet load failed (file=%s sheet=%s): %s", source_file, sheet.sheet_name, e)
+            if first_error is None:
+                first_error = e
+
+        if self.parallelism == 1 or len(sheet_plans) <= 1:
+            for sheet in sheet_plans:
+                try:
+                    _load(sheet)
+                except Exception as e:
+                    _failed(sheet, e)
+        else:
+            workers = min(self.parallelism, len(sheet_plans))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheet-load") as ex:
+                futures = [(sheet, ex.submit(_load, sheet)) for sheet in sheet_plans]
+                for sheet, fut in futures:
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        _failed(sheet, e)
+        if first_error is not None:
+            raise first_error
+
+    def _delta_enabled(self) -> bool:
+        if (self.cfg.load_mode or "full").lower() != "delta":
+            return False
+        # The fingerprint column must stay hidden, which only a view can do.
+        return (self.cfg.swap_mode or "view").lower() != "synonym"
+
+    def _current_physical(self, conn: oracledb.Connection, logical: str) -> Optional[str]:
+        rows = self._query(
+            conn,
+            "SELECT referenced_name FROM user_dependencies "
+            "WHERE name = :name AND type = 'VIEW' AND referenced_type = 'TABLE'",
+            {"name": logical},
+        )
+        return rows[0][0] if len(rows) == 1 else None
 
-        logical = self._logical_name(sheet_plan.logical_name)
-        physical = self._physical_name(sheet_plan.logical_name)
+    def _table_signature(self, conn: oracledb.Connection, table_name: str) -> List[Tuple[str, str]]:
+        rows = self._query(
+            conn,
+            "SELECT column_name, data_type, char_length FROM user_tab_columns "
+            "WHERE table_name = :t ORDER BY column_id",
+            {"t": table_name},
+        )
+        return [(name, f"{dtype}({length})" if dtype == "VARCHAR2" else dtype) for name, dtype, length in rows]
+
+    @staticmethod
+    def _expected_signature(
+        sheet_plan: SheetPlan,
+        column_types: Optional[List[ColumnType]],
+    ) -> List[Tuple[str, str]]:
+        if column_types:
+            ddl = [t.ddl() for t in column_types]
+        else:
+            ddl = [f"VARCHAR2({sheet_plan.varchar2_len})"] * len(sheet_plan.columns)
+        sig = [(c.upper(), d) for c, d in zip(sheet_plan.columns, ddl)]
+        return sig + [(FP_COLUMN, "VARCHAR2(40)")]
+
+    @staticmethod
+    def _bind_batches(
+        sheet_plan: SheetPlan,
+        column_types: Optional[List[ColumnType]],
+        xlsx_path: Optional[Path] = None,
+    ) -> Iterator[List[tuple]]:
+        batches = sheet_rows(sheet_plan, batch_size=5000, xlsx_path=xlsx_path)
+        if column_types:
+            batches = typed_batches(batches, column_types, sheet_plan.varchar2_len)
+        return batches
+
+    def _batcher(self, direct_path: bool = False) -> AdaptiveBatcher:
+        if direct_path:
+            # Every direct-path batch commits and writes fresh blocks above the high-water mark:
+            # keep batches large so few round trips and few half-filled blocks
+            return AdaptiveBatcher(
+                max_bytes=self.cfg.batch_max_bytes,
+                target_seconds=self.cfg.batch_target_seconds * 4,
+                initial_rows=50_000,
+                min_rows=10_000,
+                max_rows=500_000,
+            )
+        return AdaptiveBatcher(max_bytes=self.cfg.batch_max_bytes, target_seconds=self.cfg.batch_target_seconds)
+
+    def _direct_path(self, row_count: Optional[int]) -> bool:
+        """
+        Load strategy for a fresh physical table: conventional INSERT, or direct-path APPEND_VALUES
+        (much less undo/redo, but a commit per batch and no batch error reporting).
+        """
+        mode = (self.cfg.bulk_mode or "off").lower()
+        if mode == "off" or self._tolerant():
+            return False
+        if mode == "always":
+            return True
+        return row_count is not None and row_count >= self.cfg.bulk_min_rows
+
+    def _tolerant(self) -> bool:
+        return (self.cfg.error_mode or "strict").lower() == "tolerant"
+
+    def _reject_sink(self, sheet_plan: SheetPlan, physical: str) -> Optional[RejectSink]:
+        if not self._tolerant():
+            return None
+        return RejectSink(
+            Path(self.cfg.reject_dir or "rejects"),
+            physical,
+            sheet_plan.columns,
+            max_pending=10_000 if self.cfg.reject_table else 0,
+        )
+
+    @staticmethod
+    def _executemany(
+        stmts: StatementCursors,
+        sql: str,
+        rows: List[tuple],
+        sizes: List[Any],
+        rejects: Optional[RejectSink],
+    ) -> None:
+        if rejects is None:
+            stmts.executemany(sql, rows, sizes)
+            return
+        rejects.sent += len(rows)
+        for err in stmts.executemany(sql, rows, sizes, batcherrors=True):
+            rejects.add(rows[err.offset], err.message)
 
+    def _create_reject_table(self, conn: oracledb.Connection) -> None:
+        if self._reject_table_ready:
+            return
         try:
-            log.info("Create physical table: %s", physical)
-            self._create_table(physical, sheet_plan.columns, sheet_plan.varchar2_len)
+            self._exec(
+                conn,
+                f"CREATE TABLE {self.cfg.reject_table} ("
+                " load_table VARCHAR2(128),"
+                " source_file VARCHAR2(1024),"
+                " sheet_name VARCHAR2(256),"
+                " row_data CLOB,"
+                " error_message VARCHAR2(4000),"
+                " rejected_at TIMESTAMP DEFAULT SYSTIMESTAMP"
+                ")",
+            )
+        except oracledb.DatabaseError as e:
+            if "ORA-00955" not in str(e):  # name is already used by an existing object
+                raise
+        self._reject_table_ready = True
+
+    def _settle_rejects(
+        self,
+        conn: oracledb.Connection,
+        stmts: StatementCursors,
+        rejects: Optional[RejectSink],
+        sheet_plan: SheetPlan,
+        source_file: str,
+        physical: str,
+    ) -> None:
+        """
+        Records the load's rejected rows in the error table and applies the swap threshold.
+        """
+        if rejects is None or rejects.rejected == 0:
+            return
+        if self.cfg.reject_table and rejects.pending:
+            self._create_reject_table(conn)
+            stmts.executemany(
+                f"INSERT INTO {self.cfg.reject_table} "
+                "(load_table, source_file, sheet_name, row_data, error_message) VALUES (:1, :2, :3, :4, :5)",
+                [(physical, source_file, sheet_plan.sheet_name, data, msg[:4000]) for data, msg in rejects.pending],
+                [128, 1024, 256, oracledb.DB_TYPE_CLOB, 4000],
+            )
+            rejects.pending.clear()
+
+        over = rejects.ratio() > self.cfg.reject_max_ratio or (
+            self.cfg.reject_max_rows > 0 and rejects.rejected > self.cfg.reject_max_rows
+        )
+        log.warning(
+            "Sheet '%s': %s of %s rows rejected (%.2f%%)%s",
+            sheet_plan.sheet_name, rejects.rejected, rejects.sent, rejects.ratio() * 100,
+            ", above threshold, keeping the current version" if over else "",
+        )
+        if over:
+            conn.commit()   # keep the error table rows; the physical table is dropped by the caller
+            raise RejectThresholdExceeded(sheet_plan.sheet_name, rejects.rejected, rejects.sent)
+
+    def _insert_all(
+        self,
+        stmts: StatementCursors,
+        sheet_plan: SheetPlan,
+        physical: str,
+        column_types: Optional[List[ColumnType]],
+        fingerprinted: bool,
+        xlsx_path: Optional[Path] = None,
+        rejects: Optional[RejectSink] = None,
+        direct_path: bool = False,
+    ) -> int:
+        columns = list(sheet_plan.columns) + ([FP_COLUMN] if fingerprinted else [])
+        col_list = ", ".join(columns)
+        bind_list = ", ".join([f":{i+1}" for i in range(len(columns))])
+        hint = "/*+ APPEND_VALUES */ " if direct_path else ""
+        insert_sql = f"INSERT {hint}INTO {physical} ({col_list}) VALUES ({bind_list})"
+        sizes = bind_sizes(sheet_plan, column_types) + ([40] if fingerprinted else [])
+
+        batcher = self._batcher(direct_path)
+        for batch in batcher.rebatch(self._bind_batches(sheet_plan, column_types, xlsx_path)):
+            if fingerprinted:
+                batch = [tuple(row) + (row_fingerprint(row),) for row in batch]
+            with batcher.timed(len(batch)):
+                self._executemany(stmts, insert_sql, batch, sizes, rejects)
+                if direct_path:
+                    # The session can't touch a direct-path loaded table again before commit (ORA-12838);
+                    # the table is not visible through the logical name yet, so partial commits are safe
+                    stmts.conn.commit()
+        log.info(
+            "Loaded rows=%s into %s (%s%s)",
+            batcher.rows, physical, "direct-path, " if direct_path else "", batcher.summary(),
+        )
+        return batcher.rows
+
+    def _apply_delta(
+        self,
+        conn: oracledb.Connection,
+        stmts: StatementCursors,
+        sheet_plan: SheetPlan,
+        logical: str,
+        physical: str,
+        column_types: Optional[List[ColumnType]],
+        xlsx_path: Optional[Path] = None,
+        rejects: Optional[RejectSink] = None,
+    ) -> str:
+        """
+        Builds `physical` as a clone of the current version plus only the changed rows.
+        Returns:
+          - "full": not applicable (no previous version, schema change, too many changes,
+            key column empty or not unique in either version)
+          - "unchanged": sheet content identical to the current version, nothing created
+          - "delta": `physical` created and patched
+        Rows are matched by fingerprint, or by the configured key column (then changed rows UPDATE).
+        """
+        previous = self._current_physical(conn, logical)
+        if not previous:
+            return "full"
+        expected = self._expected_signature(sheet_plan, column_types)
+        if self._table_signature(conn, previous) != expected:
+            log.info("Delta skipped for '%s': schema changed vs %s", sheet_plan.logical_name, previous)
+            return "full"
+
+        key_col = (self.cfg.delta_keys or {}).get(sheet_plan.logical_name)
+        key_idx: Optional[int] = None
+        if key_col:
+            upper = [c.upper() for c in sheet_plan.columns]
+            if key_col.upper() not in upper:
+                log.warning("Delta key %s not in sheet '%s'; matching by fingerprint.", key_col, sheet_plan.sheet_name)
+            else:
+                key_idx = upper.index(key_col.upper())
+                key_col = sheet_plan.columns[key_idx]
+
+        # Pass 1: fingerprint the new version
+        new_rows = 0
+        new_fps: Counter = Counter()
+        new_keys: Dict[str, str] = {}
+        for batch in self._bind_batches(sheet_plan, column_types, xlsx_path):
+            for row in batch:
+                fp = row_fingerprint(row)
+                new_rows += 1
+                if key_idx is None:
+                    new_fps[fp] += 1
+                    continue
+                k = normalize_value(row[key_idx])
+                if k == "":
+                    # `WHERE key = :1` never matches NULL: such a row could not be updated or deleted
+                    log.info("Delta skipped for '%s': key %s is empty in a row", sheet_plan.logical_name, key_col)
+                    return "full"
+                if k in new_keys:
+                    log.info("Delta skipped for '%s': key %s is not unique", sheet_plan.logical_name, key_col)
+                    return "full"
+                new_keys[k] = fp
+
+        # Compare with the previous physical version
+        deletes: List[tuple] = []
+        inserts: Counter = Counter()
+        updates: set = set()
+        if key_idx is None:
+            old_fps = Counter(r[0] for r in self._query(conn, f"SELECT {FP_COLUMN} FROM {previous}"))
+            deletes = [(fp, n) for fp, n in (old_fps - new_fps).items()]
+            inserts = new_fps - old_fps
+            changed = sum(n for _, n in deletes) + sum(inserts.values())
+        else:
+            old_keys: Dict[str, Tuple[Any, str]] = {}
+            for raw, fp in self._query(conn, f"SELECT {key_col}, {FP_COLUMN} FROM {previous}"):
+                k = normalize_value(raw)
+                if k == "" or k in old_keys:
+                    # Same reasons as above, for the rows already loaded: a dict would silently drop one
+                    log.info("Delta skipped for '%s': key %s is empty or not unique in %s",
+                             sheet_plan.logical_name, key_col, previous)
+                    return "full"
+                old_keys[k] = (raw, fp)
+            deletes = [(raw,) for k, (raw, _) in old_keys.items() if k not in new_keys]
+            for k, fp in new_keys.items():
+                if k not in old_keys:
+                    inserts[k] += 1
+                elif old_keys[k][1] != fp:
+                    updates.add(k)
+            changed = len(deletes) + sum(inserts.values()) + len(updates)
+
+        if changed == 0:
+            log.info("Delta: '%s' unchanged vs %s (rows=%s)", sheet_plan.logical_name, previous, new_rows)
+            return "unchanged"
+        ratio = changed / max(1, new_rows)
+        if ratio > self.cfg.delta_max_change_ratio:
+            log.info("Delta skipped for '%s': %.0f%% of rows changed", sheet_plan.logical_name, ratio * 100)
+            return "full"
+
+        log.info("Create physical table (clone of %s): %s", previous, physical)
+        self._create_physical(conn, physical, f"CREATE TABLE {physical} AS SELECT * FROM {previous}")
+
+        if deletes:
+            if key_idx is None:
+                stmts.executemany(f"DELETE FROM {physical} WHERE {FP_COLUMN} = :1 AND ROWNUM <= :2", deletes)
+            else:
+                stmts.executemany(f"DELETE FROM {physical} WHERE {key_col} = :1", deletes)
+
+        # Pass 2: pick the changed rows
+        columns = list(sheet_plan.columns) + [FP_COLUMN]
+        insert_sql = (
+            f"INSERT INTO {physical} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(f':{i+1}' for i in range(len(columns)))})"
+        )
+        sizes = bind_sizes(sheet_plan, column_types) + [40]
+        update_sql = None
+        if key_idx is not None:
+            sets = ", ".join(f"{c} = :{i+1}" for i, c in enumerate(columns))
+            update_sql = f"UPDATE {physical} SET {sets} WHERE {key_col} = :{len(columns) + 1}"
+
+        pending = Counter(inserts)
+        n_upd = 0
+        n_ins = 0
+        batcher = self._batcher()
+        for batch in batcher.rebatch(self._bind_batches(sheet_plan, column_types, xlsx_path)):
+            ins_rows = []
+            upd_rows = []
+            for row in batch:
+                fp = row_fingerprint(row)
+                bound = tuple(row) + (fp,)
+                match = fp if key_idx is None else normalize_value(row[key_idx])
+                if pending[match] > 0:
+                    pending[match] -= 1
+                    ins_rows.append(bound)
+                elif match in updates:
+                    upd_rows.append(bound + (row[key_idx],))
+            # Only the changed rows go to the database; the batch still counts as read throughput
+            with batcher.timed(len(batch)):
+                if ins_rows:
+                    self._executemany(stmts, insert_sql, ins_rows, sizes, rejects)
+                    n_ins += len(ins_rows)
+                if upd_rows:
+                    self._executemany(stmts, update_sql, upd_rows, sizes + [sizes[key_idx]], rejects)
+                    n_upd += len(upd_rows)
+
+        log.info(
+            "Delta applied to %s: inserted=%s updated=%s deleted=%s (rows=%s, %s)",
+            physical, n_ins, n_upd, sum(d[1] for d in deletes) if key_idx is None else len(deletes), new_rows,
+            batcher.summary(),
+        )
+        return "delta"
+
+    def _load_sheet_atomic(
+        self,
+        conn: oracledb.Connection,
+        sheet_plan: SheetPlan,
+        source_file: str,
+        source_item_id: str,
+        column_types: Optional[List[ColumnType]] = None,
+        xlsx_path: Optional[Path] = None,
+        row_count: Optional[int] = None,
+    ) -> None:
+        stmts = self._statements(conn)
 
-            # Insert
-            col_list = ", ".join(sheet_plan.columns)
-            bind_list = ", ".join([f":{i+1}" for i in range(len(sheet_plan.columns))])
-            insert_sql = f"INSERT INTO {physical} ({col_list}) VALUES ({bind_list})"
+        logical = self._logical_name(sheet_plan.logical_name)
+        physical = self._physical_name(sheet_plan.logical_name)
+        fingerprinted = self._delta_enabled()
+        rejects = self._reject_sink(sheet_plan, physical)
 
-            total_rows = 0
+        try:
             try:
-                for batch in iter_sheet_rows(sheet_plan, batch_size=5000):
-                    cur.executemany(insert_sql, batch)
-                    total_rows += len(batch)
-                self.conn.commit()
+                outcome = "full"
+                if fingerprinted:
+                    outcome = self._apply_delta(
+                        conn, stmts, sheet_plan, logical, physical, column_types, xlsx_path, rejects,
+                    )
+                    if outcome == "unchanged":
+                        return
+
+                if outcome == "full":
+                    direct_path = self._direct_path(row_count)
+                    log.info("Create physical table: %s%s", physical, " (direct-path load)" if direct_path else "")
+                    self._create_table(
+                        conn, physical, sheet_plan.columns, sheet_plan.varchar2_len, column_types, fingerprinted,
+                        direct_path,
+                    )
+                    self._insert_all(
+                        stmts, sheet_plan, physical, column_types, fingerprinted, xlsx_path, rejects, direct_path,
+                    )
+                    if direct_path and self.cfg.bulk_nologging:
+                        # Later changes to this table (delta clones, DML) are logged normally again
+                        self._exec(conn, f"ALTER TABLE {physical} LOGGING")
+                self._settle_rejects(conn, stmts, rejects, sheet_plan, source_file, physical)
+                conn.commit()
             except oracledb.DatabaseError:
                 log.exception("Oracle insert failed (file=%s sheet=%s).", source_file, sheet_plan.sheet_name)
                 raise
 
-            log.info("Loaded rows=%s into %s", total_rows, physical)
-
-            # Swap logical to new physical
-            self._swap_logical(logical=logical, physical=physical, columns=sheet_plan.columns)
+            # Swap logical to new physical; from here on the table is live and never dropped by cleanup
+            self._swap_logical(conn, logical=logical, physical=physical, columns=sheet_plan.columns)
+            with self._stamp_lock:
+                self._created.discard(physical)
 
             # Grants:
             # - if view: grant on logical once (still safe to re-run)
             # - if synonym: need to grant on *physical* because synonym doesn't carry privilege
             if (self.cfg.swap_mode or "view").lower() == "synonym":
-                self._grant_select(physical)
+                self._grant_select(conn, physical)
             else:
-                self._grant_select(logical)
+                self._grant_select(conn, logical)
 
-            self.conn.commit()
+            conn.commit()
 
             # Cleanup older physical tables
-            self._cleanup_old_versions(sheet_plan.logical_name)
+            self._cleanup_old_versions(conn, sheet_plan.logical_name)
 
         except Exception:
-            # On failure, do not touch logical; drop physical if created
+            # On failure, do not touch logical; drop physical if this attempt created it
             try:
-                self.conn.rollback()
+                conn.rollback()
             except Exception:
                 pass
             try:
-                self._drop_table_if_exists(physical)
+                self._discard_physical(conn, physical)
             except Exception:
                 log.exception("Failed cleaning up physical table after error: %s", physical)
             raise
         finally:
-            cur.close()
+            if rejects is not None:
+                rejects.close()
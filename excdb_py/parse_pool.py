@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import logging
+import marshal
+import multiprocessing
+import pickle
+import queue
+import threading
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+
+log = logging.getLogger("parse_pool")
+
+# Worker -> parent frames (first byte)
+_BATCH_MARSHAL = b"M"
+_BATCH_PICKLE = b"P"
+_END = b"E"
+_ERROR = b"X"
+
+
+def _encode(batch: List[tuple]) -> bytes:
+    # marshal is several times faster than pickle for tuples of str/int/float/None;
+    # anything else (datetime, Decimal) falls back to pickle
+    try:
+        return _BATCH_MARSHAL + marshal.dumps(batch)
+    except ValueError:
+        return _BATCH_PICKLE + pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(frame: bytes) -> List[tuple]:
+    if frame[:1] == _BATCH_MARSHAL:
+        return marshal.loads(frame[1:])
+    return pickle.loads(frame[1:])
+
+
+def _worker_main(conn: Connection) -> None:
+    """
+    Worker process loop. Per task the parent sends ("task", path, plan, batch_size, row_range, credits)
+    and then ("credit", n) as it consumes batches, or ("stop",) to abandon the task; the worker never
+    has more than `credits` batches unacknowledged, and always ends a task with an _END or _ERROR frame.
+    """
+    from xlsx_stream import iter_sheet_rows_stream
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if msg[0] != "task":
+            continue   # late credit/stop for a task that already ended
+        _, path, plan, batch_size, row_range, credits = msg
+        stopped = False
+        try:
+            for batch in iter_sheet_rows_stream(Path(path), plan, batch_size=batch_size, row_range=row_range):
+                while credits == 0 or conn.poll():
+                    ctl = conn.recv()
+                    if ctl[0] == "stop":
+                        stopped = True
+                        break
+                    credits += ctl[1]
+                if stopped:
+                    break
+                conn.send_bytes(_encode(batch))
+                credits -= 1
+            conn.send_bytes(_END)
+        except Exception as e:
+            conn.send_bytes(_ERROR + pickle.dumps(f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx) -> None:
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child,), name="xlsx-parse", daemon=True)
+        self.proc.start()
+        child.close()
+
+    def close(self) -> None:
+        self.conn.close()
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+
+
+class _Task:
+    """
+    One sheet or row range running on a worker; batches are read in the consumer's thread.
+    """
+
+    def __init__(self, pool: "ParsePool", worker: _Worker, path: Path, plan, batch_size: int,
+                 row_range: Optional[Tuple[int, Optional[int]]]) -> None:
+        self.pool = pool
+        self.worker = worker
+        self.done = False
+        worker.conn.send(("task", str(path), plan, batch_size, row_range, pool.max_in_flight))
+
+    def batches(self) -> Iterator[List[tuple]]:
+        conn = self.worker.conn
+        while True:
+            try:
+                frame = conn.recv_bytes()
+            except (EOFError, OSError):
+                self.done = True
+                self.pool._discard(self.worker)
+                raise RuntimeError("XLSX parse worker died") from None
+            kind = frame[:1]
+            if kind == _END:
+                self.done = True
+                self.pool._release(self.worker)
+                return
+            if kind == _ERROR:
+                self.done = True
+                self.pool._release(self.worker)
+                raise RuntimeError(f"XLSX parse failed in worker: {pickle.loads(frame[1:])}")
+            conn.send(("credit", 1))
+            yield _decode(frame)
+
+    def cancel(self) -> None:
+        """
+        Abandons the task (consumer stopped early, e.g. type inference sampling); drains the
+        at most `max_in_flight` batches still coming so the worker can be reused.
+        """
+        if self.done:
+            return
+        self.done = True
+        try:
+            self.worker.conn.send(("stop",))
+            while self.worker.conn.recv_bytes()[:1] not in (_END, _ERROR):
+                pass
+            self.pool._release(self.worker)
+        except (EOFError, OSError):
+            self.pool._discard(self.worker)
+
+
+class ParsePool:
+    """
+    Parses sheets on worker processes, so several workbooks/sheets use several cores
+    (XML parsing holds the GIL, threads alone don't scale):
+      - each sheet_rows() call runs on a worker; sheets whose <dimension> says they have more than
+        `split_rows` rows are cut into row ranges parsed on several workers at once and
+        yielded back in order
+      - batches cross the process boundary marshal-encoded (pickle when a value needs it)
+      - flow control per task: a worker runs at most `max_in_flight` batches ahead of its consumer,
+        so memory stays flat however far the parser is ahead of the Oracle load
+    Workers are spawned, not forked: the ingest process runs many threads.
+    """
+
+    def __init__(self, processes: int = 0, max_in_flight: int = 4, split_rows: int = 250_000) -> None:
+        self.processes = max(1, processes or multiprocessing.cpu_count())
+        self.max_in_flight = max(1, max_in_flight)
+        self.split_rows = max(1000, split_rows)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self._closed = False
+
+    def start(self) -> None:
+        for _ in range(self.processes):
+            w = _Worker(self._ctx)
+            self._workers.append(w)
+            self._idle.put(w)
+        log.info("XLSX parse pool started: %s processes, %s batches in flight per task",
+                 self.processes, self.max_in_flight)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for w in workers:
+            w.close()
+
+    def __enter__(self) -> "ParsePool":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _acquire(self, block: bool) -> Optional[_Worker]:
+        try:
+            return self._idle.get(block=block)
+        except queue.Empty:
+            return None
+
+    def _release(self, worker: _Worker) -> None:
+        self._idle.put(worker)
+
+    def _discard(self, worker: _Worker) -> None:
+        # A worker that died is replaced so the pool keeps its size
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if self._closed:
+                return
+            fresh = _Worker(self._ctx)
+            self._workers.append(fresh)
+        self._idle.put(fresh)
+
+    def _ranges(self, xlsx_path: Path, plan) -> List[Optional[Tuple[int, Optional[int]]]]:
+        from xlsx_stream import XlsxStream
+
+        with XlsxStream(xlsx_path) as book:
+            last = book.last_row(plan.sheet_name)
+        if not last or last <= self.split_rows or self.processes == 1:
+            return [None]
+        n = min(self.processes, -(-last // self.split_rows))
+        step = -(-last // n)
+        bounds = [(1 + i * step, (i + 1) * step) for i in range(n)]
+        bounds[-1] = (bounds[-1][0], None)   # the dimension can be stale: the last range runs to the end
+        return list(bounds)
+
+    def iter_sheet_rows(self, xlsx_path: Path, plan, batch_size: int = 5000) -> Iterator[List[tuple]]:
+        """
+        Same batches as xlsx_stream.iter_sheet_rows_stream, parsed on the pool.
+        """
+        ranges = self._ranges(Path(xlsx_path), plan)
+        if len(ranges) > 1:
+            log.info("Parsing '%s' in %s row ranges", plan.sheet_name, len(ranges))
+        tasks: List[_Task] = []
+        try:
+            for i, row_range in enumerate(ranges):
+                # Start the next ranges on idle workers only; block for a worker only when
+                # nothing is held, so two large sheets can't wait on each other's workers
+                while len(tasks) < len(ranges):
+                    worker = self._acquire(block=len(tasks) == i)
+                    if worker is None:
+                        break
+                    tasks.append(_Task(self, worker, Path(xlsx_path), plan, batch_size, ranges[len(tasks)]))
+                yield from tasks[i].batches()
+        finally:
+            for t in tasks:
+                t.cancel()
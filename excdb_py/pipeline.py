@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+log = logging.getLogger("pipeline")
+
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[[Any], Optional[Any]]   # payload -> next payload, or None to finish the unit early
+    workers: int = 1
+
+
+@dataclass
+class _Unit:
+    key: str
+    payload: Any
+    token: Any = None
+
+
+class StagedPipeline:
+    """
+    Multi-stage worker pipeline (e.g. download -> parse -> load):
+      - each stage has its own worker threads; stages hand off through bounded queues
+      - backpressure: submit() blocks while `max_in_flight` units are inside the pipeline,
+        and a stage blocks when the queue to the next stage is full
+      - per-key ordering: at most one unit per key is in flight; later units for the same key
+        wait and start in arrival order once the earlier one finishes
+      - a stage returning None finishes the unit early; a stage raising logs and finishes it
+      - optional on_finish(key, token) runs once per unit as it leaves the pipeline, however it ended;
+        `token` is whatever was passed to submit() for that unit
+
+    Use as a context manager: workers start on enter, and exit waits for in-flight work;
+    an exception inside the block cancels instead: queued units are finished without running.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = 2,
+        max_in_flight: int = 8,
+        on_finish: Optional[Callable[[str, Any], None]] = None,
+    ) -> None:
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        self.stages = stages
+        self.max_in_flight = max(1, max_in_flight)
+        self.on_finish = on_finish
+
+        # The first queue only ever holds admitted units (bounded by max_in_flight), so it can be
+        # unbounded; this lets the last stage re-admit a waiting key without ever blocking.
+        self._queues: List[queue.Queue] = [queue.Queue()]
+        self._queues += [queue.Queue(maxsize=max(1, queue_size)) for _ in stages[1:]]
+
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._active: Dict[str, Deque[_Unit]] = {}
+        self._threads: List[List[threading.Thread]] = []   # per stage
+        self._cancelled = threading.Event()
+
+    def __enter__(self) -> "StagedPipeline":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.drain()
+        self.close(cancel=exc_type is not None)
+
+    def start(self) -> None:
+        for idx, stage in enumerate(self.stages):
+            self._threads.append([])
+            for n in range(max(1, stage.workers)):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(idx,),
+                    name=f"{stage.name}-{n}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads[idx].append(t)
+
+    def submit(self, key: str, payload: Any, token: Any = None) -> None:
+        """
+        Blocks while the pipeline is full.
+        """
+        self._slots.acquire()
+        unit = _Unit(key=key, payload=payload, token=token)
+        with self._lock:
+            self._in_flight += 1
+            waiting = self._active.get(key)
+            if waiting is not None:
+                waiting.append(unit)
+                return
+            self._active[key] = deque()
+        self._queues[0].put(unit)
+
+    def drain(self) -> None:
+        """
+        Waits until every submitted unit has finished.
+        """
+        with self._idle:
+            while self._in_flight:
+                self._idle.wait()
+
+    def close(self, cancel: bool = False, timeout: float = 30.0) -> None:
+        """
+        Stops the stages upstream first, so a stage never blocks forwarding into a stage
+        that has already stopped. cancel=True finishes queued units without running them
+        (on_finish still runs); a unit already inside a stage gets up to `timeout` seconds per stage.
+        """
+        if cancel:
+            with self._lock:   # _finish decides whether to re-queue a waiting unit under this lock
+                self._cancelled.set()
+        for idx, threads in enumerate(self._threads):
+            for _ in threads:
+                self._queues[idx].put(_STOP)
+            for t in threads:
+                t.join(timeout=timeout)
+                if t.is_alive():
+                    log.warning("Pipeline worker %s still busy after %ss; leaving it behind", t.name, timeout)
+        self._threads = []
+
+    def _worker(self, idx: int) -> None:
+        stage = self.stages[idx]
+        inbox = self._queues[idx]
+        while True:
+            unit = inbox.get()
+            if unit is _STOP:
+                return
+            if self._cancelled.is_set():
+                self._finish(unit)
+                continue
+            try:
+                result = stage.fn(unit.payload)
+            except Exception:
+                log.exception("Stage '%s' failed (key=%s)", stage.name, unit.key)
+                result = None
+
+            if result is None or idx == len(self.stages) - 1:
+                self._finish(unit)
+            else:
+                unit.payload = result
+                if self._cancelled.is_set():
+                    self._finish(unit)
+                else:
+                    self._queues[idx + 1].put(unit)
+
+    def _finish(self, unit: _Unit) -> None:
+        """
+        Finishes `unit` and starts the next waiting unit of its key. After a cancel the stages
+        may already have stopped, so waiting units are finished here instead of re-queued.
+        """
+        while True:
+            if self.on_finish is not None:
+                try:
+                    self.on_finish(unit.key, unit.token)
+                except Exception:
+                    log.exception("on_finish failed (key=%s)", unit.key)
+            nxt: Optional[_Unit] = None
+            with self._lock:
+                waiting = self._active.get(unit.key)
+                if waiting:
+                    nxt = waiting.popleft()
+                    if not self._cancelled.is_set():
+                        self._queues[0].put(nxt)   # unbounded: never blocks under the lock
+                        nxt = None
+                else:
+                    self._active.pop(unit.key, None)
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+            self._slots.release()
+            if nxt is None:
+                return
+            unit = nxt
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+log = logging.getLogger("range_download")
+
+
+class QuickXorHash:
+    """
+    OneDrive/SharePoint quickXorHash (file.hashes.quickXorHash on a driveItem).
+    160-bit ring: byte n is XORed in at bit (11 * n) mod 160, then the length is XORed into the last 8 bytes.
+
+    Bytes whose positions are 160 apart land on the same bit offset, so update() only XOR-folds
+    each chunk into 160 per-position accumulators; the rotations happen once in digest().
+    """
+
+    _WIDTH = 160
+    _SHIFT = 11
+    _MASK = (1 << 160) - 1
+
+    def __init__(self) -> None:
+        self._folded = 0      # byte r of this (little-endian) int = XOR of all bytes at positions = r mod 160
+        self._length = 0
+
+    def update(self, data: bytes) -> None:
+        if not data:
+            return
+        lead = self._length % self._WIDTH
+        buf = bytes(lead) + bytes(data)
+        tail = -len(buf) % self._WIDTH
+        if tail:
+            buf += bytes(tail)
+        mv = memoryview(buf)
+        folded = 0
+        for i in range(0, len(buf), self._WIDTH):
+            folded ^= int.from_bytes(mv[i:i + self._WIDTH], "little")
+        self._folded ^= folded
+        self._length += len(data)
+
+    def digest(self) -> bytes:
+        ring = 0
+        for r, b in enumerate(self._folded.to_bytes(self._WIDTH, "little")):
+            if b:
+                v = b << ((self._SHIFT * r) % self._WIDTH)
+                ring ^= (v & self._MASK) ^ (v >> self._WIDTH)
+        out = bytearray(ring.to_bytes(20, "little"))
+        for i, lb in enumerate(self._length.to_bytes(8, "little")):
+            out[12 + i] ^= lb
+        return bytes(out)
+
+    def b64digest(self) -> str:
+        return base64.b64encode(self.digest()).decode("ascii")
+
+
+def quick_xor_file(path: Path, chunk_size: int = 4 * 1024 * 1024) -> str:
+    h = QuickXorHash()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.b64digest()
+
+
+@dataclass
+class _Progress:
+    """
+    Sidecar (<file>.part.json) describing what the .part file already holds.
+    """
+    size: int
+    etag: str
+    part_size: int
+    written: List[int] = field(default_factory=list)   # bytes already on disk, per part
+
+    def parts(self) -> List[Tuple[int, int]]:
+        return [
+            (start, min(self.size, start + self.part_size) - 1)
+            for start in range(0, self.size, self.part_size)
+        ]
+
+
+class _ValidatorChanged(RuntimeError):
+    """
+    The file changed on the server mid-download: If-Range no longer matched, so the server
+    answered a part request with the whole new file.
+    """
+
+
+def _parse_content_range(value: str) -> Tuple[int, int, int]:
+    # "bytes 0-0/12345"
+    unit, _, rest = (value or "").partition(" ")
+    span, _, total = rest.partition("/")
+    start, _, end = span.partition("-")
+    if unit != "bytes" or not total.isdigit():
+        raise ValueError(f"Unexpected Content-Range: {value!r}")
+    return int(start), int(end), int(total)
+
+
+class RangedDownloader:
+    """
+    Parallel HTTP Range download into a preallocated .part file:
+      - probe with Range: bytes=0-0 to learn size/validator and resolve redirects
+      - split into `part_size` ranges fetched by `workers` threads, written at their offsets
+      - progress is checkpointed to <file>.part.json; an interrupted download resumes from it
+        as long as size and ETag still match
+      - a part answered 200 to its If-Range means the file changed since the probe: the checkpoint
+        is discarded and the download starts over once
+      - final size and (when known) quickXorHash are verified before the rename
+    Every request asks for Accept-Encoding: identity, so byte offsets refer to the file itself and
+    not to a compressed stream. Servers that ignore Range get a plain sequential stream (no resume).
+    """
+
+    def __init__(
+        self,
+        http,
+        headers: Callable[[], Dict[str, str]],
+        part_size: int = 8 * 1024 * 1024,
+        workers: int = 4,
+        retries: int = 3,
+        checkpoint_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        self.http = http
+        self.headers = headers
+        self.part_size = max(1024 * 1024, part_size)
+        self.workers = max(1, workers)
+        self.retries = max(1, retries)
+        self.checkpoint_bytes = checkpoint_bytes
+        self._lock = threading.Lock()
+
+    def download(
+        self,
+        url: str,
+        out_path: Path,
+        expected_size: int = 0,
+        expected_quick_xor: str = "",
+    ) -> None:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_path.with_suffix(out_path.suffix + ".part")
+        sidecar = out_path.with_suffix(out_path.suffix + ".part.json")
+
+        try:
+            size = self._fetch(url, tmp, sidecar)
+        except _ValidatorChanged as e:
+            log.warning("%s; restarting the download", e)
+            tmp.unlink(missing_ok=True)
+            sidecar.unlink(missing_ok=True)
+            size = self._fetch(url, tmp, sidecar)
+
+        try:
+            self._verify(tmp, size, expected_size, expected_quick_xor)
+        except Exception:
+            # Bad bytes on disk: the checkpoint must not resume from them
+            tmp.unlink(missing_ok=True)
+            sidecar.unlink(missing_ok=True)
+            raise
+        tmp.replace(out_path)
+        sidecar.unlink(missing_ok=True)
+
+    def _fetch(self, url: str, tmp: Path, sidecar: Path) -> int:
+        """
+        Probes, then fills `tmp` (resuming from the checkpoint if it still applies); returns the size.
+        """
+        probe = {**self.headers(), "Range": "bytes=0-0", "Accept-Encoding": "identity"}
+        with self.http.stream(url, headers=probe, timeout=60) as r:
+            r.raise_for_status()
+            ranged = r.status_code == 206
+            if not ranged:
+                log.info("Server ignored Range; sequential download: %s", tmp.name)
+                self._write_sequential(r, tmp)
+                size, etag, data_url = tmp.stat().st_size, "", url
+            else:
+                _, _, size = _parse_content_range(r.headers.get("Content-Range", ""))
+                etag = r.headers.get("ETag", "")
+                data_url = r.url
+
+        if ranged:
+            progress = self._resume_or_reset(tmp, sidecar, size, etag)
+            self._fetch_parts(url, data_url, tmp, sidecar, progress)
+        return size
+
+    @staticmethod
+    def _write_sequential(r, tmp: Path) -> None:
+        with tmp.open("wb") as f:
+            for chunk in r.iter_bytes(chunk_size=1024 * 1024):
+                if chunk:
+                    f.write(chunk)
+
+    def _resume_or_reset(self, tmp: Path, sidecar: Path, size: int, etag: str) -> _Progress:
+        if tmp.exists() and sidecar.exists():
+            try:
+                prev = _Progress(**json.loads(sidecar.read_text(encoding="utf-8")))
+                if prev.size == size and prev.etag == etag and tmp.stat().st_size == size:
+                    done = sum(prev.written)
+                    log.info("Resuming %s: %s of %s bytes already on disk", tmp.name, done, size)
+                    return prev
+            except Exception:
+                log.exception("Ignoring unreadable download checkpoint: %s", sidecar)
+
+        progress = _Progress(size=size, etag=etag, part_size=self.part_size)
+        progress.written = [0] * len(progress.parts())
+        with tmp.open("wb") as f:
+            f.truncate(size)   # preallocate so every part can write at its own offset
+        self._checkpoint(sidecar, progress)
+        return progress
+
+    def _checkpoint(self, sidecar: Path, progress: _Progress) -> None:
+        with self._lock:
+            part = sidecar.with_suffix(".tmp")
+            part.write_text(json.dumps(asdict(progress)), encoding="utf-8")
+            part.replace(sidecar)
+
+    def _fetch_parts(self, url: str, data_url: str, tmp: Path, sidecar: Path, progress: _Progress) -> None:
+        # Pre-authenticated download URLs (after the Graph redirect) must not get the bearer token.
+        same_host = urlsplit(url).netloc == urlsplit(data_url).netloc
+        pending = [i for i, (s, e) in enumerate(progress.parts()) if progress.written[i] < e - s + 1]
+        if not pending:
+            return
+
+        fd = os.open(str(tmp), os.O_RDWR | getattr(os, "O_BINARY", 0))
+        try:
+            def _run(idx: int) -> None:
+                last_error: Optional[Exception] = None
+                for _ in range(self.retries):
+                    try:
+                        self._fetch_part(idx, data_url, same_host, fd, tmp, sidecar, progress)
+                        return
+                    except _ValidatorChanged:
+                        raise
+                    except Exception as e:
+                        last_error = e
+                        log.warning("Range part %s of %s failed (%s); retrying", idx, tmp.name, e)
+                assert last_error is not None
+                raise last_error
+
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(pending)), thread_name_prefix="range") as ex:
+                for fut in [ex.submit(_run, i) for i in pending]:
+                    fut.result()
+        finally:
+            os.close(fd)
+            self._checkpoint(sidecar, progress)
+
+    def _fetch_part(
+        self,
+        idx: int,
+        data_url: str,
+        same_host: bool,
+        fd: int,
+        tmp: Path,
+        sidecar: Path,
+        progress: _Progress,
+    ) -> None:
+        start, end = progress.parts()[idx]
+        offset = start + progress.written[idx]
+        if offset > end:
+            return
+        headers = dict(self.headers()) if same_host else {}
+        headers["Range"] = f"bytes={offset}-{end}"
+        headers["Accept-Encoding"] = "identity"   # the session default asks for gzip
+        if progress.etag:
+            headers["If-Range"] = progress.etag
+
+        with self.http.stream(data_url, headers=headers, timeout=300) as r:
+            r.raise_for_status()
+            if r.status_code == 200 and progress.etag:
+                raise _ValidatorChanged(f"{tmp.name} changed on the server during the download")
+            got_start = _parse_content_range(r.headers.get("Content-Range", ""))[0] if r.status_code == 206 else -1
+            if got_start != offset:
+                raise RuntimeError(f"Range request not honored for {tmp.name} (status={r.status_code})")
+
+            since_checkpoint = 0
+            for chunk in r.iter_bytes(chunk_size=1024 * 1024):
+                if not chunk:
+                    continue
+                _pwrite(fd, chunk, offset)
+                offset += len(chunk)
+                with self._lock:
+                    progress.written[idx] = offset - start
+                since_checkpoint += len(chunk)
+                if since_checkpoint >= self.checkpoint_bytes:
+                    self._checkpoint(sidecar, progress)
+                    since_checkpoint = 0
+
+        if offset != end + 1:
+            raise RuntimeError(f"Short range read for {tmp.name}: got {offset - start} of {end - start + 1} bytes")
+
+    @staticmethod
+    def _verify(tmp: Path, size: int, expected_size: int, expected_quick_xor: str) -> None:
+        actual = tmp.stat().st_size
+        if actual != size or (expected_size and actual != expected_size):
+            raise RuntimeError(f"Size mismatch for {tmp.name}: {actual} bytes, expected {expected_size or size}")
+        if expected_quick_xor:
+            got = quick_xor_file(tmp)
+            if got != expected_quick_xor:
+                raise RuntimeError(f"quickXorHash mismatch for {tmp.name}: {got} != {expected_quick_xor}")
+
+
+_pwrite_lock = threading.Lock()
+
+
+def _pwrite(fd: int, data: bytes, offset: int) -> None:
+    if hasattr(os, "pwrite"):
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(fd, view, offset)
+            view = view[n:]
+            offset += n
+        return
+    # Windows has no pwrite: seek+write on the shared descriptor under a lock
+    with _pwrite_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            n = os.write(fd, view)
+            view = view[n:]
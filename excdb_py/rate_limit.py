@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional
+
+
+log = logging.getLogger("rate_limit")
+
+# Graph/SharePoint throttling answers
+RETRY_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After is either delta-seconds ("120") or an HTTP-date; returns seconds or None.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class GraphRateLimiter:
+    """
+    Process-wide token bucket shared by every Graph call:
+      - `rate_per_sec` steady rate with bursts up to `burst`; rate <= 0 disables the bucket
+      - a throttled response with Retry-After pauses *all* callers until it has passed
+        (the bucket restarts empty afterwards, so callers trickle back instead of stampeding)
+      - without Retry-After the throttled caller alone backs off (exponential, full jitter)
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float = 10.0,
+        burst: int = 20,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.rate = float(rate_per_sec)
+        self.burst = max(1, int(burst))
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.throttled = 0
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be sent.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    self._tokens = min(self.burst, self._tokens + max(0.0, now - self._updated) * self.rate)
+                    self._updated = max(now, self._updated)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 0.0
+                self._updated = until
+
+    def on_throttled(self, attempt: int, status: int, retry_after: Optional[str], url: str) -> float:
+        """
+        Records a throttled response; returns how long this caller should sleep before retrying
+        (0 when a global pause already covers it).
+        """
+        with self._lock:
+            self.throttled += 1
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            # A little jitter so paused callers do not all resume on the same tick
+            delay = min(server_delay, self.max_delay * 10) + random.uniform(0, 1)
+            log.warning("Graph throttled (%s); pausing all calls for %.1fs: %s", status, delay, url.split("?")[0])
+            self.pause(delay)
+            return 0.0
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        log.warning("Graph throttled (%s) without Retry-After; retry %s in %.1fs: %s",
+                    status, attempt + 1, delay, url.split("?")[0])
+        return delay
+
+
+class ThrottledBackend:
+    """
+    Wraps an http_backend backend so every request/stream passes through a GraphRateLimiter
+    and throttled responses (429/503) are retried up to limiter.max_retries times.
+    Once retries are exhausted the throttled response is returned as-is.
+    """
+
+    def __init__(self, backend, limiter: GraphRateLimiter) -> None:
+        self.backend = backend
+        self.limiter = limiter
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        timeout: float,
+        json: Optional[Any] = None,
+    ) -> Any:
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            r = self.backend.request(method, url, headers=headers, timeout=timeout, json=json)
+            if r.status_code not in RETRY_STATUSES or attempt >= self.limiter.max_retries:
+                return r
+            delay = self.limiter.on_throttled(attempt, r.status_code, r.headers.get("Retry-After"), url)
+            r.close()
+            time.sleep(delay)
+            attempt += 1
+
+    @contextmanager
+    def stream(self, url: str, headers: Dict[str, str], timeout: float) -> Iterator[Any]:
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            with self.backend.stream(url, headers=headers, timeout=timeout) as r:
+                if r.status_code not in RETRY_STATUSES or attempt >= self.limiter.max_retries:
+                    yield r
+                    return
+                delay = self.limiter.on_throttled(attempt, r.status_code, r.headers.get("Retry-After"), url)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self.backend.close()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import IO, Any, List, Optional, Sequence, Tuple
+
+
+log = logging.getLogger("rejects")
+
+
+class RejectSink:
+    """
+    Rows the database refused during one sheet load in tolerant mode (ORACLE_ERROR_MODE=tolerant):
+      - written to <reject_dir>/<load_name>.csv (sheet columns + ORA_ERROR); the file is only
+        created when the first row is rejected
+      - the first `max_pending` are also kept in `pending` until the loader flushes them to the
+        shared error table, if one is configured
+      - `sent` / `rejected` count rows handed to executemany and rows refused, for the swap threshold
+    """
+
+    def __init__(self, reject_dir: Path, load_name: str, columns: Sequence[str], max_pending: int = 0) -> None:
+        self.path = Path(reject_dir) / f"{load_name}.csv"
+        self.columns = list(columns)
+        self.max_pending = max_pending
+        self.sent = 0
+        self.rejected = 0
+        self.pending: List[Tuple[str, str]] = []   # (row values as a JSON array, error message)
+        self._file: Optional[IO[str]] = None
+        self._writer: Any = None
+
+    def add(self, row: Sequence[Any], message: str) -> None:
+        values = ["" if v is None else str(v) for v in row[: len(self.columns)]]
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns + ["ORA_ERROR"])
+        self._writer.writerow(values + [message])
+        self.rejected += 1
+        if len(self.pending) < self.max_pending:
+            self.pending.append((json.dumps(values, ensure_ascii=False), message))
+
+    def ratio(self) -> float:
+        return self.rejected / max(1, self.sent)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            log.warning("%s rejected rows written to %s", self.rejected, self.path)
@@ -2,25 +2,50 @@ from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+try:  # only needed for STATE_BACKEND=oracle
+    import oracledb
+except ImportError:
+    oracledb = None
 
 
 @dataclass
 class ProcessedRecord:
     etag: str
     last_modified: str
+    content_hash: str = ""                                  # sha256 of the workbook bytes
+    sheets: Dict[str, str] = field(default_factory=dict)    # logical_name -> sheet content fingerprint
+
+    def matches(self, etag: str, last_modified: str) -> bool:
+        return _matches(self, etag, last_modified)
+
+
+def _matches(rec: Optional[ProcessedRecord], etag: str, last_modified: str) -> bool:
+    if not rec:
+        return False
+    # Prefer etag match; fallback to last_modified match
+    if rec.etag and etag and rec.etag == etag:
+        return True
+    if rec.last_modified and last_modified and rec.last_modified == last_modified:
+        return True
+    return False
 
 
 class StateStore:
     """
     Minimal state:
-      - item_id -> (etag, last_modified)
+      - item_id -> (etag, last_modified, content_hash, per-sheet fingerprints)
 
     This supports:
       - "compare to local processed state"
       - ignore already-processed versions on restart
+      - skip byte-identical re-uploads and reload only sheets whose content changed
     """
 
     def __init__(self, state_dir: Path) -> None:
@@ -28,6 +53,8 @@ class StateStore:
         self.path = state_dir / "processed_items.json"
         self.log = logging.getLogger("StateStore")
         self.items: Dict[str, ProcessedRecord] = {}
+        # Pipeline stages read and write from several threads
+        self._lock = threading.Lock()
 
     def load(self) -> None:
         self.state_dir.mkdir(parents=True, exist_ok=True)
@@ -41,6 +68,8 @@ class StateStore:
                 items[item_id] = ProcessedRecord(
                     etag=str(rec.get("etag") or ""),
                     last_modified=str(rec.get("last_modified") or ""),
+                    content_hash=str(rec.get("content_hash") or ""),
+                    sheets={str(k): str(v) for k, v in (rec.get("sheets") or {}).items()},
                 )
             self.items = items
         except Exception:
@@ -49,26 +78,406 @@ class StateStore:
 
     def save(self) -> None:
         self.state_dir.mkdir(parents=True, exist_ok=True)
-        data = {
-            "items": {
-                item_id: {"etag": rec.etag, "last_modified": rec.last_modified}
-                for item_id, rec in self.items.items()
+        with self._lock:
+            data = {
+                "items": {
+                    item_id: {
+                        "etag": rec.etag,
+                        "last_modified": rec.last_modified,
+                        "content_hash": rec.content_hash,
+                        "sheets": rec.sheets,
+                    }
+                    for item_id, rec in self.items.items()
+                }
             }
-        }
-        tmp = self.path.with_suffix(".json.part")
-        tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
-        tmp.replace(self.path)
+            tmp = self.path.with_suffix(".json.part")
+            tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.path)
+
+    def get(self, item_id: str) -> Optional[ProcessedRecord]:
+        return self.items.get(item_id)
+
+    def get_many(self, item_ids: Iterable[str]) -> Dict[str, ProcessedRecord]:
+        """
+        Bulk get(); ids without a record are left out.
+        """
+        with self._lock:
+            return {i: self.items[i] for i in item_ids if i in self.items}
+
+    def close(self) -> None:
+        self.save()
 
     def is_processed(self, item_id: str, etag: str, last_modified: str) -> bool:
-        rec = self.items.get(item_id)
-        if not rec:
-            return False
-        # Prefer etag match; fallback to last_modified match
-        if rec.etag and etag and rec.etag == etag:
-            return True
-        if rec.last_modified and last_modified and rec.last_modified == last_modified:
-            return True
-        return False
+        return _matches(self.items.get(item_id), etag, last_modified)
+
+    def mark_processed(
+        self,
+        item_id: str,
+        etag: str,
+        last_modified: str,
+        content_hash: str = "",
+        sheets: Optional[Dict[str, str]] = None,
+    ) -> None:
+        rec = ProcessedRecord(
+            etag=etag,
+            last_modified=last_modified,
+            content_hash=content_hash,
+            sheets=dict(sheets or {}),
+        )
+        with self._lock:
+            self.items[item_id] = rec
+
+
+class SqliteStateStore:
+    """
+    Same API as StateStore, backed by SQLite in WAL mode:
+      - lookups hit the primary key index instead of a full in-memory dict
+      - mark_processed writes one row; save() commits in batches
+        (every `commit_every` marks or `commit_seconds`, whichever comes first)
+      - a timer started by the first uncommitted mark commits it within `commit_seconds`
+        even if no further save() comes (pipeline gone idle)
+      - flush()/close() force a commit
+
+    On first start an existing processed_items.json is imported and renamed to *.migrated.
+    Uncommitted marks lost in a crash only cause those items to be reprocessed.
+    """
+
+    def __init__(self, state_dir: Path, commit_every: int = 50, commit_seconds: float = 5.0) -> None:
+        self.state_dir = state_dir
+        self.path = state_dir / "processed_items.db"
+        self.json_path = state_dir / "processed_items.json"
+        self.commit_every = max(1, commit_every)
+        self.commit_seconds = commit_seconds
+        self.log = logging.getLogger("StateStore")
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+
+    def load(self) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_items ("
+            " item_id TEXT PRIMARY KEY,"
+            " etag TEXT NOT NULL DEFAULT '',"
+            " last_modified TEXT NOT NULL DEFAULT '',"
+            " content_hash TEXT NOT NULL DEFAULT '',"
+            " sheets TEXT NOT NULL DEFAULT '{}'"
+            ")"
+        )
+        self.conn.commit()
+        self._migrate_json()
+
+    def _migrate_json(self) -> None:
+        assert self.conn is not None
+        if not self.json_path.exists():
+            return
+        has_rows = self.conn.execute("SELECT 1 FROM processed_items LIMIT 1").fetchone()
+        if has_rows:
+            return
+        legacy = StateStore(self.state_dir)
+        legacy.load()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO processed_items (item_id, etag, last_modified, content_hash, sheets) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (item_id, rec.etag, rec.last_modified, rec.content_hash, json.dumps(rec.sheets))
+                    for item_id, rec in legacy.items.items()
+                ],
+            )
+        self.json_path.replace(self.json_path.with_suffix(".json.migrated"))
+        self.log.info("Migrated %s items from %s", len(legacy.items), self.json_path.name)
+
+    def save(self) -> None:
+        with self._lock:
+            due = self._pending >= self.commit_every or (
+                self._pending and time.monotonic() - self._last_commit >= self.commit_seconds
+            )
+            if due:
+                self._commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _commit(self) -> None:
+        assert self.conn is not None
+        self.conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _commit_due(self) -> None:
+        # Timer thread: whatever is still pending once commit_seconds have passed
+        with self._lock:
+            self._timer = None
+            if self._pending and self.conn is not None:
+                self._commit()
+
+    def get(self, item_id: str) -> Optional[ProcessedRecord]:
+        assert self.conn is not None
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, sheets FROM processed_items WHERE item_id = ?",
+                (item_id,),
+            ).fetchone()
+        if not row:
+            return None
+        return ProcessedRecord(etag=row[0], last_modified=row[1], content_hash=row[2], sheets=json.loads(row[3]))
+
+    def get_many(self, item_ids: Iterable[str], chunk: int = 500) -> Dict[str, ProcessedRecord]:
+        """
+        Bulk get(): one indexed IN (...) query per `chunk` ids; ids without a record are left out.
+        """
+        assert self.conn is not None
+        ids: List[str] = list(item_ids)
+        out: Dict[str, ProcessedRecord] = {}
+        for start in range(0, len(ids), chunk):
+            part = ids[start:start + chunk]
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT item_id, etag, last_modified, content_hash, sheets FROM processed_items "
+                    f"WHERE item_id IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+            for row in rows:
+                out[row[0]] = ProcessedRecord(
+                    etag=row[1], last_modified=row[2], content_hash=row[3], sheets=json.loads(row[4]),
+                )
+        return out
 
-    def mark_processed(self, item_id: str, etag: str, last_modified: str) -> None:
-        self.items[item_id] = ProcessedRecord(etag=etag, last_modified=last_modified)
+    def is_processed(self, item_id: str, etag: str, last_modified: str) -> bool:
+        return _matches(self.get(item_id), etag, last_modified)
+
+    def mark_processed(
+        self,
+        item_id: str,
+        etag: str,
+        last_modified: str,
+        content_hash: str = "",
+        sheets: Optional[Dict[str, str]] = None,
+    ) -> None:
+        assert self.conn is not None
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO processed_items (item_id, etag, last_modified, content_hash, sheets) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (item_id, etag, last_modified, content_hash, json.dumps(sheets or {}, sort_keys=True)),
+            )
+            self._pending += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.commit_seconds, self._commit_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+
+class OracleStateStore:
+    """
+    Same API as SqliteStateStore, kept in an Oracle table so several ingest hosts share one view
+    of what has been processed (see coordination.LeaseCoordinator):
+      - own connection, separate from the loader, so a mark never commits (or waits behind) a sheet load
+      - mark_processed MERGEs one row; save() commits at once, since other workers poll this table
+      - on first start an empty table is seeded from the local SQLite/JSON state in state_dir
+    """
+
+    def __init__(
+        self,
+        state_dir: Path,
+        dsn: str,
+        user: str,
+        password: str,
+        table: str = "INGEST_PROCESSED_ITEMS",
+    ) -> None:
+        if oracledb is None:
+            raise RuntimeError("STATE_BACKEND=oracle requires the oracledb package")
+        self.state_dir = state_dir
+        self.dsn = dsn
+        self.user = user
+        self.password = password
+        self.table = table
+        self.log = logging.getLogger("StateStore")
+        self.conn = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def load(self) -> None:
+        self.conn = oracledb.connect(user=self.user, password=self.password, dsn=self.dsn)
+        self.conn.autocommit = False
+        cur = self.conn.cursor()
+        try:
+            cur.execute(
+                f"CREATE TABLE {self.table} ("
+                " item_id VARCHAR2(256) PRIMARY KEY,"
+                " etag VARCHAR2(256),"
+                " last_modified VARCHAR2(64),"
+                " content_hash VARCHAR2(64),"
+                " sheets CLOB,"
+                " updated_at TIMESTAMP DEFAULT SYSTIMESTAMP"
+                ")"
+            )
+        except oracledb.DatabaseError as e:
+            if "ORA-00955" not in str(e):  # name is already used by an existing object
+                raise
+        finally:
+            cur.close()
+        self._seed_from_local()
+
+    def _seed_from_local(self) -> None:
+        assert self.conn is not None
+        cur = self.conn.cursor()
+        try:
+            cur.execute(f"SELECT 1 FROM {self.table} WHERE ROWNUM = 1")
+            if cur.fetchone():
+                return
+        finally:
+            cur.close()
+        has_sqlite = (self.state_dir / "processed_items.db").exists()
+        if not has_sqlite and not (self.state_dir / "processed_items.json").exists():
+            return
+
+        local: Union[StateStore, SqliteStateStore] = (
+            SqliteStateStore(self.state_dir) if has_sqlite else StateStore(self.state_dir)
+        )
+        local.load()
+        try:
+            if isinstance(local, StateStore):
+                items = dict(local.items)
+            else:
+                assert local.conn is not None
+                ids = [r[0] for r in local.conn.execute("SELECT item_id FROM processed_items")]
+                items = local.get_many(ids)
+        finally:
+            if isinstance(local, SqliteStateStore):
+                local.close()
+        for item_id, rec in items.items():
+            self.mark_processed(item_id, rec.etag, rec.last_modified, rec.content_hash, rec.sheets)
+        self.flush()
+        self.log.info("Seeded %s items from local state in %s", len(items), self.state_dir)
+
+    def save(self) -> None:
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                assert self.conn is not None
+                self.conn.commit()
+                self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def _record(row) -> ProcessedRecord:
+        sheets = row[3].read() if hasattr(row[3], "read") else row[3]
+        return ProcessedRecord(
+            etag=row[0] or "",
+            last_modified=row[1] or "",
+            content_hash=row[2] or "",
+            sheets=json.loads(sheets or "{}"),
+        )
+
+    def get(self, item_id: str) -> Optional[ProcessedRecord]:
+        return self.get_many([item_id]).get(item_id)
+
+    def get_many(self, item_ids: Iterable[str], chunk: int = 500) -> Dict[str, ProcessedRecord]:
+        assert self.conn is not None
+        ids: List[str] = list(item_ids)
+        out: Dict[str, ProcessedRecord] = {}
+        for start in range(0, len(ids), chunk):
+            part = ids[start:start + chunk]
+            binds = ", ".join(f":{i + 1}" for i in range(len(part)))
+            with self._lock:
+                cur = self.conn.cursor()
+                try:
+                    cur.execute(
+                        f"SELECT item_id, etag, last_modified, content_hash, sheets FROM {self.table} "
+                        f"WHERE item_id IN ({binds})",
+                        part,
+                    )
+                    for row in cur:
+                        out[row[0]] = self._record(row[1:])
+                finally:
+                    cur.close()
+        return out
+
+    def is_processed(self, item_id: str, etag: str, last_modified: str) -> bool:
+        return _matches(self.get(item_id), etag, last_modified)
+
+    def mark_processed(
+        self,
+        item_id: str,
+        etag: str,
+        last_modified: str,
+        content_hash: str = "",
+        sheets: Optional[Dict[str, str]] = None,
+    ) -> None:
+        assert self.conn is not None
+        with self._lock:
+            cur = self.conn.cursor()
+            try:
+                cur.execute(
+                    f"MERGE INTO {self.table} t USING (SELECT :item_id item_id FROM dual) s "
+                    "ON (t.item_id = s.item_id) "
+                    "WHEN MATCHED THEN UPDATE SET etag = :etag, last_modified = :lm, content_hash = :ch, "
+                    " sheets = :sheets, updated_at = SYSTIMESTAMP "
+                    "WHEN NOT MATCHED THEN INSERT (item_id, etag, last_modified, content_hash, sheets) "
+                    " VALUES (:item_id, :etag, :lm, :ch, :sheets)",
+                    {
+                        "item_id": item_id,
+                        "etag": etag,
+                        "lm": last_modified,
+                        "ch": content_hash,
+                        "sheets": json.dumps(sheets or {}, sort_keys=True),
+                    },
+                )
+            finally:
+                cur.close()
+            self._pending += 1
+
+
+def open_state_store(
+    state_dir: Path,
+    backend: str = "sqlite",
+    oracle_dsn: str = "",
+    oracle_user: str = "",
+    oracle_password: str = "",
+) -> Union[StateStore, SqliteStateStore, OracleStateStore]:
+    """
+    backend:
+      - sqlite: SqliteStateStore (default)
+      - json: legacy processed_items.json
+      - oracle: OracleStateStore, shared by several ingest hosts (needs the oracle_* arguments)
+    """
+    backend = (backend or "sqlite").lower()
+    if backend == "json":
+        store: Union[StateStore, SqliteStateStore, OracleStateStore] = StateStore(state_dir=state_dir)
+    elif backend == "sqlite":
+        store = SqliteStateStore(state_dir=state_dir)
+    elif backend == "oracle":
+        store = OracleStateStore(state_dir=state_dir, dsn=oracle_dsn, user=oracle_user, password=oracle_password)
+    else:
+        raise ValueError(f"Unknown state backend: {backend}")
+    store.load()
+    return store
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Any, Iterable, Iterator, List, Tuple
+
+
+log = logging.getLogger("stream_merge")
+
+_END = object()
+
+
+class _Failed:
+    def __init__(self, name: str, error: BaseException) -> None:
+        self.name = name
+        self.error = error
+
+
+class RoundRobinMerge:
+    """
+    Interleaves several blocking change streams (e.g. one delta loop per watched folder):
+      - each stream runs on its own thread and hands items over through a small bounded queue,
+        so a busy stream waits while the consumer is behind instead of piling up items
+      - the consumer takes at most one item per stream per turn, so a folder with a burst
+        of changes cannot starve the others
+      - a stream that raises stops the merge and the error is re-raised to the consumer
+    """
+
+    def __init__(self, streams: List[Tuple[str, Iterable[Any]]], buffer_per_stream: int = 1) -> None:
+        self.streams = streams
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, buffer_per_stream)) for _ in streams]
+        self._ready = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def _produce(self, idx: int, name: str, stream: Iterable[Any]) -> None:
+        q = self._queues[idx]
+        try:
+            for item in stream:
+                q.put(item)
+                with self._ready:
+                    self._ready.notify()
+            q.put(_END)
+        except BaseException as e:
+            q.put(_Failed(name, e))
+        with self._ready:
+            self._ready.notify()
+
+    def __iter__(self) -> Iterator[Any]:
+        for idx, (name, stream) in enumerate(self.streams):
+            t = threading.Thread(target=self._produce, args=(idx, name, stream), name=f"watch-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+        live = list(range(len(self.streams)))
+        turn = 0
+        while live:
+            got: Any = None
+            for k in range(len(live)):
+                pos = (turn + k) % len(live)
+                try:
+                    got = self._queues[live[pos]].get_nowait()
+                except queue.Empty:
+                    continue
+                if got is _END:
+                    log.info("Change stream finished: %s", self.streams[live[pos]][0])
+                    live.pop(pos)
+                    turn = pos
+                elif isinstance(got, _Failed):
+                    raise got.error
+                else:
+                    turn = pos + 1
+                break
+            else:
+                with self._ready:
+                    self._ready.wait(timeout=1.0)
+                continue
+            if got is not _END:
+                yield got
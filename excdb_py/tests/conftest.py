@@ -0,0 +1,132 @@
+import re
+import sys
+import types
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+
+# Modules in excdb_py import each other as top-level modules (the service runs from that directory)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _excel_introspect_stand_in() -> types.ModuleType:
+    """
+    excel_introspect ships with the deployment, not with this tree. The tests only need the plan
+    shape and identifier rules, so without it a minimal module takes its place; reading rows
+    through it fails loudly (tests patch sheet_rows or read through xlsx_stream).
+    """
+    mod = types.ModuleType("excel_introspect")
+
+    @dataclass
+    class SheetPlan:
+        sheet_name: str
+        logical_name: str
+        columns: List[str]
+        varchar2_len: int = 4000
+        truncate_overflow: str = "truncate"
+
+    @dataclass
+    class WorkbookPlan:
+        dataset_key: str
+        sheets: List[Any] = field(default_factory=list)
+
+    def sanitize_identifier(raw: str, max_len: int = 30, prefix: str = "T") -> str:
+        s = re.sub(r"[^A-Za-z0-9_]", "_", str(raw)).upper()
+        if not s or not s[0].isalpha():
+            s = prefix + s
+        return s[:max_len]
+
+    def build_workbook_plan(*args, **kwargs):
+        raise NotImplementedError("excel_introspect is not installed")
+
+    def iter_sheet_rows(*args, **kwargs):
+        raise NotImplementedError("excel_introspect is not installed")
+
+    for obj in (SheetPlan, WorkbookPlan, sanitize_identifier, build_workbook_plan, iter_sheet_rows):
+        obj.__module__ = mod.__name__
+        setattr(mod, obj.__name__, obj)
+    return mod
+
+
+try:
+    import excel_introspect  # noqa: F401
+except ImportError:
+    sys.modules["excel_introspect"] = _excel_introspect_stand_in()
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.arraysize = 0
+        self.prefetchrows = 0
+        self.rowcount = 0
+        self._sql = None
+        self._rows = []
+
+    def prepare(self, sql):
+        self._sql = sql
+
+    def setinputsizes(self, *sizes):
+        self.conn.input_sizes.append(sizes)
+
+    def execute(self, sql, params=None):
+        params = params if params is not None else {}
+        self.conn.log.append(("execute", sql))
+        self.conn.executed.append((sql, dict(params) if isinstance(params, dict) else params))
+        self.rowcount = self.conn.rowcount(sql, params)
+        self._rows = list(self.conn.rows(sql, params))
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def executemany(self, sql, rows, batcherrors=False):
+        rows = list(rows)
+        self.conn.log.append(("executemany", sql or self._sql, len(rows)))
+        self.conn.batches.append((sql or self._sql, rows))
+
+    def getbatcherrors(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Records statements and transaction calls in order in `log`, as ("execute", sql),
+    ("executemany", sql, rows) and ("commit",) / ("rollback",); `executed` keeps each execute's
+    (sql, params) and `batches` each executemany's (sql, rows).
+    `rowcount(sql, params)` decides what a statement reports, `rows(sql, params)` what a query returns.
+    """
+
+    def __init__(self, rowcount=None, rows=None):
+        self.rowcount = rowcount or (lambda sql, params: 0)
+        self.rows = rows or (lambda sql, params: [])
+        self.log = []
+        self.executed = []
+        self.batches = []
+        self.input_sizes = []
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append(("commit",))
+
+    def rollback(self):
+        self.log.append(("rollback",))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_connection():
+    """
+    Factory for FakeConnection: fake_connection(rowcount=..., rows=...).
+    """
+    return FakeConnection
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from batching import AdaptiveBatcher, estimate_row_bytes
+
+
+def test_text_is_estimated_in_utf8_bytes():
+    assert estimate_row_bytes(("abc", None, 12, datetime(2024, 1, 1))) == 3 + 1 + 22 + 22
+    assert estimate_row_bytes(("é✓",)) == 5
+    assert estimate_row_bytes(("日本語テキスト" * 100,)) == 2100
+
+
+def test_multibyte_rows_close_batches_at_the_byte_ceiling():
+    batcher = AdaptiveBatcher(max_bytes=64 * 1024, initial_rows=10_000)
+    rows = [("日本語" * 100,)] * 1000   # 900 bytes per row, 300 characters
+
+    sizes = [len(b) for b in batcher.rebatch([rows])]
+
+    assert max(sizes) * 900 <= 64 * 1024
+    assert sum(sizes) == 1000
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+for _dep in ("msal", "requests"):
+    pytest.importorskip(_dep)
+
+from change_notifications import NotificationListener
+
+
+@pytest.fixture
+def listener():
+    lis = NotificationListener("127.0.0.1", 0, client_state="s3cret")
+    lis.start()
+    yield lis
+    lis.close()
+
+
+def _post(lis, query="", payload=None, path="/notifications"):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{lis.port}{path}{query}", data=data, method="POST",
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return resp.status, resp.read().decode("utf-8")
+
+
+def _waiter(lis, timeout):
+    """
+    Starts a thread that registers with the listener, then waits; returns (ready, result).
+    """
+    ready = threading.Event()
+    result = {}
+
+    def run():
+        lis.wait(0)   # registers this thread at the current generation
+        ready.set()
+        t0 = time.monotonic()
+        result["woke"] = lis.wait(timeout)
+        result["seconds"] = time.monotonic() - t0
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    assert ready.wait(5)
+    return t, result
+
+
+def test_listens_on_an_ephemeral_port(listener):
+    assert listener.port > 0
+
+
+def test_validation_handshake_echoes_the_token(listener):
+    status, body = _post(listener, "?validationToken=Validation%3A%20Testing%20client%20application")
+    assert status == 200
+    assert body == "Validation: Testing client application"
+
+
+def test_notification_with_client_state_wakes_wait(listener):
+    t, result = _waiter(listener, timeout=10)
+
+    status, _ = _post(listener, payload={"value": [{"clientState": "s3cret", "resource": "drives/x/root"}]})
+    t.join(10)
+
+    assert status == 202
+    assert result["woke"] is True
+    assert result["seconds"] < 5
+    assert listener.received == 1
+
+
+def test_notification_with_wrong_client_state_is_ignored(listener):
+    t, result = _waiter(listener, timeout=0.5)
+
+    status, _ = _post(listener, payload={"value": [{"clientState": "guess", "resource": "drives/x/root"}]})
+    t.join(5)
+
+    assert status == 202
+    assert result["woke"] is False
+    assert listener.received == 0
+
+
+def test_unknown_path_is_rejected(listener):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _post(listener, payload={"value": []}, path="/other")
+    assert e.value.code == 404
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import pytest
+
+import column_types
+from column_types import DATE, NUMBER, VARCHAR2, ColumnType, TypeMismatch, mismatched_columns, typed_batches
+
+
+def test_mismatched_columns_reports_every_bad_column(monkeypatch):
+    plan = SimpleNamespace(sheet_name="S", logical_name="S", columns=["A", "B", "C", "D"], varchar2_len=4000)
+    rows = [("1", "2024-01-01", "x", "1"), ("", "2024-01-02", "y", "2"), ("3", "soon", "z", "three")]
+    monkeypatch.setattr(column_types, "sheet_rows", lambda *a, **k: iter([rows[:2], rows[2:]]))
+    types = [ColumnType(NUMBER), ColumnType(DATE), ColumnType(VARCHAR2, 4000), ColumnType(NUMBER)]
+
+    assert mismatched_columns(plan, types) == {1: "soon", 3: "three"}
+
+    with pytest.raises(TypeMismatch) as e:
+        list(typed_batches(iter([rows]), types, 4000))
+    assert e.value.column_index == 1
+
+
+@pytest.mark.parametrize("value, number", [
+    ("1e125", True), ("-9.99e125", True), ("1e-130", True), ("0e-200", True), (1.5e-120, True),
+    ("1e126", False), ("1e200", False), ("1e-131", False), ("-1e-200", False), (1e300, False),
+])
+def test_numbers_outside_oracle_range_stay_text(monkeypatch, value, number):
+    plan = SimpleNamespace(sheet_name="S", logical_name="S", columns=["A"], varchar2_len=4000)
+    monkeypatch.setattr(column_types, "sheet_rows", lambda *a, **k: iter([[("1",), (value,)]]))
+
+    (inferred,) = column_types.infer_sheet_types(plan)
+
+    assert (inferred.kind == NUMBER) is number
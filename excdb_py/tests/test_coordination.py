@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+for _dep in ("oracledb", "msal", "requests"):
+    pytest.importorskip(_dep)
+
+from coordination import LeaseCoordinator
+
+
+def _coordinator(conn, submitted):
+    c = LeaseCoordinator(cfg=None, state=None, worker_id="w1")
+    c.conn = conn
+    c._submit = lambda key, item, token: submitted.append((key, token))
+    return c
+
+
+def test_stale_unit_does_not_release_a_reclaimed_lease(fake_connection):
+    submitted = []
+    lost = {"on": False}
+
+    def rowcount(sql, params):
+        if lost["on"] and (sql.startswith("UPDATE") or sql.startswith("MERGE")):
+            return 0   # another worker holds the key now
+        return 1
+
+    conn = fake_connection(rowcount)
+    c = _coordinator(conn, submitted)
+    item = SimpleNamespace(name="book.xlsx")
+
+    c.offer("K", item)
+    (_, first), = submitted
+
+    lost["on"] = True
+    c._renew()
+    assert not c.holds("K")
+
+    lost["on"] = False
+    c.offer("K", item)
+    second = submitted[-1][1]
+    assert second != first
+
+    conn.executed.clear()
+    c.release("K", first)   # the unit from the lost lease leaves the pipeline
+    assert conn.executed == []
+    assert c.holds("K")
+
+    c.release("K", second)
+    (sql, params), = conn.executed
+    assert sql.startswith("DELETE") and "token = :t" in sql
+    assert params["t"] == second
+    assert not c.holds("K")
+
+
+def test_units_share_a_claim_until_the_last_one_leaves(fake_connection):
+    submitted = []
+    conn = fake_connection(lambda sql, params: 1)
+    c = _coordinator(conn, submitted)
+    item = SimpleNamespace(name="book.xlsx")
+
+    c.offer("K", item)
+    c.offer("K", item)
+    assert submitted[0][1] == submitted[1][1]
+    assert sum(sql.startswith("MERGE") for sql, _ in conn.executed) == 1
+
+    conn.executed.clear()
+    c.release("K", submitted[0][1])
+    assert conn.executed == []
+    c.release("K", submitted[1][1])
+    assert [sql.split()[0] for sql, _ in conn.executed] == ["DELETE"]
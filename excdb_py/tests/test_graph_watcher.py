@@ -0,0 +1,179 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+for _dep in ("msal", "requests"):
+    pytest.importorskip(_dep)
+
+import graph_watcher
+from graph_watcher import BatchResponse, GraphWatcher
+from json_stream import ListingPage
+
+
+class _Stop(Exception):
+    pass
+
+
+def _item(item_id, etag="e1"):
+    return {
+        "id": item_id,
+        "name": f"{item_id}.xlsx",
+        "eTag": etag,
+        "file": {},
+        "fileSystemInfo": {"lastModifiedDateTime": "2024-01-01T00:00:00Z"},
+    }
+
+
+class FakeClient:
+    """
+    Serves scripted delta passes: passes[i] is the list of items of the i-th pass, answered
+    with deltaLink "L<i+1>". Records which deltaLink was on disk when each pass started.
+    """
+
+    def __init__(self, passes, watcher_ref):
+        self.auth = SimpleNamespace()
+        self.passes = passes
+        self.calls = 0
+        self.persisted_at_pass = []
+        self.watcher_ref = watcher_ref
+
+    def stream_listing(self, url):
+        if self.calls == len(self.passes):
+            raise _Stop()
+        path = self.watcher_ref[0].delta_link_path
+        self.persisted_at_pass.append(path.read_text() if path.exists() else None)
+        body = {"value": self.passes[self.calls], "@odata.deltaLink": f"L{self.calls + 1}"}
+        self.calls += 1
+        return ListingPage(iter([json.dumps(body).encode("utf-8")]))
+
+    def batch_get_json(self, urls):
+        ids = [u.split("/items/")[1].split("?")[0] for u in urls]
+        return [BatchResponse(status=200, body=_item(i)) for i in ids]
+
+
+def _watcher(tmp_path, monkeypatch, passes, coalesce_seconds, step=6.0):
+    ref = []
+    client = FakeClient(passes, ref)
+    w = GraphWatcher(
+        tenant_id="t", client_id="c", drive_id="d", folder_item_id="f", state_dir=tmp_path,
+        coalesce_seconds=coalesce_seconds, client=client,
+    )
+    ref.append(w)
+    clock = {"now": 0.0}
+    monkeypatch.setattr(graph_watcher.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(w, "_sleep", lambda seconds: clock.__setitem__("now", clock["now"] + step))
+    return w, client
+
+
+def _run(w):
+    out = []
+    with pytest.raises(_Stop):
+        for item in w.delta_changes():
+            out.append(item.item_id)
+    return out
+
+
+def test_coalescing_persists_the_last_fully_released_delta_link(tmp_path, monkeypatch):
+    # t=0: A held; t=6: B held; t=12: A released, B still held; t=18: B released; t=24, t=30: quiet
+    w, client = _watcher(tmp_path, monkeypatch, [[_item("A")], [_item("B")], [], [], []], coalesce_seconds=10)
+
+    assert _run(w) == ["A", "B"]
+    assert client.persisted_at_pass == [None, None, None, "L1", "L4"]
+    assert w.delta_link_path.read_text() == "L5"
+
+
+def test_checkpoint_advances_while_something_is_always_held(tmp_path, monkeypatch):
+    # A new item arrives every pass, so the coalescer is never empty
+    passes = [[_item(f"I{i}")] for i in range(6)]
+    w, client = _watcher(tmp_path, monkeypatch, passes, coalesce_seconds=10)
+
+    released = _run(w)
+
+    assert released == ["I0", "I1", "I2", "I3"]
+    assert w.delta_link_path.read_text() == "L4"
+
+
+class StreamingClient:
+    """
+    Two pages of two items each; every item arrives as its own network chunk, and the client
+    records how far the parser has read (chunks handed out) and which responses were closed.
+    fail_page makes that page's connection drop after its first item.
+    """
+
+    def __init__(self, fail_page=None):
+        self.auth = SimpleNamespace()
+        self.read = []
+        self.closed = []
+        self.fail_page = fail_page
+
+    def stream_listing(self, url):
+        page = 1 if "page2" not in url else 2
+        tail = {"@odata.nextLink": "https://graph/page2"} if page == 1 else {"@odata.deltaLink": "L1"}
+        ids = [f"P{page}A", f"P{page}B"]
+        chunks = ['{"value": [', json.dumps(_item(ids[0])), ",", json.dumps(_item(ids[1])), "], "
+                  + json.dumps(tail)[1:]]
+
+        def gen():
+            try:
+                for i, c in enumerate(chunks):
+                    if page == self.fail_page and i == 2:
+                        raise ConnectionError("connection reset by peer")
+                    self.read.append((page, i))
+                    yield c.encode("utf-8")
+            finally:
+                self.closed.append(page)
+
+        return ListingPage(gen())
+
+
+def _streaming_watcher(tmp_path, fail_page=None):
+    client = StreamingClient(fail_page)
+    w = GraphWatcher(
+        tenant_id="t", client_id="c", drive_id="d", folder_item_id="f", state_dir=tmp_path, client=client,
+    )
+    return w, client
+
+
+def test_delta_page_is_read_and_closed_before_its_items_are_yielded(tmp_path, monkeypatch):
+    w, client = _streaming_watcher(tmp_path)
+    monkeypatch.setattr(w, "_sleep", lambda seconds: (_ for _ in ()).throw(_Stop()))
+    changes = w.delta_changes()
+
+    # A slow consumer holds the first item for as long as it likes: the page is already closed
+    first = next(changes)
+    assert first.item_id == "P1A"
+    assert (1, 4) in client.read and client.closed == [1]
+    assert all(page == 1 for page, _ in client.read)
+    assert not w.delta_link_path.exists()
+
+    rest = []
+    with pytest.raises(_Stop):
+        for item in changes:
+            rest.append(item.item_id)
+    assert rest == ["P1B", "P2A", "P2B"]
+    assert client.closed == [1, 2]
+    assert w.delta_link_path.read_text() == "L1"
+
+
+def test_page_failing_midway_yields_none_of_its_items(tmp_path, monkeypatch):
+    w, client = _streaming_watcher(tmp_path, fail_page=2)
+    monkeypatch.setattr(w, "_sleep", lambda seconds: (_ for _ in ()).throw(_Stop()))
+
+    seen = []
+    with pytest.raises(ConnectionError):
+        for item in w.delta_changes():
+            seen.append(item.item_id)
+
+    assert seen == ["P1A", "P1B"]
+    assert client.closed == [1, 2]
+    assert not w.delta_link_path.exists()
+
+
+def test_startup_scan_yields_a_page_once_it_is_read(tmp_path):
+    w, client = _streaming_watcher(tmp_path)
+    scan = w.startup_scan()
+
+    assert next(scan).item_id == "P1A"
+    assert client.closed == [1] and all(page == 1 for page, _ in client.read)
+    assert [it.item_id for it in scan] == ["P1B", "P2A", "P2B"]
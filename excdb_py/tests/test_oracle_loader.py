@@ -0,0 +1,239 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("oracledb")
+
+import oracle_loader
+from fingerprint import row_fingerprint
+from oracle_loader import OracleConfig, OracleLoader
+
+
+def _load(monkeypatch, fake_connection, rows=200, row_count=None, **cfg):
+    plan = SimpleNamespace(sheet_name="Data", logical_name="SALES", columns=["ID", "NOTE"], varchar2_len=4000)
+    data = [(str(i), "x" * 1000) for i in range(rows)]   # ~64 rows per 64 KB batch
+    monkeypatch.setattr(oracle_loader, "sheet_rows", lambda *a, **k: iter([data]))
+    config = dict(dsn="db", user="u", password="p", retain_versions=0, batch_max_bytes=64 * 1024)
+    config.update(cfg)
+    loader = OracleLoader(OracleConfig(**config))
+    loader.conn = fake_connection()
+    loader.load_sheet_atomic(plan, "book.xlsx", "item-1", row_count=row_count)
+    return loader.conn.log
+
+
+def _inserts(log):
+    return [e for e in log if e[0] == "executemany" and e[1].startswith("INSERT")]
+
+
+def _sql(log, prefix):
+    return [e[1] for e in log if e[0] == "execute" and e[1].startswith(prefix)]
+
+
+def test_direct_path_load(monkeypatch, fake_connection):
+    log = _load(monkeypatch, fake_connection, bulk_mode="always", bulk_nologging=True, bulk_compress=True)
+
+    (create,) = _sql(log, "CREATE TABLE")
+    assert create.endswith(") NOLOGGING COMPRESS")
+    physical = create.split()[2]
+
+    inserts = _inserts(log)
+    assert len(inserts) > 1
+    assert sum(n for _, _, n in inserts) == 200
+    assert {sql for _, sql, _ in inserts} == {f"INSERT /*+ APPEND_VALUES */ INTO {physical} (ID, NOTE) VALUES (:1, :2)"}
+    for i, entry in enumerate(log):
+        if entry in inserts:
+            assert log[i + 1] == ("commit",), "every direct-path batch must commit before the next one"
+
+    alter = log.index(("execute", f"ALTER TABLE {physical} LOGGING"))
+    assert alter > max(i for i, e in enumerate(log) if e in inserts)
+    assert alter < log.index(next(e for e in log if e[0] == "execute" and "CREATE OR REPLACE VIEW" in e[1]))
+
+
+def test_conventional_load(monkeypatch, fake_connection):
+    log = _load(monkeypatch, fake_connection, bulk_mode="off", bulk_nologging=True, bulk_compress=True)
+
+    (create,) = _sql(log, "CREATE TABLE")
+    assert "NOLOGGING" not in create and "COMPRESS" not in create
+    inserts = _inserts(log)
+    assert all(sql.startswith("INSERT INTO") for _, sql, _ in inserts)
+    first_commit = log.index(("commit",))
+    assert first_commit > log.index(inserts[-1])
+    assert not _sql(log, "ALTER TABLE")
+
+
+def test_direct_path_without_nologging_keeps_logging(monkeypatch, fake_connection):
+    log = _load(monkeypatch, fake_connection, bulk_mode="always")
+
+    (create,) = _sql(log, "CREATE TABLE")
+    assert "NOLOGGING" not in create and "COMPRESS" not in create
+    assert all("APPEND_VALUES" in sql for _, sql, _ in _inserts(log))
+    assert not _sql(log, "ALTER TABLE")
+
+
+@pytest.mark.parametrize("row_count, direct", [(None, False), (99, False), (100, True), (5000, True)])
+def test_auto_mode_row_threshold(monkeypatch, fake_connection, row_count, direct):
+    log = _load(monkeypatch, fake_connection, rows=10, row_count=row_count, bulk_mode="auto", bulk_min_rows=100)
+
+    assert all(("APPEND_VALUES" in sql) == direct for _, sql, _ in _inserts(log))
+
+
+def test_tolerant_mode_never_loads_direct_path(monkeypatch, fake_connection, tmp_path):
+    log = _load(monkeypatch, fake_connection, rows=10, row_count=10, bulk_mode="always", error_mode="tolerant",
+                reject_dir=str(tmp_path))
+
+    assert all("APPEND_VALUES" not in sql for _, sql, _ in _inserts(log))
+
+
+def test_all_mismatching_columns_are_demoted_in_one_reload(monkeypatch, fake_connection):
+    import column_types
+    from column_types import NUMBER, ColumnType
+
+    plan = SimpleNamespace(sheet_name="Data", logical_name="SALES", columns=["A", "B", "C"], varchar2_len=4000)
+    data = [("1", "2", "3"), ("x", "5", "6"), ("7", "8", "9"), ("10", "11", "n/a")]
+    monkeypatch.setattr(oracle_loader, "sheet_rows", lambda *a, **k: iter([data]))
+    monkeypatch.setattr(column_types, "sheet_rows", lambda *a, **k: iter([data]))
+    loader = OracleLoader(OracleConfig(dsn="db", user="u", password="p", retain_versions=0))
+    loader.conn = fake_connection()
+
+    loader.load_sheet_atomic(plan, "book.xlsx", "item-1", column_types=[ColumnType(NUMBER)] * 3)
+
+    creates = _sql(loader.conn.log, "CREATE TABLE")
+    assert len(creates) == 2
+    assert "(A VARCHAR2(4000), B NUMBER, C VARCHAR2(4000))" in creates[1]
+    assert sum(n for _, _, n in _inserts(loader.conn.log)) == len(data)
+
+
+def _like(pattern, name):
+    """
+    Oracle LIKE with ESCAPE '\\', for the fake catalog.
+    """
+    regex, chars = "", iter(pattern)
+    for ch in chars:
+        if ch == "\\":
+            regex += re.escape(next(chars))
+        else:
+            regex += {"_": ".", "%": ".*"}.get(ch, re.escape(ch))
+    return re.fullmatch(regex, name) is not None
+
+
+def _catalog(tables, referenced):
+    """
+    rows() for a fake schema: user_tables holds `tables`, views and synonyms read `referenced`.
+    """
+    def rows(sql, params):
+        if "FROM user_tables" in sql:
+            return [(t,) for t in sorted(tables, reverse=True) if _like(params["like"], t)]
+        if "FROM user_dependencies" in sql:
+            return [(t,) for t in sorted(referenced) if _like(params["like"], t)]
+        return []
+    return rows
+
+
+def test_long_logical_names_with_a_common_prefix_keep_separate_versions(fake_connection):
+    loader = OracleLoader(OracleConfig(dsn="db", user="u", password="p", ident_max=30, retain_versions=1))
+    north, south = "QUARTERLY_SALES_NORTH_REGION", "QUARTERLY_SALES_SOUTH_REGION"
+
+    bases = {loader._physical_base(north), loader._physical_base(south)}
+    assert len(bases) == 2
+    assert all(len(loader._physical_name(n)) <= 30 for n in (north, south))
+
+    versions = {n: [f"{loader._physical_base(n)}_2024010{d}_000000000" for d in (1, 2, 3)] for n in (north, south)}
+    tables = versions[north] + versions[south] + [f"{loader._physical_base(north)}X_20240101_000000000"]
+    conn = fake_connection(rows=_catalog(tables, referenced={versions[north][2], versions[south][2]}))
+
+    loader._cleanup_old_versions(conn, north)
+
+    assert _sql(conn.log, "DROP TABLE") == [f"DROP TABLE {t} PURGE" for t in reversed(versions[north][:2])]
+
+
+def test_cleanup_keeps_versions_a_view_or_synonym_still_reads(fake_connection):
+    loader = OracleLoader(OracleConfig(dsn="db", user="u", password="p", retain_versions=1))
+    old, held, live = (f"{loader._physical_base('SALES')}_2024010{d}_000000000" for d in (1, 2, 3))
+    conn = fake_connection(rows=_catalog([old, held, live], referenced={held, live}))
+
+    loader._cleanup_old_versions(conn, "SALES")
+
+    assert _sql(conn.log, "DROP TABLE") == [f"DROP TABLE {old} PURGE"]
+
+
+_OLD = [(str(i), f"note {i}") for i in range(1, 11)]
+_NEW = [r for r in _OLD if r[0] != "3"] + [("11", "note 11")]
+_NEW[1] = ("2", "edited")
+
+
+def _delta_load(monkeypatch, fake_connection, previous_rows, **cfg):
+    plan = SimpleNamespace(sheet_name="Data", logical_name="SALES", columns=["ID", "NOTE"], varchar2_len=4000)
+    monkeypatch.setattr(oracle_loader, "sheet_rows", lambda *a, **k: iter([list(_NEW)]))
+    loader = OracleLoader(OracleConfig(dsn="db", user="u", password="p", retain_versions=0, load_mode="delta", **cfg))
+    previous = "PHYS_SALES_20240101_000000000"
+
+    def rows(sql, params):
+        if "FROM user_dependencies" in sql:
+            return [(previous,)]
+        if "FROM user_tab_columns" in sql:
+            return [("ID", "VARCHAR2", 4000), ("NOTE", "VARCHAR2", 4000), ("ROW_FP__", "VARCHAR2", 40)]
+        if sql.endswith(f"FROM {previous}"):
+            return previous_rows
+        return []
+
+    loader.conn = fake_connection(rows=rows)
+    loader.load_sheet_atomic(plan, "book.xlsx", "item-1")
+    (create,) = _sql(loader.conn.log, "CREATE TABLE")
+    physical = create.split()[2]
+    assert create == f"CREATE TABLE {physical} AS SELECT * FROM {previous}"
+    assert _sql(loader.conn.log, "CREATE OR REPLACE VIEW") == [
+        f"CREATE OR REPLACE VIEW LOG_SALES AS SELECT ID, NOTE FROM {physical}"
+    ]
+    return physical, {sql.split(f" {physical}")[0]: rows for sql, rows in loader.conn.batches}
+
+
+def test_delta_by_fingerprint_deletes_and_inserts_only_changed_rows(monkeypatch, fake_connection):
+    physical, batches = _delta_load(monkeypatch, fake_connection, [(row_fingerprint(r),) for r in _OLD])
+
+    assert sorted(batches) == ["DELETE FROM", "INSERT INTO"]
+    assert sorted(batches["DELETE FROM"]) == sorted([(row_fingerprint(_OLD[1]), 1), (row_fingerprint(_OLD[2]), 1)])
+    assert batches["INSERT INTO"] == [_NEW[1] + (row_fingerprint(_NEW[1]),), _NEW[-1] + (row_fingerprint(_NEW[-1]),)]
+
+
+def test_delta_by_key_updates_changed_rows(monkeypatch, fake_connection):
+    physical, batches = _delta_load(
+        monkeypatch, fake_connection, [(r[0], row_fingerprint(r)) for r in _OLD], delta_keys={"SALES": "ID"},
+    )
+
+    assert sorted(batches) == ["DELETE FROM", "INSERT INTO", "UPDATE"]
+    assert batches["DELETE FROM"] == [("3",)]
+    assert batches["UPDATE"] == [("2", "edited", row_fingerprint(_NEW[1]), "2")]
+    assert batches["INSERT INTO"] == [("11", "note 11", row_fingerprint(_NEW[-1]))]
+
+
+def test_text_binds_are_sized_from_the_inferred_width(monkeypatch, fake_connection):
+    from column_types import NUMBER, VARCHAR2, ColumnType
+
+    plan = SimpleNamespace(sheet_name="Data", logical_name="SALES", columns=["ID", "CODE", "NOTE"], varchar2_len=4000)
+    monkeypatch.setattr(oracle_loader, "sheet_rows", lambda *a, **k: iter([[("1", "AB", "note")]]))
+    loader = OracleLoader(OracleConfig(dsn="db", user="u", password="p", retain_versions=0))
+    loader.conn = fake_connection()
+
+    types = [ColumnType(NUMBER), ColumnType(VARCHAR2, 16), ColumnType(VARCHAR2, 255)]
+    loader.load_sheet_atomic(plan, "book.xlsx", "item-1", column_types=types)
+
+    assert loader.conn.input_sizes == [(oracle_loader.oracledb.DB_TYPE_NUMBER, 16, 255)]
+
+
+@pytest.mark.parametrize("parallelism", [1, 3])
+def test_a_failed_sheet_does_not_stop_the_others(monkeypatch, parallelism):
+    sheets = [SimpleNamespace(sheet_name=n, logical_name=n) for n in ("A", "B", "C")]
+    loaded = []
+
+    def load_sheet_atomic(sheet_plan, **kw):
+        if sheet_plan.sheet_name == "A":
+            raise RuntimeError("A failed")
+        loaded.append(sheet_plan.sheet_name)
+
+    loader = OracleLoader(OracleConfig(dsn="db", user="u", password="p", parallelism=parallelism))
+    monkeypatch.setattr(loader, "load_sheet_atomic", load_sheet_atomic)
+
+    with pytest.raises(RuntimeError, match="A failed"):
+        loader.load_sheets(sheets, "book.xlsx", "item-1")
+    assert sorted(loaded) == ["B", "C"]
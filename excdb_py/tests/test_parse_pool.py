@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from parse_pool import ParsePool
+from xlsx_stream import iter_sheet_rows_stream
+
+
+def _plan(**kw):
+    plan = dict(sheet_name="Data", logical_name="DATA", columns=["ID", "NAME", "AMOUNT"], varchar2_len=4000)
+    return SimpleNamespace(**{**plan, **kw})
+
+
+@pytest.fixture(scope="module")
+def big_book(tmp_path_factory):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["ID", "NAME", "AMOUNT"])
+    for i in range(2500):
+        ws.append([i, f"name {i}" if i % 7 else None, i * 1.25])
+    path = tmp_path_factory.mktemp("pool") / "big.xlsx"
+    wb.save(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ParsePool(processes=2, max_in_flight=2, split_rows=1000) as p:
+        yield p
+
+
+def _rows(batches):
+    return [row for batch in batches for row in batch]
+
+
+def test_split_sheet_comes_back_in_order(pool, big_book):
+    assert len(pool._ranges(big_book, _plan())) == 2
+
+    expected = _rows(iter_sheet_rows_stream(big_book, _plan(), batch_size=300))
+    assert len(expected) == 2500
+    assert _rows(pool.iter_sheet_rows(big_book, _plan(), batch_size=300)) == expected
+
+
+def test_abandoned_task_leaves_the_workers_usable(pool, big_book):
+    batches = pool.iter_sheet_rows(big_book, _plan(), batch_size=100)
+    first = next(batches)
+    batches.close()   # e.g. type inference stops after its sample
+
+    assert first[0] == ("0", None, "0")
+    assert len(_rows(pool.iter_sheet_rows(big_book, _plan(), batch_size=500))) == 2500
+
+
+def test_worker_errors_reach_the_consumer(pool, big_book):
+    with pytest.raises(RuntimeError, match="ValueError"):
+        _rows(pool.iter_sheet_rows(big_book, _plan(varchar2_len=5, truncate_overflow="error")))
+    with pytest.raises(RuntimeError, match="Sheet not found"):
+        _rows(pool.iter_sheet_rows(big_book, _plan(sheet_name="Missing")))
+    assert len(_rows(pool.iter_sheet_rows(big_book, _plan()))) == 2500
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from pipeline import Stage, StagedPipeline
+
+
+def _slow(seconds):
+    def fn(x):
+        time.sleep(seconds)
+        return x
+    return fn
+
+
+def test_exception_in_block_cancels_without_deadlock():
+    finished = []
+    p = StagedPipeline(
+        [Stage("a", _slow(0.05)), Stage("b", _slow(0.2)), Stage("c", _slow(0.2))],
+        queue_size=1,
+        max_in_flight=8,
+        on_finish=lambda key, token: finished.append(key),
+    )
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        with p:
+            for i in range(8):
+                p.submit(str(i), i)
+            raise RuntimeError("watcher failed")
+
+    assert time.monotonic() - started < 5
+    assert sorted(finished) == [str(i) for i in range(8)]
+    assert not [t for t in threading.enumerate() if t.name.split("-")[0] in ("a", "b", "c")]
+
+
+def test_clean_exit_runs_every_unit():
+    done = []
+    p = StagedPipeline([Stage("x", lambda v: v), Stage("y", done.append)], queue_size=1, max_in_flight=4)
+    with p:
+        for i in range(20):
+            p.submit(str(i % 3), i)
+    assert sorted(done) == list(range(20))
+
+
+def test_cancel_finishes_units_waiting_behind_a_running_key():
+    finished = []
+    release = threading.Event()
+    p = StagedPipeline([Stage("k", lambda v: release.wait(5))], max_in_flight=4,
+                       on_finish=lambda key, token: finished.append(token))
+    p.start()
+    for token in range(3):
+        p.submit("K", None, token)   # 0 runs; 1 and 2 wait for it
+    time.sleep(0.1)
+
+    threading.Timer(0.2, release.set).start()
+    p.close(cancel=True, timeout=5)
+
+    assert finished == [0, 1, 2]
+    assert p._in_flight == 0 and not p._active
+    for _ in range(4):
+        assert p._slots.acquire(timeout=1)
@@ -0,0 +1,252 @@
+import json
+import os
+import random
+import threading
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from range_download import QuickXorHash, RangedDownloader, quick_xor_file
+
+MB = 1024 * 1024
+
+
+class RangeServer(ThreadingHTTPServer):
+    """
+    Serves one mutable file with Range/If-Range like the Graph download URLs do, and records requests.
+      - `truncate`: part starts whose first answer stops halfway (correct headers, short body)
+      - `after_probe`: called once after the first Range: bytes=0-0 request
+    """
+
+    daemon_threads = True
+
+    def __init__(self, content: bytes, etag: str = '"v1"') -> None:
+        super().__init__(("127.0.0.1", 0), _RangeHandler)
+        self.content = content
+        self.etag = etag
+        self.requests = []
+        self.truncate = set()
+        self.after_probe = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/file.xlsx"
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        srv = self.server
+        rng = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        with srv._lock:
+            srv.requests.append({"range": rng, "if_range": if_range, "encoding": self.headers.get("Accept-Encoding")})
+            data, etag = srv.content, srv.etag
+            hook = srv.after_probe if rng == "bytes=0-0" else None
+            if hook is not None:
+                srv.after_probe = None
+
+        if rng and (if_range is None or if_range == etag):
+            start, _, end = rng[len("bytes="):].partition("-")
+            start, end = int(start), min(int(end), len(data) - 1)
+            body = data[start:end + 1]
+            with srv._lock:
+                if start in srv.truncate:
+                    srv.truncate.discard(start)
+                    body = body[: len(body) // 2]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if hook is not None:
+            hook(srv)
+
+
+class _Response:
+    def __init__(self, resp) -> None:
+        self._resp = resp
+        self.status_code = resp.status
+        self.headers = resp.headers
+        self.url = resp.geturl()
+
+    def raise_for_status(self) -> None:
+        pass   # urllib raises HTTPError itself
+
+    def iter_bytes(self, chunk_size: int = MB):
+        return iter(lambda: self._resp.read(chunk_size), b"")
+
+
+class UrllibHttp:
+    """
+    Minimal stand-in for http_backend's stream() interface.
+    """
+
+    @contextmanager
+    def stream(self, url, headers, timeout):
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+            yield _Response(resp)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(content: bytes) -> RangeServer:
+        srv = RangeServer(content)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return srv
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _content(size: int, seed: int = 1) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+def _downloader(**kw) -> RangedDownloader:
+    return RangedDownloader(UrllibHttp(), headers=lambda: {}, part_size=MB, workers=2, **kw)
+
+
+def _part_ranges(srv: RangeServer):
+    return [r["range"] for r in srv.requests if r["range"] != "bytes=0-0"]
+
+
+def test_parts_are_fetched_with_identity_encoding(serve, tmp_path):
+    data = _content(3 * MB + 123)
+    srv = serve(data)
+    out = tmp_path / "book.xlsx"
+
+    _downloader().download(srv.url, out, expected_size=len(data), expected_quick_xor=_quick_xor_b64(data))
+
+    assert out.read_bytes() == data
+    assert not (tmp_path / "book.xlsx.part").exists() and not (tmp_path / "book.xlsx.part.json").exists()
+    assert sorted(_part_ranges(srv)) == sorted(
+        [f"bytes=0-{MB - 1}", f"bytes={MB}-{2 * MB - 1}", f"bytes={2 * MB}-{3 * MB - 1}", f"bytes={3 * MB}-{len(data) - 1}"]
+    )
+    assert {r["encoding"] for r in srv.requests} == {"identity"}
+    assert {r["if_range"] for r in srv.requests if r["range"] != "bytes=0-0"} == {'"v1"'}
+
+
+def test_resume_from_checkpoint(serve, tmp_path):
+    data = _content(3 * MB)
+    srv = serve(data)
+    out = tmp_path / "book.xlsx"
+    part = tmp_path / "book.xlsx.part"
+    # An earlier run wrote part 0 completely and half of part 1
+    buf = bytearray(len(data))
+    buf[: MB + MB // 2] = data[: MB + MB // 2]
+    part.write_bytes(bytes(buf))
+    (tmp_path / "book.xlsx.part.json").write_text(
+        json.dumps({"size": len(data), "etag": '"v1"', "part_size": MB, "written": [MB, MB // 2, 0]})
+    )
+
+    _downloader().download(srv.url, out, expected_size=len(data))
+
+    assert out.read_bytes() == data
+    assert sorted(_part_ranges(srv)) == [f"bytes={MB + MB // 2}-{2 * MB - 1}", f"bytes={2 * MB}-{3 * MB - 1}"]
+
+
+def test_stale_checkpoint_is_not_resumed(serve, tmp_path):
+    data = _content(2 * MB)
+    srv = serve(data)
+    out = tmp_path / "book.xlsx"
+    (tmp_path / "book.xlsx.part").write_bytes(bytes(len(data)))
+    (tmp_path / "book.xlsx.part.json").write_text(
+        json.dumps({"size": len(data), "etag": '"v0"', "part_size": MB, "written": [MB, MB]})
+    )
+
+    _downloader().download(srv.url, out)
+
+    assert out.read_bytes() == data
+    assert len(_part_ranges(srv)) == 2
+
+
+def test_short_read_resumes_the_part_where_it_stopped(serve, tmp_path):
+    data = _content(2 * MB)
+    srv = serve(data)
+    srv.truncate = {MB}
+    out = tmp_path / "book.xlsx"
+
+    _downloader().download(srv.url, out, expected_size=len(data))
+
+    assert out.read_bytes() == data
+    assert sorted(_part_ranges(srv)) == sorted(
+        [f"bytes=0-{MB - 1}", f"bytes={MB}-{2 * MB - 1}", f"bytes={MB + MB // 2}-{2 * MB - 1}"]
+    )
+
+
+def test_if_range_mismatch_restarts_the_download(serve, tmp_path):
+    old, new = _content(2 * MB, seed=1), _content(2 * MB + 10, seed=2)
+    srv = serve(old)
+
+    def replace_file(s):
+        s.content, s.etag = new, '"v2"'
+
+    srv.after_probe = replace_file
+    out = tmp_path / "book.xlsx"
+
+    _downloader().download(srv.url, out, expected_size=len(new), expected_quick_xor=_quick_xor_b64(new))
+
+    assert out.read_bytes() == new
+    probes = [r for r in srv.requests if r["range"] == "bytes=0-0"]
+    assert len(probes) == 2
+    assert {r["if_range"] for r in srv.requests[-2:]} == {'"v2"'}
+
+
+@pytest.mark.parametrize("size_delta, bad_hash", [(1, False), (0, True)])
+def test_verification_failure_discards_the_download(serve, tmp_path, size_delta, bad_hash):
+    data = _content(MB + 5)
+    srv = serve(data)
+    out = tmp_path / "book.xlsx"
+    expected_hash = _quick_xor_b64(data[::-1] if bad_hash else data)
+
+    with pytest.raises(RuntimeError, match="quickXorHash mismatch" if bad_hash else "Size mismatch"):
+        _downloader().download(srv.url, out, expected_size=len(data) + size_delta, expected_quick_xor=expected_hash)
+
+    assert not out.exists()
+    assert not (tmp_path / "book.xlsx.part").exists() and not (tmp_path / "book.xlsx.part.json").exists()
+
+
+def _reference_quick_xor(data: bytes) -> bytes:
+    # Straight from the spec: byte i XORed in at bit (11 * i) mod 160, length into the last 8 bytes
+    ring = 0
+    for i, b in enumerate(data):
+        shift = (11 * i) % 160
+        v = b << shift
+        ring ^= (v & ((1 << 160) - 1)) ^ (v >> 160)
+    out = bytearray(ring.to_bytes(20, "little"))
+    for i, lb in enumerate(len(data).to_bytes(8, "little")):
+        out[12 + i] ^= lb
+    return bytes(out)
+
+
+def _quick_xor_b64(data: bytes) -> str:
+    h = QuickXorHash()
+    h.update(data)
+    return h.b64digest()
+
+
+@pytest.mark.parametrize("chunks", [[b""], [b"a"], [os.urandom(1000)], [os.urandom(159), os.urandom(1), os.urandom(321)]])
+def test_quick_xor_matches_reference(chunks, tmp_path):
+    h = QuickXorHash()
+    for c in chunks:
+        h.update(c)
+    data = b"".join(chunks)
+    assert h.digest() == _reference_quick_xor(data)
+    path = tmp_path / "f"
+    path.write_bytes(data)
+    assert quick_xor_file(path, chunk_size=7) == h.b64digest()
@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+from state_store import SqliteStateStore
+
+
+def _committed(store):
+    conn = sqlite3.connect(str(store.path))
+    try:
+        return [r[0] for r in conn.execute("SELECT item_id FROM processed_items ORDER BY item_id")]
+    finally:
+        conn.close()
+
+
+def _eventually(fn, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if fn():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_idle_marks_are_committed_without_another_save(tmp_path):
+    store = SqliteStateStore(tmp_path, commit_every=100, commit_seconds=0.2)
+    store.load()
+    try:
+        store.mark_processed("a", "e1", "2024-01-01T00:00:00Z")
+        store.save()
+        assert _committed(store) == []   # below commit_every, not yet due
+
+        assert _eventually(lambda: _committed(store) == ["a"])
+        assert store._timer is None
+    finally:
+        store.close()
+
+
+def test_commit_every_still_commits_immediately(tmp_path):
+    store = SqliteStateStore(tmp_path, commit_every=2, commit_seconds=60)
+    store.load()
+    try:
+        store.mark_processed("a", "e1", "t")
+        store.mark_processed("b", "e1", "t")
+        store.save()
+        assert _committed(store) == ["a", "b"]
+        assert store._timer is None
+    finally:
+        store.close()
+
+
+def test_close_commits_and_stops_the_timer(tmp_path):
+    store = SqliteStateStore(tmp_path, commit_every=100, commit_seconds=60)
+    store.load()
+    store.mark_processed("a", "e1", "t")
+    timer = store._timer
+    store.close()
+
+    assert _committed(store) == ["a"]
+    timer.join(1)
+    assert not timer.is_alive()
@@ -0,0 +1,207 @@
+import re
+import zipfile
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from xlsx_stream import SharedStrings, XlsxStream, iter_sheet_rows_stream
+
+
+def _plan(columns, varchar2_len=4000, **kw):
+    return SimpleNamespace(sheet_name="Data", logical_name="DATA", columns=columns, varchar2_len=varchar2_len, **kw)
+
+
+def _openpyxl_rows(path, sheet="Data"):
+    """
+    Reference layout via openpyxl: header = first non-blank row, column 0 = its first non-blank
+    cell, data = the later non-blank rows, header-wide.
+    """
+    ws = openpyxl.load_workbook(path, read_only=True)[sheet]
+    rows = [r for r in ws.iter_rows(values_only=True) if any(v is not None for v in r)]
+    header = rows[0]
+    offset = next(i for i, v in enumerate(header) if v is not None)
+    width = len(header) - offset
+    out = []
+    for r in rows[1:]:
+        vals = tuple((list(r[offset:]) + [None] * width)[:width])
+        if any(v is not None for v in vals):
+            out.append(vals)
+    return [tuple(h for h in header[offset:])], out
+
+
+def _stream_rows(path, columns, **kw):
+    return [row for batch in iter_sheet_rows_stream(path, _plan(columns), batch_size=7, as_text=False, **kw)
+            for row in batch]
+
+
+_SST_CT = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+_SST_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+
+def _to_shared_strings(path):
+    """
+    openpyxl writes every string inline; Excel writes them to xl/sharedStrings.xml. Rewrites the
+    workbook the way Excel would, so both layouts get read.
+    """
+    with zipfile.ZipFile(path) as z:
+        parts = {name: z.read(name) for name in z.namelist()}
+    strings = {}   # text -> index, in order of first use
+
+    def shared(m):
+        idx = strings.setdefault(m.group(1), len(strings))
+        return b't="s"><v>%d</v>' % idx
+
+    for name in [n for n in parts if n.startswith("xl/worksheets/")]:
+        parts[name] = re.sub(rb't="inlineStr"><is><t(?:\s[^>]*)?>(.*?)</t></is>', shared, parts[name])
+    parts["xl/sharedStrings.xml"] = (
+        b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        + b"".join(b"<si><t>" + t + b"</t></si>" for t in strings) + b"</sst>"
+    )
+    parts["[Content_Types].xml"] = parts["[Content_Types].xml"].replace(
+        b"</Types>", f'<Override PartName="/xl/sharedStrings.xml" ContentType="{_SST_CT}"/></Types>'.encode())
+    parts["xl/_rels/workbook.xml.rels"] = parts["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>",
+        f'<Relationship Id="rIdSst" Target="sharedStrings.xml" Type="{_SST_REL}"/></Relationships>'.encode())
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in parts.items():
+            z.writestr(name, data)
+
+
+@pytest.fixture(params=["shared", "inline"])
+def book(tmp_path, request):
+    """
+    Header at B2; strings (shared or inline), numbers, booleans, dates, sparse cells and blank rows below it.
+    """
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws["B2"], ws["C2"], ws["D2"], ws["E2"] = "ID", "NAME", "WHEN", "FLAG"
+    r = 3
+    for i in range(60):
+        if i % 11 == 5:
+            r += 1   # a blank row
+        ws.cell(r, 2, i)
+        if i % 3:
+            ws.cell(r, 3, f"name {i % 4} é✓")
+        if i % 4 == 0:
+            ws.cell(r, 4, datetime(2024, 1, 1 + i % 28, 12, 30, 15))
+        elif i % 4 == 1:
+            ws.cell(r, 4, date(1999, 12, 31))
+        elif i % 4 == 2:
+            ws.cell(r, 4, 1.5 + i)
+        if i % 5 == 0:
+            ws.cell(r, 5, bool(i % 2))
+        r += 1
+    wb.create_sheet("Other")["A1"] = "x"
+    path = tmp_path / "book.xlsx"
+    wb.save(path)
+    if request.param == "shared":
+        _to_shared_strings(path)
+    return path
+
+
+def test_stream_matches_openpyxl(book):
+    header, expected = _openpyxl_rows(book)
+
+    assert header == [("ID", "NAME", "WHEN", "FLAG")]
+    assert _stream_rows(book, list(header[0])) == expected
+
+
+def test_row_ranges_match_openpyxl(book):
+    _, expected = _openpyxl_rows(book)
+    rows_by_number = {}
+    with XlsxStream(book) as x:
+        for num, cells in x.iter_rows("Data"):
+            rows_by_number[num] = cells
+    data_numbers = sorted(rows_by_number)[1:]
+
+    for first, last in [(3, 10), (20, 40), (50, None), (200, None)]:
+        want = [expected[i] for i, n in enumerate(data_numbers) if n >= first and (last is None or n <= last)]
+        assert _stream_rows(book, ["ID", "NAME", "WHEN", "FLAG"], row_range=(first, last)) == want
+
+
+def test_inline_strings_match_openpyxl(tmp_path):
+    sheet = (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>CODE</t></is></c>'
+        '<c r="B1" t="inlineStr"><is><t>TEXT</t></is></c></row>'
+        '<row r="2"><c r="A2"><v>7</v></c>'
+        '<c r="B2" t="inlineStr"><is><r><t>rich </t></r><r><t>run</t></r></is></c></row>'
+        '<row r="4"><c r="B4" t="inlineStr"><is><t>sparse</t></is></c></row>'
+        '</sheetData></worksheet>'
+    )
+    path = tmp_path / "inline.xlsx"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("[Content_Types].xml",
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/xl/workbook.xml" '
+                   'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                   '<Override PartName="/xl/worksheets/sheet1.xml" '
+                   'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                   '</Types>')
+        z.writestr("_rels/.rels",
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+                   'officeDocument/2006/relationships/officeDocument"/></Relationships>')
+        z.writestr("xl/workbook.xml",
+                   '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                   'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                   '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        z.writestr("xl/_rels/workbook.xml.rels",
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+                   'officeDocument/2006/relationships/worksheet"/></Relationships>')
+        z.writestr("xl/worksheets/sheet1.xml", sheet)
+
+    header, expected = _openpyxl_rows(path)
+
+    assert expected == [(7, "rich run"), (None, "sparse")]
+    assert _stream_rows(path, list(header[0])) == expected
+
+
+def test_text_overflow_truncates_or_raises(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["ID", "NOTE"])
+    ws.append([1, "ab€cd"])   # "€" is 3 UTF-8 bytes: 7 bytes in all
+    path = tmp_path / "long.xlsx"
+    wb.save(path)
+
+    rows = [r for b in iter_sheet_rows_stream(path, _plan(["ID", "NOTE"], varchar2_len=4)) for r in b]
+    assert rows == [("1", "ab")]   # never splits a character
+
+    with pytest.raises(ValueError, match="VARCHAR2\\(4\\)"):
+        list(iter_sheet_rows_stream(path, _plan(["ID", "NOTE"], varchar2_len=4, truncate_overflow="error")))
+    rows = [r for b in iter_sheet_rows_stream(path, _plan(["ID", "NOTE"], varchar2_len=7, truncate_overflow="error"))
+            for r in b]
+    assert rows == [("1", "ab€cd")]
+
+
+def test_shared_strings_table():
+    table = SharedStrings()
+    for text in ["", "plain", "é✓ mixed", "x" * 5000]:
+        table.append(text)
+
+    assert len(table) == 4
+    assert [table[i] for i in range(4)] == ["", "plain", "é✓ mixed", "x" * 5000]
+    assert table[-2] == "é✓ mixed"
+    assert table.nbytes >= len("é✓ mixed".encode("utf-8")) + 5005
+    with pytest.raises(IndexError):
+        table[4]
+
+
+@pytest.mark.parametrize("book", ["shared"], indirect=True)
+def test_shared_strings_are_read_in_workbook_order(book):
+    with XlsxStream(book) as x:
+        strings = x.shared_strings()
+        listed = [strings[i] for i in range(len(strings))]
+
+    assert listed[:5] == ["ID", "NAME", "WHEN", "FLAG", "name 1 é✓"]
+    assert sorted(listed) == sorted({"ID", "NAME", "WHEN", "FLAG", "x"} | {f"name {i} é✓" for i in range(4)})
+    assert x.shared_strings() is strings
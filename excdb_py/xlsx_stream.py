@@ -0,0 +1,441 @@
+from __future__ import annotations
+
+import logging
+import posixpath
+import re
+import zipfile
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import XMLPullParser, iterparse
+
+from fingerprint import normalize_value
+
+
+log = logging.getLogger("xlsx_stream")
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROW = f"{{{_NS_MAIN}}}row"
+_C = f"{{{_NS_MAIN}}}c"
+_V = f"{{{_NS_MAIN}}}v"
+_IS = f"{{{_NS_MAIN}}}is"
+_T = f"{{{_NS_MAIN}}}t"
+_SI = f"{{{_NS_MAIN}}}si"
+_RPH = f"{{{_NS_MAIN}}}rPh"
+_SHEET_DATA = f"{{{_NS_MAIN}}}sheetData"
+_SHEET_DATA_OPEN_RE = re.compile(rb"<(?:\w+:)?sheetData\b[^>]*>")
+_ROW_OPEN_RE = re.compile(rb"<(?:\w+:)?row\b[^>]*?\sr=\"(\d+)\"")
+_DIMENSION_RE = re.compile(rb"<(?:\w+:)?dimension\s+ref=\"[A-Z]*\d*:?[A-Z]*(\d+)\"")
+
+# Built-in number formats that render as dates/times (ECMA-376 18.8.30)
+_BUILTIN_DATE_FORMATS = frozenset(range(14, 23)) | frozenset(range(27, 37)) | frozenset(range(45, 48)) \
+    | frozenset(range(50, 59))
+# Literal text, colours/conditions ([Red], [<100]) and escapes never make a format a date format;
+# elapsed-time brackets ([h], [mm]) do
+_FMT_NOISE_RE = re.compile(r'"[^"]*"|\\.|\[(?![hms]+\])[^\]]*\]')
+_FMT_DATE_RE = re.compile(r"[dmyhs]", re.IGNORECASE)
+
+_CELL_REF_RE = re.compile(r"([A-Z]+)")
+
+_EPOCH_1900 = datetime(1899, 12, 30)
+_EPOCH_1904 = datetime(1904, 1, 1)
+
+_READ_CHUNK = 64 * 1024
+
+# Set by set_parse_pool() when XLSX_READER=process
+_parse_pool = None
+
+
+def _column_index(ref: str) -> int:
+    """
+    "A1" -> 0, "AB12" -> 27
+    """
+    m = _CELL_REF_RE.match(ref)
+    idx = 0
+    for ch in m.group(1) if m else "":
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+def _is_date_format(code: str) -> bool:
+    return bool(_FMT_DATE_RE.search(_FMT_NOISE_RE.sub("", code)))
+
+
+def _truncate_utf8(s: str, max_bytes: int) -> str:
+    b = s.encode("utf-8")
+    if len(b) <= max_bytes:
+        return s
+    return b[:max_bytes].decode("utf-8", errors="ignore")
+
+
+class SharedStrings:
+    """
+    Compact shared-string table: every entry's UTF-8 bytes in one bytearray, indexed by an
+    offsets array (entry i is buf[offsets[i]:offsets[i + 1]]). Entries are decoded on access,
+    so a table with millions of strings costs about its text size instead of a str object each.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._offsets = array("Q", [0])
+
+    def append(self, text: str) -> None:
+        self._buf += text.encode("utf-8")
+        self._offsets.append(len(self._buf))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"shared string index out of range: {idx}")
+        return self._buf[self._offsets[idx]:self._offsets[idx + 1]].decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._buf) + self._offsets.itemsize * len(self._offsets)
+
+
+class XlsxStream:
+    """
+    Streaming .xlsx reader (no openpyxl, no DOM):
+      - sheet XML is read straight out of the zip and fed to an incremental XMLPullParser;
+        each <row> is dropped as soon as its values are taken, so memory stays at one batch
+      - shared strings are read once per workbook into a SharedStrings table; styles are read once to know which
+        cells hold dates (numeric serials in a date number format)
+    Values come out as openpyxl's values_only would give them: str, int, float, bool, datetime or None.
+    """
+
+    def __init__(self, xlsx_path: Path) -> None:
+        self.xlsx_path = xlsx_path
+        self.zf = zipfile.ZipFile(xlsx_path)
+        self._names = set(self.zf.namelist())
+        self._sheets: Optional[Dict[str, str]] = None
+        self._strings: Optional[SharedStrings] = None
+        self._date_styles: Optional[List[bool]] = None
+        self._epoch = _EPOCH_1900
+
+    def __enter__(self) -> "XlsxStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.zf.close()
+
+    # ---- workbook parts -------------------------------------------------
+
+    def sheet_parts(self) -> Dict[str, str]:
+        """
+        Sheet name -> zip member of its worksheet XML.
+        """
+        if self._sheets is not None:
+            return self._sheets
+        targets: Dict[str, str] = {}
+        rels_path = "xl/_rels/workbook.xml.rels"
+        if rels_path in self._names:
+            for _, el in iterparse(self.zf.open(rels_path)):
+                if el.tag == f"{{{_NS_PKG_REL}}}Relationship":
+                    target = el.get("Target") or ""
+                    if target.startswith("/"):
+                        target = target.lstrip("/")
+                    else:
+                        target = posixpath.normpath(posixpath.join("xl", target))
+                    targets[el.get("Id") or ""] = target
+
+        sheets: Dict[str, str] = {}
+        for _, el in iterparse(self.zf.open("xl/workbook.xml")):
+            if el.tag == f"{{{_NS_MAIN}}}workbookPr" and el.get("date1904") in ("1", "true"):
+                self._epoch = _EPOCH_1904
+            elif el.tag == f"{{{_NS_MAIN}}}sheet":
+                rid = el.get(f"{{{_NS_REL}}}id") or ""
+                if rid in targets:
+                    sheets[el.get("name") or ""] = targets[rid]
+        self._sheets = sheets
+        return sheets
+
+    def shared_strings(self) -> SharedStrings:
+        if self._strings is not None:
+            return self._strings
+        strings = SharedStrings()
+        path = "xl/sharedStrings.xml"
+        if path in self._names:
+            root = None
+            for event, el in iterparse(self.zf.open(path), events=("start", "end")):
+                if root is None:
+                    root = el
+                elif event == "end" and el.tag == _SI:
+                    strings.append(self._si_text(el))
+                    root.clear()   # don't keep one empty <si> element per entry
+            log.debug("%s: %s shared strings in %.1f MB", self.xlsx_path.name, len(strings), strings.nbytes / 1e6)
+        self._strings = strings
+        return strings
+
+    @staticmethod
+    def _si_text(si) -> str:
+        # Plain <t>, or rich-text runs <r><t>; phonetic hints (<rPh>) are not part of the value
+        direct = si.find(_T)
+        if direct is not None:
+            return direct.text or ""
+        parts = []
+        for child in si:
+            if child.tag != _RPH:
+                parts.extend(t.text or "" for t in child.iter(_T))
+        return "".join(parts)
+
+    def date_styles(self) -> List[bool]:
+        """
+        cellXfs index (the cell's s="...") -> True when its number format is a date/time format.
+        """
+        if self._date_styles is not None:
+            return self._date_styles
+        custom: Dict[int, str] = {}
+        flags: List[bool] = []
+        path = "xl/styles.xml"
+        if path in self._names:
+            in_cell_xfs = False
+            for event, el in iterparse(self.zf.open(path), events=("start", "end")):
+                if el.tag == f"{{{_NS_MAIN}}}numFmt" and event == "end":
+                    custom[int(el.get("numFmtId") or 0)] = el.get("formatCode") or ""
+                elif el.tag == f"{{{_NS_MAIN}}}cellXfs":
+                    in_cell_xfs = event == "start"
+                elif el.tag == f"{{{_NS_MAIN}}}xf" and event == "end" and in_cell_xfs:
+                    fmt_id = int(el.get("numFmtId") or 0)
+                    code = custom.get(fmt_id)
+                    flags.append(_is_date_format(code) if code is not None else fmt_id in _BUILTIN_DATE_FORMATS)
+        self._date_styles = flags
+        return flags
+
+    def last_row(self, sheet_name: str) -> Optional[int]:
+        """
+        Last row number from the sheet's <dimension ref="A1:L20001">, or None when absent.
+        Writers don't always keep it exact, so treat it as a size hint.
+        """
+        part = self.sheet_parts().get(sheet_name)
+        if part is None:
+            return None
+        with self.zf.open(part) as f:
+            head = f.read(_READ_CHUNK)
+        m = _DIMENSION_RE.search(head)
+        return int(m.group(1)) if m else None
+
+    # ---- rows -----------------------------------------------------------
+
+    def _cell_value(self, t: Optional[str], raw: Optional[str], style: int) -> Any:
+        if t == "s":
+            return self._strings[int(raw)] if raw is not None else None   # type: ignore[index]
+        if t in ("inlineStr", "str", "e"):
+            return raw
+        if raw is None or raw == "":
+            return None
+        if t == "b":
+            return raw == "1"
+        if t == "d":
+            try:
+                return datetime.fromisoformat(raw.replace("Z", ""))
+            except ValueError:
+                return raw
+        if raw.isdigit() or (raw[0] == "-" and raw[1:].isdigit()):
+            num: Any = int(raw)
+        else:
+            num = float(raw)
+        if style and style < len(self._date_styles or ()) and self._date_styles[style]:   # type: ignore[index]
+            epoch = self._epoch
+            if epoch is _EPOCH_1900 and 1 <= num < 60:
+                epoch = _EPOCH_1900 + timedelta(days=1)   # before Excel's phantom 1900-02-29
+            try:
+                return epoch + timedelta(milliseconds=round(float(num) * 86_400_000))
+            except OverflowError:
+                return num
+        return num
+
+    def iter_rows(
+        self,
+        sheet_name: str,
+        row_range: Optional[Tuple[int, Optional[int]]] = None,
+    ) -> Iterator[Tuple[int, Dict[int, Any]]]:
+        """
+        (row number, {column index: value}) for every row that has cells, in sheet order.
+        row_range=(first, last) limits it to those row numbers (last None = to the end). The first row
+        with cells (the header) is always yielded; after it the reader jumps to row `first` by scanning
+        the raw XML for its <row r=".."> tag and restarting the parser there, so the rows in between
+        cost a byte search rather than a parse.
+        """
+        part = self.sheet_parts().get(sheet_name)
+        if part is None:
+            raise KeyError(f"Sheet not found in {self.xlsx_path.name}: {sheet_name!r}")
+        self.shared_strings()
+        self.date_styles()
+
+        parser = XMLPullParser(events=("start", "end"))
+        sheet_data = None
+        next_row = 1
+        cells: Dict[int, Any] = {}
+        next_col = 0
+        first, last = row_range or (1, None)
+        seen_header = False
+        skip = False
+        head = bytearray()
+        prefix: Optional[bytes] = None   # document start through <sheetData>, to restart the parser
+        seeking = False
+        tail = b""
+        with self.zf.open(part) as f:
+            while True:
+                chunk = f.read(_READ_CHUNK)
+                if prefix is None and not seen_header:
+                    head += chunk
+                    m = _SHEET_DATA_OPEN_RE.search(head)
+                    if m:
+                        prefix = bytes(head[:m.end()])
+                        head = bytearray()
+                data = chunk
+                if seeking:
+                    buf = tail + chunk
+                    pos = next((m.start() for m in _ROW_OPEN_RE.finditer(buf) if int(m.group(1)) >= first), -1)
+                    if pos < 0:
+                        if not chunk:
+                            return
+                        tail = buf[-512:]   # a <row> tag may straddle the chunk boundary
+                        continue
+                    seeking = False
+                    parser = XMLPullParser(events=("start", "end"))
+                    parser.feed(prefix)
+                    data = buf[pos:]
+                if data:
+                    parser.feed(data)
+                else:
+                    parser.close()
+                for event, el in parser.read_events():
+                    tag = el.tag
+                    if event == "start":
+                        if tag == _SHEET_DATA:
+                            sheet_data = el
+                        elif tag == _ROW:
+                            cells = {}
+                            next_col = 0
+                            r = el.get("r")
+                            skip = seen_header and int(r) < first if r else False
+                        continue
+                    if tag == _C and skip:
+                        el.clear()
+                    elif tag == _C:
+                        ref = el.get("r")
+                        col = _column_index(ref) if ref else next_col
+                        next_col = col + 1
+                        t = el.get("t")
+                        if t == "inlineStr":
+                            is_el = el.find(_IS)
+                            raw = self._si_text(is_el) if is_el is not None else None
+                        else:
+                            v = el.find(_V)
+                            raw = v.text if v is not None else None
+                        value = self._cell_value(t, raw, int(el.get("s") or 0))
+                        if value is not None:
+                            cells[col] = value
+                        el.clear()
+                    elif tag == _ROW:
+                        r = el.get("r")
+                        row_num = int(r) if r else next_row
+                        next_row = row_num + 1
+                        if last is not None and row_num > last and seen_header:
+                            return
+                        if sheet_data is not None:
+                            sheet_data.clear()   # drop finished rows from the tree
+                        if cells and (not seen_header or row_num >= first):
+                            header = not seen_header
+                            seen_header = True
+                            yield row_num, cells
+                            if header and r and prefix is not None and next_row < first:
+                                # Row numbers are explicit: skip ahead on the raw bytes
+                                seeking = True
+                                tail = data
+                                break
+                if not data and not seeking:
+                    return
+
+
+def iter_sheet_rows_stream(
+    xlsx_path: Path,
+    sheet_plan,
+    batch_size: int = 5000,
+    as_text: bool = True,
+    row_range: Optional[Tuple[int, Optional[int]]] = None,
+) -> Iterator[List[tuple]]:
+    """
+    Drop-in for excel_introspect.iter_sheet_rows on the streaming reader.
+    Layout follows build_workbook_plan: the first non-blank row is the header and its first
+    non-blank cell is column 0; data rows are the non-blank rows after it, len(columns) wide.
+    as_text=True yields bind-ready text (normalize_value); text longer than varchar2_len bytes is
+    truncated, or raises ValueError when the plan was built with truncate_overflow="error".
+    Typed columns still convert from it (column_types.typed_batches parses numbers and dates).
+    row_range=(first, last) yields only the data rows numbered first..last (parse_pool splits big sheets).
+    """
+    width = len(sheet_plan.columns)
+    max_bytes = int(sheet_plan.varchar2_len or 0)
+    overflow_error = getattr(sheet_plan, "truncate_overflow", "truncate") == "error"
+    with XlsxStream(Path(xlsx_path)) as book:
+        rows = book.iter_rows(sheet_plan.sheet_name, row_range=row_range)
+        offset = 0
+        for _, cells in rows:
+            offset = min(cells)
+            break
+        else:
+            return
+
+        batch: List[tuple] = []
+        for row_num, cells in rows:
+            vals = [cells.get(offset + i) for i in range(width)]
+            if as_text:
+                for i, v in enumerate(vals):
+                    if v is None:
+                        continue
+                    s = normalize_value(v)
+                    if s == "":
+                        vals[i] = None
+                    elif max_bytes and len(s) * 4 > max_bytes and len(s.encode("utf-8")) > max_bytes:
+                        if overflow_error:
+                            raise ValueError(
+                                f"Sheet '{sheet_plan.sheet_name}' row {row_num} column {sheet_plan.columns[i]}: "
+                                f"value exceeds VARCHAR2({max_bytes}) (TRUNCATE_OVERFLOW=error)"
+                            )
+                        vals[i] = _truncate_utf8(s, max_bytes)
+                    else:
+                        vals[i] = s
+            if any(v is not None for v in vals):
+                batch.append(tuple(vals))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def set_parse_pool(pool) -> None:
+    """
+    Routes sheet_rows() with a workbook path through a parse_pool.ParsePool (None to stop).
+    """
+    global _parse_pool
+    _parse_pool = pool
+
+
+def sheet_rows(sheet_plan, batch_size: int = 5000, xlsx_path: Optional[Path] = None) -> Iterator[List[tuple]]:
+    """
+    Row batches for one sheet: the streaming reader when the workbook path is given
+    (XLSX_READER=stream, or on worker processes with XLSX_READER=process),
+    excel_introspect.iter_sheet_rows otherwise.
+    """
+    if xlsx_path is not None and _parse_pool is not None:
+        return _parse_pool.iter_sheet_rows(xlsx_path, sheet_plan, batch_size=batch_size)
+    if xlsx_path is not None:
+        return iter_sheet_rows_stream(xlsx_path, sheet_plan, batch_size=batch_size)
+    # Imported here: parse_pool's worker processes load this module and never need excel_introspect
+    from excel_introspect import iter_sheet_rows
+
+    return iter_sheet_rows(sheet_plan, batch_size=batch_size)